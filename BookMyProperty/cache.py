@@ -0,0 +1,232 @@
+"""Cache backend shared by every worker process on one host.
+
+Entries live in a SQLite database in WAL mode, so all gunicorn workers see
+one cache and readers never wait for the writer. Once the stored values pass
+MAX_SIZE bytes (or MAX_ENTRIES entries), expired entries are dropped first,
+then the least recently used ones. Triggers keep the running size and entry
+count in step with every insert, update and delete.
+
+Hit and miss counts are kept per process and added to the shared totals
+every few seconds, so a read does not cost a write. stats() returns the
+totals.
+"""
+from contextlib import contextmanager
+import os
+import pickle
+import sqlite3
+import threading
+import time
+
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache_entry ('
+    ' key TEXT PRIMARY KEY, value BLOB NOT NULL, size INTEGER NOT NULL,'
+    ' expires REAL, accessed REAL NOT NULL)',
+    'CREATE INDEX IF NOT EXISTS cache_entry_accessed ON cache_entry (accessed)',
+    'CREATE TABLE IF NOT EXISTS cache_stat (name TEXT PRIMARY KEY, value INTEGER NOT NULL)',
+    "INSERT OR IGNORE INTO cache_stat (name, value) VALUES"
+    " ('size', 0), ('entries', 0), ('hits', 0), ('misses', 0), ('evictions', 0)",
+    'CREATE TRIGGER IF NOT EXISTS cache_entry_insert AFTER INSERT ON cache_entry BEGIN'
+    " UPDATE cache_stat SET value = value + NEW.size WHERE name = 'size';"
+    " UPDATE cache_stat SET value = value + 1 WHERE name = 'entries'; END",
+    'CREATE TRIGGER IF NOT EXISTS cache_entry_update AFTER UPDATE OF size ON cache_entry BEGIN'
+    " UPDATE cache_stat SET value = value + NEW.size - OLD.size WHERE name = 'size'; END",
+    'CREATE TRIGGER IF NOT EXISTS cache_entry_delete AFTER DELETE ON cache_entry BEGIN'
+    " UPDATE cache_stat SET value = value - OLD.size WHERE name = 'size';"
+    " UPDATE cache_stat SET value = value - 1 WHERE name = 'entries'; END",
+)
+
+# A read moves an entry up the LRU order at most this often (seconds)
+ACCESS_RESOLUTION = 10
+
+# How often each process adds its hit and miss counts to the totals (seconds)
+STATS_FLUSH_INTERVAL = 5
+
+
+class SQLiteCache(BaseCache):
+    """LRU cache in a shared SQLite file; LOCATION is the file path.
+
+    OPTIONS: MAX_SIZE (bytes of pickled values, default 64 MB) plus the
+    standard MAX_ENTRIES and CULL_FREQUENCY.
+    """
+
+    pickle_protocol = pickle.HIGHEST_PROTOCOL
+
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._path = str(location)
+        self._max_size = int(options.get('MAX_SIZE', 64 * 1024 * 1024))
+        self._local = threading.local()
+        # Hit/miss counts not yet written out, shared by the worker's threads
+        self._pending = {'hits': 0, 'misses': 0}
+        self._pending_lock = threading.Lock()
+        self._flushed_at = time.monotonic()
+
+    def _connection(self):
+        # One connection per thread, reopened after a fork
+        connection = getattr(self._local, 'connection', None)
+        if connection is None or self._local.pid != os.getpid():
+            os.makedirs(os.path.dirname(os.path.abspath(self._path)), exist_ok=True)
+            connection = sqlite3.connect(self._path, timeout=5, isolation_level=None, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=NORMAL')
+            with self._transaction(connection):
+                for statement in SCHEMA:
+                    connection.execute(statement)
+            self._local.connection = connection
+            self._local.pid = os.getpid()
+        return connection
+
+    @contextmanager
+    def _transaction(self, connection=None):
+        connection = connection or self._connection()
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except BaseException:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def _count(self, name):
+        with self._pending_lock:
+            self._pending[name] += 1
+            due = time.monotonic() - self._flushed_at >= STATS_FLUSH_INTERVAL
+        if due:
+            self._flush_stats()
+
+    def _flush_stats(self):
+        with self._pending_lock:
+            pending = [(count, name) for name, count in self._pending.items() if count]
+            self._pending = dict.fromkeys(self._pending, 0)
+            self._flushed_at = time.monotonic()
+        if not pending:
+            return
+        try:
+            self._connection().executemany('UPDATE cache_stat SET value = value + ? WHERE name = ?', pending)
+        except sqlite3.OperationalError:
+            # Database busy; keep the counts for the next flush
+            with self._pending_lock:
+                for count, name in pending:
+                    self._pending[name] += count
+
+    def _evict(self, connection, now):
+        """Drop expired, then least recently used, entries until under the caps"""
+        evicted = connection.execute(
+            'DELETE FROM cache_entry WHERE expires IS NOT NULL AND expires <= ?', (now,)
+        ).rowcount
+        while True:
+            stats = dict(connection.execute("SELECT name, value FROM cache_stat WHERE name IN ('size', 'entries')"))
+            if stats['entries'] == 0 or (stats['size'] <= self._max_size and stats['entries'] <= self._max_entries):
+                break
+            batch = max(stats['entries'] // self._cull_frequency, 1) if self._cull_frequency else stats['entries']
+            evicted += connection.execute(
+                'DELETE FROM cache_entry WHERE key IN (SELECT key FROM cache_entry ORDER BY accessed LIMIT ?)', (batch,)
+            ).rowcount
+        if evicted:
+            connection.execute("UPDATE cache_stat SET value = value + ? WHERE name = 'evictions'", (evicted,))
+
+    def _store(self, key, value, timeout, only_if_missing=False):
+        expires = self.get_backend_timeout(timeout)
+        blob = pickle.dumps(value, self.pickle_protocol)
+        now = time.time()
+        with self._transaction() as connection:
+            if only_if_missing:
+                current = connection.execute(
+                    'SELECT 1 FROM cache_entry WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, now)
+                ).fetchone()
+                if current:
+                    return False
+            if expires is not None and expires <= now:
+                connection.execute('DELETE FROM cache_entry WHERE key = ?', (key,))
+                return True
+            connection.execute(
+                'INSERT INTO cache_entry (key, value, size, expires, accessed) VALUES (?, ?, ?, ?, ?)'
+                ' ON CONFLICT (key) DO UPDATE SET value = excluded.value, size = excluded.size,'
+                ' expires = excluded.expires, accessed = excluded.accessed',
+                (key, blob, len(blob), expires, now)
+            )
+            self._evict(connection, now)
+        return True
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        try:
+            return self._store(key, value, timeout, only_if_missing=True)
+        except sqlite3.OperationalError:
+            return False
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        try:
+            self._store(key, value, timeout)
+        except sqlite3.OperationalError:
+            # The write lock stayed busy past the timeout. Storing is only an
+            # optimization, so let the request go on without it.
+            pass
+
+    def get(self, key, default=None, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        connection = self._connection()
+        now = time.time()
+        row = connection.execute('SELECT value, expires, accessed FROM cache_entry WHERE key = ?', (key,)).fetchone()
+        if row is None or (row[1] is not None and row[1] <= now):
+            self._count('misses')
+            return default
+        if now - row[2] > ACCESS_RESOLUTION:
+            try:
+                connection.execute('UPDATE cache_entry SET accessed = ? WHERE key = ?', (now, key))
+            except sqlite3.OperationalError:
+                # LRU bookkeeping is best effort; don't fail the read
+                pass
+        self._count('hits')
+        return pickle.loads(row[0])
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        now = time.time()
+        with self._transaction() as connection:
+            return connection.execute(
+                'UPDATE cache_entry SET expires = ?, accessed = ? WHERE key = ? AND (expires IS NULL OR expires > ?)',
+                (self.get_backend_timeout(timeout), now, key, now)
+            ).rowcount > 0
+
+    def delete(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        with self._transaction() as connection:
+            return connection.execute('DELETE FROM cache_entry WHERE key = ?', (key,)).rowcount > 0
+
+    def has_key(self, key, version=None):
+        key = self.make_and_validate_key(key, version=version)
+        return self._connection().execute(
+            'SELECT 1 FROM cache_entry WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, time.time())
+        ).fetchone() is not None
+
+    def incr(self, key, delta=1, version=None):
+        # Read and write in one transaction so concurrent workers don't lose updates
+        key = self.make_and_validate_key(key, version=version)
+        with self._transaction() as connection:
+            row = connection.execute(
+                'SELECT value FROM cache_entry WHERE key = ? AND (expires IS NULL OR expires > ?)', (key, time.time())
+            ).fetchone()
+            if row is None:
+                raise ValueError(f"Key '{key}' not found")
+            value = pickle.loads(row[0]) + delta
+            blob = pickle.dumps(value, self.pickle_protocol)
+            connection.execute('UPDATE cache_entry SET value = ?, size = ? WHERE key = ?', (blob, len(blob), key))
+        return value
+
+    def clear(self):
+        with self._transaction() as connection:
+            connection.execute('DELETE FROM cache_entry')
+
+    def close(self, **kwargs):
+        # Keep the connection between requests; only stats need pushing out
+        self._flush_stats()
+
+    def stats(self):
+        """Return shared totals: size (bytes), entries, hits, misses and evictions"""
+        self._flush_stats()
+        return dict(self._connection().execute('SELECT name, value FROM cache_stat'))
@@ -0,0 +1,6 @@
+from django.conf import settings
+
+
+def fragment_cache(request):
+    """Expose the timeout used by {% cache %} fragments keyed on Property.cache_version"""
+    return {'FRAGMENT_CACHE_TIMEOUT': settings.FRAGMENT_CACHE_TIMEOUT}
@@ -0,0 +1,46 @@
+import sqlite3
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from BookMyProperty.replicas import REPLICA_ALIAS
+
+class Command(BaseCommand):
+    help = ('Copy the primary SQLite database onto the read replica with the SQLite backup API, '
+            'standing in for real replication in local and single-host setups')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--interval',
+            type=float,
+            default=0,
+            help='Seconds between copies; 0 copies once and exits'
+        )
+
+    def handle(self, *args, **options):
+        if REPLICA_ALIAS not in connections.settings:
+            raise CommandError(f"No '{REPLICA_ALIAS}' database is configured; set READ_REPLICA_NAME.")
+        primary = connections['default'].settings_dict
+        replica = connections[REPLICA_ALIAS].settings_dict
+        if primary['ENGINE'] != 'django.db.backends.sqlite3' or replica['ENGINE'] != primary['ENGINE']:
+            raise CommandError('Only SQLite primaries and replicas can be synced this way.')
+
+        while True:
+            start = time.perf_counter()
+            self.copy(primary['NAME'], replica['NAME'])
+            self.stdout.write(f'Replica synced in {(time.perf_counter() - start) * 1000:.0f} ms')
+            if not options['interval']:
+                break
+            time.sleep(options['interval'])
+
+    def copy(self, source_path, target_path):
+        # The backup reads a consistent snapshot of the primary without
+        # blocking its writers (WAL), and replaces the replica's pages under
+        # one lock, so replica readers never see a half-copied database
+        source = sqlite3.connect(source_path)
+        target = sqlite3.connect(target_path, timeout=30)
+        try:
+            source.backup(target)
+        finally:
+            target.close()
+            source.close()
@@ -0,0 +1,202 @@
+"""Per-view request metrics: SQL query count and time, template render time
+and wall time, keyed by resolved URL name.
+
+RequestMetricsMiddleware collects the numbers and the metrics view exposes
+them in the Prometheus text format. Totals live in process memory, so each
+worker reports its own series and the scraper sums them.
+"""
+from contextlib import ExitStack
+from contextvars import ContextVar
+import logging
+import threading
+import time
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connections
+from django.http import HttpResponse, HttpResponseForbidden
+from django.template.backends.django import Template
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds (seconds) of the request duration histogram buckets
+DURATION_BUCKETS = (0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+_current_request = ContextVar('request_metrics', default=None)
+
+
+class RequestStats:
+    """Timings gathered while one request is being handled"""
+
+    __slots__ = ('queries', 'sql_time', 'template_time')
+
+    def __init__(self):
+        self.queries = 0
+        self.sql_time = 0.0
+        self.template_time = 0.0
+
+    def record_query(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            self.sql_time += time.perf_counter() - start
+            self.queries += 1
+
+
+class MetricsRegistry:
+    """Thread-safe running totals per view"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._views = {}
+
+    def observe(self, view, stats, wall_time):
+        with self._lock:
+            totals = self._views.get(view)
+            if totals is None:
+                totals = self._views[view] = {
+                    'requests': 0, 'queries': 0, 'sql_time': 0.0,
+                    'template_time': 0.0, 'wall_time': 0.0,
+                    'buckets': [0] * len(DURATION_BUCKETS),
+                }
+            totals['requests'] += 1
+            totals['queries'] += stats.queries
+            totals['sql_time'] += stats.sql_time
+            totals['template_time'] += stats.template_time
+            totals['wall_time'] += wall_time
+            for i, bound in enumerate(DURATION_BUCKETS):
+                if wall_time <= bound:
+                    totals['buckets'][i] += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {view: dict(totals, buckets=list(totals['buckets'])) for view, totals in self._views.items()}
+
+    def render(self):
+        """Return all series in the Prometheus text exposition format"""
+        views = sorted(self.snapshot().items())
+        lines = []
+
+        def counter(name, help_text, key):
+            lines.append(f'# HELP {name} {help_text}')
+            lines.append(f'# TYPE {name} counter')
+            for view, totals in views:
+                lines.append(f'{name}{{view="{_escape(view)}"}} {totals[key]}')
+
+        counter('bmp_requests_total', 'Requests handled.', 'requests')
+        counter('bmp_sql_queries_total', 'SQL queries executed.', 'queries')
+        counter('bmp_sql_seconds_total', 'Time spent executing SQL.', 'sql_time')
+        counter('bmp_template_seconds_total', 'Time spent rendering templates.', 'template_time')
+
+        lines.append('# HELP bmp_request_duration_seconds Wall time per request.')
+        lines.append('# TYPE bmp_request_duration_seconds histogram')
+        for view, totals in views:
+            label = _escape(view)
+            for bound, count in zip(DURATION_BUCKETS, totals['buckets']):
+                lines.append(f'bmp_request_duration_seconds_bucket{{view="{label}",le="{bound}"}} {count}')
+            lines.append(f'bmp_request_duration_seconds_bucket{{view="{label}",le="+Inf"}} {totals["requests"]}')
+            lines.append(f'bmp_request_duration_seconds_sum{{view="{label}"}} {totals["wall_time"]}')
+            lines.append(f'bmp_request_duration_seconds_count{{view="{label}"}} {totals["requests"]}')
+        return '\n'.join(lines) + '\n'
+
+
+registry = MetricsRegistry()
+
+
+def render_cache_stats():
+    """Return Prometheus series for every configured cache that keeps stats"""
+    series = []
+    for alias in settings.CACHES:
+        cache = caches[alias]
+        if hasattr(cache, 'stats'):
+            series.append((alias, cache.stats()))
+    if not series:
+        return ''
+    lines = []
+    for name, help_text, key, kind in (
+        ('bmp_cache_hits_total', 'Cache lookups that found a value.', 'hits', 'counter'),
+        ('bmp_cache_misses_total', 'Cache lookups that found nothing.', 'misses', 'counter'),
+        ('bmp_cache_evictions_total', 'Entries dropped to stay under the size caps.', 'evictions', 'counter'),
+        ('bmp_cache_entries', 'Entries currently stored.', 'entries', 'gauge'),
+        ('bmp_cache_bytes', 'Bytes of values currently stored.', 'size', 'gauge'),
+    ):
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} {kind}')
+        for alias, stats in series:
+            lines.append(f'{name}{{cache="{_escape(alias)}"}} {stats[key]}')
+    return '\n'.join(lines) + '\n'
+
+
+def _escape(value):
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _instrument_template_rendering():
+    """Wrap Django template rendering once so render time is charged to the current request"""
+    original_render = Template.render
+    if getattr(original_render, 'records_request_metrics', False):
+        return
+
+    def render(self, context=None, request=None):
+        stats = _current_request.get()
+        if stats is None:
+            return original_render(self, context, request)
+        start = time.perf_counter()
+        try:
+            return original_render(self, context, request)
+        finally:
+            stats.template_time += time.perf_counter() - start
+
+    render.records_request_metrics = True
+    Template.render = render
+
+
+class RequestMetricsMiddleware:
+    """Record SQL, template and wall time per request, tagged by URL name"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.server_timing = getattr(settings, 'REQUEST_METRICS_SERVER_TIMING', False)
+        self.slow_request_ms = getattr(settings, 'REQUEST_METRICS_SLOW_REQUEST_MS', None)
+        _instrument_template_rendering()
+
+    def __call__(self, request):
+        stats = RequestStats()
+        token = _current_request.set(stats)
+        start = time.perf_counter()
+        try:
+            with ExitStack() as stack:
+                for connection in connections.all():
+                    stack.enter_context(connection.execute_wrapper(stats.record_query))
+                response = self.get_response(request)
+        finally:
+            _current_request.reset(token)
+        wall_time = time.perf_counter() - start
+
+        match = getattr(request, 'resolver_match', None)
+        view = match.view_name if match else 'unresolved'
+        registry.observe(view, stats, wall_time)
+
+        if self.server_timing:
+            response['Server-Timing'] = (
+                f'db;dur={stats.sql_time * 1000:.1f};desc="{stats.queries} queries", '
+                f'tpl;dur={stats.template_time * 1000:.1f}, '
+                f'total;dur={wall_time * 1000:.1f}'
+            )
+
+        if self.slow_request_ms is not None and wall_time * 1000 >= self.slow_request_ms:
+            logger.warning(
+                'Slow request: %s %s (%s) took %.0f ms with %d queries (%.0f ms SQL, %.0f ms templates)',
+                request.method, request.path, view, wall_time * 1000,
+                stats.queries, stats.sql_time * 1000, stats.template_time * 1000
+            )
+        return response
+
+
+def metrics(request):
+    """Expose request metrics for Prometheus to scrape"""
+    allowed_ips = getattr(settings, 'REQUEST_METRICS_ALLOWED_IPS', None)
+    if allowed_ips is not None and request.META.get('REMOTE_ADDR') not in allowed_ips:
+        return HttpResponseForbidden()
+    return HttpResponse(registry.render() + render_cache_stats(), content_type='text/plain; version=0.0.4; charset=utf-8')
@@ -0,0 +1,115 @@
+"""Keyset (cursor) pagination for newest-first listings.
+
+Paginator issues a COUNT(*) and an OFFSET that grows with the page number.
+CursorPaginator instead seeks from the last row seen on (created_at, id),
+so every page costs one indexed range query. Cursors are opaque tokens
+that encode the boundary row and the direction of travel.
+"""
+import base64
+import json
+from datetime import datetime
+
+from django.core.paginator import Paginator
+from django.db.models import Q
+
+
+def encode_cursor(direction, created_at, pk):
+    payload = json.dumps([direction, created_at.isoformat(), pk]).encode()
+    return base64.urlsafe_b64encode(payload).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (direction, created_at, pk), or None if the cursor is malformed"""
+    try:
+        payload = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        direction, created_at, pk = json.loads(payload)
+        if direction not in ('next', 'prev'):
+            return None
+        return direction, datetime.fromisoformat(created_at), int(pk)
+    except (ValueError, TypeError):
+        return None
+
+
+class CursorPage:
+    """A page of results plus the cursors that lead away from it"""
+
+    is_cursor_page = True
+
+    def __init__(self, object_list, has_next, has_previous):
+        self.object_list = object_list
+        self.has_next_page = has_next
+        self.has_previous_page = has_previous
+
+    def __iter__(self):
+        return iter(self.object_list)
+
+    def __len__(self):
+        return len(self.object_list)
+
+    def __bool__(self):
+        return bool(self.object_list)
+
+    def has_next(self):
+        return self.has_next_page
+
+    def has_previous(self):
+        return self.has_previous_page
+
+    def has_other_pages(self):
+        return self.has_next_page or self.has_previous_page
+
+    @property
+    def next_cursor(self):
+        if self.has_next_page:
+            last = self.object_list[-1]
+            return encode_cursor('next', last.created_at, last.pk)
+        return ''
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous_page:
+            first = self.object_list[0]
+            return encode_cursor('prev', first.created_at, first.pk)
+        return ''
+
+
+class CursorPaginator:
+    """Pages a queryset newest first on (created_at, id) without COUNT or OFFSET"""
+
+    def __init__(self, queryset, per_page):
+        self.queryset = queryset
+        self.per_page = per_page
+
+    def get_page(self, cursor):
+        position = decode_cursor(cursor) if cursor else None
+        if position is None:
+            rows = list(self.queryset.order_by('-created_at', '-pk')[:self.per_page + 1])
+            return CursorPage(rows[:self.per_page], len(rows) > self.per_page, False)
+
+        direction, created_at, pk = position
+        if direction == 'next':
+            rows = list(self.queryset.filter(
+                Q(created_at__lt=created_at) | Q(created_at=created_at, pk__lt=pk)
+            ).order_by('-created_at', '-pk')[:self.per_page + 1])
+            return CursorPage(rows[:self.per_page], len(rows) > self.per_page, True)
+
+        # Walk backwards in ascending order, then flip the page back round
+        rows = list(self.queryset.filter(
+            Q(created_at__gt=created_at) | Q(created_at=created_at, pk__gt=pk)
+        ).order_by('created_at', 'pk')[:self.per_page + 1])
+        page_rows = rows[:self.per_page]
+        page_rows.reverse()
+        return CursorPage(page_rows, True, len(rows) > self.per_page)
+
+
+def paginate(request, queryset, per_page, allow_cursor=True):
+    """Return the requested page of a queryset.
+
+    With allow_cursor the queryset is paged by cursor, newest first, from the
+    first page on, so deep pages never pay for an OFFSET. A ``page``
+    parameter (old links, or querysets in another order) gets the
+    page-number Paginator.
+    """
+    if allow_cursor and 'page' not in request.GET:
+        return CursorPaginator(queryset, per_page).get_page(request.GET.get('cursor'))
+    return Paginator(queryset, per_page).get_page(request.GET.get('page'))
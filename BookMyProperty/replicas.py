@@ -0,0 +1,71 @@
+"""Read-replica routing for browse traffic.
+
+ReadReplicaMiddleware marks GET and HEAD requests to the views listed in
+READ_REPLICA_VIEWS, and ReplicaRouter sends their reads to the 'replica'
+database alias. Every write and every read anywhere else goes to 'default'.
+A client that has just written is pinned to the primary for
+READ_REPLICA_PIN_SECONDS through a cookie, so it sees its own change even
+before the replica catches up.
+
+Without a 'replica' alias in DATABASES all of this does nothing.
+"""
+from contextvars import ContextVar
+
+from django.conf import settings
+from django.db import connections
+
+REPLICA_ALIAS = 'replica'
+PIN_COOKIE = 'pin_primary'
+
+_use_replica = ContextVar('use_replica', default=False)
+
+
+class ReplicaRouter:
+    """Route reads to the replica while a browse view is being served"""
+
+    def db_for_read(self, model, **hints):
+        if not _use_replica.get() or REPLICA_ALIAS not in settings.DATABASES:
+            return None
+        # Reads inside a transaction may be checks guarding a write
+        # (booking conflicts, review stats), so they stay on the primary
+        if connections['default'].in_atomic_block:
+            return None
+        return REPLICA_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return 'default'
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # The replica holds the same rows as the primary
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # The replica is a copy of the primary, never migrated on its own
+        return db != REPLICA_ALIAS
+
+
+class ReadReplicaMiddleware:
+    """Serve read-only views from the replica and pin writers to the primary"""
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.views = frozenset(getattr(settings, 'READ_REPLICA_VIEWS', ()))
+        self.pin_seconds = getattr(settings, 'READ_REPLICA_PIN_SECONDS', 10)
+
+    def __call__(self, request):
+        token = _use_replica.set(False)
+        try:
+            response = self.get_response(request)
+        finally:
+            _use_replica.reset(token)
+        if request.method not in ('GET', 'HEAD', 'OPTIONS', 'TRACE') and response.status_code < 400:
+            response.set_cookie(PIN_COOKIE, '1', max_age=self.pin_seconds, httponly=True, samesite='Lax')
+        return response
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        if (
+            request.method in ('GET', 'HEAD')
+            and request.resolver_match.view_name in self.views
+            and PIN_COOKIE not in request.COOKIES
+        ):
+            _use_replica.set(True)
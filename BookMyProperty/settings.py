@@ -40,16 +40,21 @@ INSTALLED_APPS = [
     'django.contrib.staticfiles',
     
     # Local apps
+    'BookMyProperty',
     'accounts',
     'properties',
     'bookings',
     'reviews',
+    'tasks',
+    'api',
     'crispy_forms',
     'crispy_bootstrap4',
 ]
 
 MIDDLEWARE = [
+    'BookMyProperty.metrics.RequestMetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'BookMyProperty.replicas.ReadReplicaMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
     'django.middleware.csrf.CsrfViewMiddleware',
@@ -70,6 +75,7 @@ TEMPLATES = [
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
+                'BookMyProperty.context_processors.fragment_cache',
             ],
         },
     },
@@ -81,10 +87,102 @@ WSGI_APPLICATION = 'BookMyProperty.wsgi.application'
 # Database
 # https://docs.djangoproject.com/en/5.2/ref/settings/#databases
 
+# Applied to every new SQLite connection (through init_command)
+SQLITE_PRAGMAS = {
+    # Readers and the writer no longer block each other
+    'journal_mode': 'WAL',
+    # With WAL, fsync only at checkpoints; a power cut can lose the last
+    # commits but never corrupts the database
+    'synchronous': 'NORMAL',
+    'mmap_size': 256 * 1024 * 1024,
+    'cache_size': -64 * 1024,  # KiB per connection
+    # Milliseconds to wait for the write lock before 'database is locked'
+    'busy_timeout': 20000,
+}
+
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': BASE_DIR / 'db.sqlite3',
+        'OPTIONS': {
+            # Take the write lock when a transaction starts, so concurrent
+            # booking requests queue up instead of failing on lock upgrade
+            'transaction_mode': 'IMMEDIATE',
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in SQLITE_PRAGMAS.items()),
+        },
+        # Keep connections open across requests (checked before reuse)
+        # instead of reconnecting and re-running the pragmas every time
+        'CONN_MAX_AGE': 600,
+        'CONN_HEALTH_CHECKS': True,
+    }
+}
+
+# Read replica (BookMyProperty.replicas): GET/HEAD requests to
+# READ_REPLICA_VIEWS read from it, unless the client wrote something within
+# the last READ_REPLICA_PIN_SECONDS. Locally, point READ_REPLICA_NAME at a
+# second SQLite file and keep it fresh with
+#   python manage.py sync_read_replica --interval 2
+READ_REPLICA_NAME = os.environ.get('READ_REPLICA_NAME')
+if READ_REPLICA_NAME:
+    # The replica is only read: no IMMEDIATE write lock at BEGIN and none of
+    # the primary's write pragmas; query_only makes a stray write fail
+    # instead of letting the copy drift from the primary
+    REPLICA_PRAGMAS = {
+        'query_only': 1,
+        'mmap_size': SQLITE_PRAGMAS['mmap_size'],
+        'cache_size': SQLITE_PRAGMAS['cache_size'],
+        # Wait out a sync_read_replica copy instead of failing the read
+        'busy_timeout': SQLITE_PRAGMAS['busy_timeout'],
+    }
+    DATABASES['replica'] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': READ_REPLICA_NAME,
+        'OPTIONS': {
+            'init_command': ';'.join(f'PRAGMA {name}={value}' for name, value in REPLICA_PRAGMAS.items()),
+        },
+        'CONN_MAX_AGE': DATABASES['default']['CONN_MAX_AGE'],
+        'CONN_HEALTH_CHECKS': True,
+        # Tests read the primary's test database through this alias
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['BookMyProperty.replicas.ReplicaRouter']
+READ_REPLICA_VIEWS = [
+    'properties:home',
+    'properties:property_list',
+    'properties:property_search',
+    'properties:property_detail',
+    'properties:property_calendar',
+    'properties:property_availability',
+    'reviews:review_list',
+    'reviews:property_rating_summary',
+    'api:property_list',
+    'api:property_detail',
+    'api:property_availability',
+    'api:property_reviews',
+]
+# Longer than the replica's worst-case lag
+READ_REPLICA_PIN_SECONDS = 10
+
+
+# Cache
+# https://docs.djangoproject.com/en/5.2/topics/cache/
+#
+# BookMyProperty.cache.SQLiteCache keeps entries in one WAL-mode SQLite file,
+# so every worker process on the host shares them and sees invalidations.
+# MAX_SIZE caps the stored bytes; least recently used entries go first. To
+# use another store, swap BACKEND/LOCATION, e.g. LocMemCache for a single
+# process or django.core.cache.backends.redis.RedisCache when Redis exists.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'BookMyProperty.cache.SQLiteCache',
+        'LOCATION': BASE_DIR / 'cache.sqlite3',
+        'TIMEOUT': 300,
+        'OPTIONS': {
+            'MAX_SIZE': 64 * 1024 * 1024,  # 64MB
+            'MAX_ENTRIES': 50000,
+        },
     }
 }
 
@@ -139,12 +237,62 @@ MEDIA_ROOT = BASE_DIR / 'media'
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 # Authentication settings
+# ProfileModelBackend loads UserProfile together with the user on every
+# request. ModelBackend stays listed so sessions logged in under it before
+# the switch remain valid.
+AUTHENTICATION_BACKENDS = [
+    'accounts.backends.ProfileModelBackend',
+    'django.contrib.auth.backends.ModelBackend',
+]
 LOGIN_REDIRECT_URL = '/'
 LOGOUT_REDIRECT_URL = '/'
 LOGIN_URL = '/auth/login/'
 
+# Session and flash-message storage. SESSION_STORE picks the engine:
+#   'cached_db'      reads sessions from CACHES and writes through to the
+#                    database, so browsing doesn't touch django_session
+#   'signed_cookies' keeps the session in the client's cookie; no server
+#                    storage, but logging out can't revoke copied cookies
+#   'db'             Django's default, one django_session read per request
+# Messages go into a cookie first, and into the session only when the cookie
+# would be too large (or always a cookie with signed_cookies sessions).
+# Compare them with: python manage.py benchmark_sessions
+SESSION_STORE = os.environ.get('SESSION_STORE', 'cached_db')
+SESSION_ENGINE = f'django.contrib.sessions.backends.{SESSION_STORE}'
+MESSAGE_STORAGE = (
+    'django.contrib.messages.storage.cookie.CookieStorage' if SESSION_STORE == 'signed_cookies'
+    else 'django.contrib.messages.storage.fallback.FallbackStorage'
+)
+
 # File upload settings
 FILE_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
 DATA_UPLOAD_MAX_MEMORY_SIZE = 5242880  # 5MB
 
+# Chunked image uploads (properties.uploads) stream to disk, so they are not
+# bound by the limits above
+CHUNKED_UPLOAD_DIR = BASE_DIR / 'uploads_partial'
+CHUNKED_UPLOAD_MAX_SIZE = 52428800  # 50MB
+
 CRISPY_TEMPLATE_PACK = 'bootstrap4'
+
+# Full-text search backend for property listings (dotted path to a class in
+# properties.search); None picks one to suit the database vendor
+PROPERTY_SEARCH_BACKEND = None
+
+# Request metrics (BookMyProperty.metrics): Server-Timing headers, the
+# slow-request log threshold and the addresses allowed to scrape /metrics/
+REQUEST_METRICS_SERVER_TIMING = DEBUG
+REQUEST_METRICS_SLOW_REQUEST_MS = 500
+REQUEST_METRICS_ALLOWED_IPS = ['127.0.0.1', '::1']
+
+# Seconds the property list's facet counts are cached per filter combination
+FACET_CACHE_TIMEOUT = 60
+
+# Seconds clients and shared caches may reuse JSON API responses before
+# revalidating them with their ETag
+API_CACHE_MAX_AGE = 60
+
+# Lifetime of cached template fragments (property cards, detail body, rating
+# block). Their keys include Property.cache_version, so edits never serve
+# stale HTML; the timeout only bounds how long unused versions linger.
+FRAGMENT_CACHE_TIMEOUT = 60 * 60 * 24
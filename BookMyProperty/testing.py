@@ -0,0 +1,26 @@
+"""Fixtures shared by the apps' tests"""
+from django import test
+from django.test import override_settings
+
+from properties.models import Property
+
+
+# A private in-memory cache, so tests and the dev server never see each
+# other's entries in cache.sqlite3, and no slow-request warnings in the output
+@override_settings(
+    CACHES={'default': {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}},
+    REQUEST_METRICS_SLOW_REQUEST_MS=None,
+)
+class TestCase(test.TestCase):
+    """TestCase with the settings every app's tests run under"""
+
+
+def create_property(owner, **fields):
+    """Create a Property, filling every required field the test does not care about"""
+    values = {
+        'title': 'Property', 'description': 'A place to stay', 'property_type': 'house',
+        'address': '1 Main Street', 'city': 'Pune', 'state': 'Maharashtra', 'zip_code': '411001',
+        'bedrooms': 2, 'bathrooms': 1, 'max_guests': 4, 'price_per_night': 1000,
+    }
+    values.update(fields)
+    return Property.objects.create(owner=owner, **values)
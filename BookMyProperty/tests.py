@@ -0,0 +1,209 @@
+import os
+import shutil
+import tempfile
+from unittest import mock
+
+from django.conf import settings
+from django.db import connection, transaction
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import resolve, reverse
+
+from properties.models import Property
+
+from .cache import ACCESS_RESOLUTION, SQLiteCache
+from .metrics import registry
+from .replicas import PIN_COOKIE, REPLICA_ALIAS, ReadReplicaMiddleware, ReplicaRouter
+from .testing import TestCase
+
+
+class SQLiteCacheTests(SimpleTestCase):
+    """The shared cache should expire, evict and count like a Django cache"""
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        self.path = os.path.join(directory, 'cache.sqlite3')
+        self.now = 1_000_000.0
+        clock = mock.patch('BookMyProperty.cache.time.time', side_effect=lambda: self.now)
+        clock.start()
+        self.addCleanup(clock.stop)
+
+    def make_cache(self, **options):
+        cache = SQLiteCache(self.path, {'TIMEOUT': 60, 'OPTIONS': options})
+        self.addCleanup(self.disconnect, cache)
+        return cache
+
+    def disconnect(self, cache):
+        connection = getattr(cache._local, 'connection', None)
+        if connection is not None:
+            connection.close()
+
+    def test_expiry(self):
+        cache = self.make_cache()
+        cache.set('short', 'value', 10)
+        cache.set('forever', 'value', None)
+        self.assertEqual(cache.get('short'), 'value')
+        self.now += 11
+        self.assertIsNone(cache.get('short'))
+        self.assertFalse(cache.has_key('short'))
+        self.assertEqual(cache.get('forever'), 'value')
+        self.assertFalse(cache.touch('short'))
+
+    def test_add_and_incr(self):
+        cache = self.make_cache()
+        self.assertTrue(cache.add('counter', 1, 10))
+        self.assertFalse(cache.add('counter', 5))
+        self.assertEqual(cache.incr('counter', 2), 3)
+        self.assertEqual(cache.get('counter'), 3)
+        with self.assertRaises(ValueError):
+            cache.incr('missing')
+        # An expired entry no longer blocks add()
+        self.now += 11
+        self.assertTrue(cache.add('counter', 5))
+        self.assertEqual(cache.get('counter'), 5)
+
+    def test_size_cap_evicts_least_recently_used(self):
+        cache = self.make_cache(MAX_SIZE=350)
+        for key in ('a', 'b', 'c'):
+            cache.set(key, key * 100)
+            self.now += 1
+        # Reading 'a' makes 'b' the least recently used
+        self.now += ACCESS_RESOLUTION + 1
+        cache.get('a')
+        cache.set('d', 'd' * 100)
+        self.assertEqual([key for key in 'abcd' if cache.has_key(key)], ['a', 'c', 'd'])
+        stats = cache.stats()
+        self.assertLessEqual(stats['size'], 350)
+        self.assertEqual((stats['entries'], stats['evictions']), (3, 1))
+
+    def test_entry_cap_culls(self):
+        cache = self.make_cache(MAX_ENTRIES=4, CULL_FREQUENCY=2)
+        for i in range(5):
+            cache.set(f'key{i}', i)
+            self.now += 1
+        # Five entries against a cap of four: the oldest half goes
+        self.assertEqual([i for i in range(5) if cache.has_key(f'key{i}')], [2, 3, 4])
+        self.assertEqual(cache.stats()['evictions'], 2)
+
+    def test_expired_entries_are_evicted_first(self):
+        cache = self.make_cache(MAX_ENTRIES=2)
+        cache.set('old', 1)
+        self.now += 1
+        cache.set('expiring', 2, 5)
+        self.now += 10
+        cache.set('new', 3)
+        self.assertTrue(cache.has_key('old'))
+        self.assertEqual(cache.stats()['entries'], 2)
+
+    def test_stats_are_shared(self):
+        cache = self.make_cache()
+        cache.set('key', 'value')
+        cache.get('key')
+        cache.get('key')
+        cache.get('missing')
+        # A second instance, as in another worker, reads the same totals
+        stats = self.make_cache().stats()
+        self.assertEqual((stats['hits'], stats['misses']), (0, 0))
+        cache.close()
+        stats = self.make_cache().stats()
+        self.assertEqual((stats['hits'], stats['misses'], stats['entries']), (2, 1, 1))
+
+
+class RequestMetricsTests(TestCase):
+    """The middleware should count each request and /metrics/ should only answer allowed hosts"""
+
+    # The middleware reads its settings when a client first loads it, so
+    # overrides are applied before the test client's first request
+    view = 'properties:property_list'
+
+    def totals(self):
+        return registry.snapshot().get(self.view, {'requests': 0, 'queries': 0})
+
+    def test_counts_requests_and_queries(self):
+        before = self.totals()
+        with CaptureQueriesContext(connection) as queries:
+            self.client.get(reverse(self.view))
+        after = self.totals()
+        self.assertEqual(after['requests'] - before['requests'], 1)
+        self.assertEqual(after['queries'] - before['queries'], len(queries.captured_queries))
+        self.assertGreater(after['template_time'], 0)
+        self.assertEqual(after['buckets'][-1] - before.get('buckets', [0])[-1], 1)
+
+    def test_server_timing_header(self):
+        with override_settings(REQUEST_METRICS_SERVER_TIMING=True):
+            response = self.client.get(reverse(self.view))
+        self.assertRegex(response['Server-Timing'], r'^db;dur=[\d.]+;desc="\d+ queries", tpl;dur=[\d.]+, total;dur=[\d.]+$')
+        with override_settings(REQUEST_METRICS_SERVER_TIMING=False):
+            self.client = self.client_class()
+            self.assertNotIn('Server-Timing', self.client.get(reverse(self.view)))
+
+    def test_slow_request_warning(self):
+        with override_settings(REQUEST_METRICS_SLOW_REQUEST_MS=0), self.assertLogs('BookMyProperty.metrics', 'WARNING') as logs:
+            self.client.get(reverse(self.view))
+        self.assertIn(f'({self.view})', logs.output[0])
+
+    def test_metrics_allowlist(self):
+        self.client.get(reverse(self.view))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'bmp_requests_total{{view="{self.view}"}}', response.content.decode())
+        self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='203.0.113.5').status_code, 403)
+        with override_settings(REQUEST_METRICS_ALLOWED_IPS=None):
+            self.assertEqual(self.client.get(reverse('metrics'), REMOTE_ADDR='203.0.113.5').status_code, 200)
+
+
+@override_settings(READ_REPLICA_VIEWS=['properties:property_list'], READ_REPLICA_PIN_SECONDS=10)
+class ReadReplicaTests(TransactionTestCase):
+    """Browse reads should go to the replica; writes, transactions and pinned clients stay on the primary"""
+
+    # Not TestCase: its wrapping transaction would keep every read on the primary
+
+    def setUp(self):
+        # Only the alias's presence matters; no query reaches the replica here
+        replica = mock.patch.dict(settings.DATABASES, {REPLICA_ALIAS: settings.DATABASES['default']})
+        replica.start()
+        self.addCleanup(replica.stop)
+        self.router = ReplicaRouter()
+
+    def serve(self, request):
+        """Run a request through the middleware; return where the view's reads went and the response"""
+        reads = []
+
+        def view(request):
+            middleware.process_view(request, view, (), {})
+            reads.append(self.router.db_for_read(Property))
+            with transaction.atomic():
+                reads.append(self.router.db_for_read(Property))
+            return HttpResponse(status=200 if request.method == 'GET' else 302)
+
+        middleware = ReadReplicaMiddleware(view)
+        request.resolver_match = resolve(request.path)
+        return reads, middleware(request)
+
+    def test_browse_reads_use_the_replica(self):
+        reads, response = self.serve(RequestFactory().get(reverse('properties:property_list')))
+        # Reads inside a transaction stay on the primary
+        self.assertEqual(reads, [REPLICA_ALIAS, None])
+        self.assertNotIn(PIN_COOKIE, response.cookies)
+        # The flag does not outlive the request
+        self.assertIsNone(self.router.db_for_read(Property))
+
+    def test_other_views_and_writes_use_the_primary(self):
+        self.assertEqual(self.serve(RequestFactory().get(reverse('properties:home')))[0], [None, None])
+        self.assertEqual(self.router.db_for_write(Property), 'default')
+        self.assertFalse(self.router.allow_migrate(REPLICA_ALIAS, 'properties'))
+
+    def test_writes_pin_follow_up_reads(self):
+        reads, response = self.serve(RequestFactory().post(reverse('properties:property_list')))
+        self.assertEqual(reads, [None, None])
+        self.assertEqual(response.cookies[PIN_COOKIE]['max-age'], 10)
+
+        pinned = RequestFactory().get(reverse('properties:property_list'))
+        pinned.COOKIES[PIN_COOKIE] = '1'
+        self.assertEqual(self.serve(pinned)[0], [None, None])
+
+    def test_no_replica_configured(self):
+        del settings.DATABASES[REPLICA_ALIAS]
+        self.assertEqual(self.serve(RequestFactory().get(reverse('properties:property_list')))[0], [None, None])
@@ -19,9 +19,11 @@ from django.urls import path, include
 from django.conf import settings
 from django.conf.urls.static import static
 from django.contrib.auth import views as auth_views
+from . import metrics
 
 urlpatterns = [
     path('admin/', admin.site.urls),
+    path('metrics/', metrics.metrics, name='metrics'),
     
     # Simple authentication
     path('auth/', include('accounts.urls')),
@@ -30,6 +32,7 @@ urlpatterns = [
     path('', include('properties.urls')),
     path('bookings/', include('bookings.urls')),
     path('reviews/', include('reviews.urls')),
+    path('api/', include('api.urls')),
     path('auth/password_change/', auth_views.PasswordChangeView.as_view(template_name='auth/password_change.html'), name='password_change'),
     path('auth/password_change/done/', auth_views.PasswordChangeDoneView.as_view(template_name='auth/password_change_done.html'), name='password_change_done'),
 ]
@@ -0,0 +1,19 @@
+from django.contrib.auth import get_user_model
+from django.contrib.auth.backends import ModelBackend
+
+UserModel = get_user_model()
+
+
+class ProfileModelBackend(ModelBackend):
+    """ModelBackend that loads the user's profile in the same query as the user.
+
+    AuthenticationMiddleware resolves request.user through get_user(), so
+    role checks like request.user.userprofile.user_type cost no extra query.
+    """
+
+    def get_user(self, user_id):
+        try:
+            user = UserModel._default_manager.select_related('userprofile').get(pk=user_id)
+        except UserModel.DoesNotExist:
+            return None
+        return user if self.user_can_authenticate(user) else None
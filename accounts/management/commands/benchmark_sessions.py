@@ -0,0 +1,114 @@
+from concurrent.futures import ThreadPoolExecutor
+import statistics
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.contrib.sessions.models import Session
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+
+SESSION_STORES = ('db', 'cached_db', 'signed_cookies')
+
+
+class Command(BaseCommand):
+    help = ('Browse the property list as many concurrent logged-in users under each session '
+            'store and compare throughput, latency and django_session queries per request')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=200,
+            help='Number of concurrent logged-in users'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=10,
+            help='Property list requests per user'
+        )
+        parser.add_argument(
+            '--store',
+            action='append',
+            choices=SESSION_STORES,
+            help='Session store to measure (repeatable; default: all)'
+        )
+
+    def handle(self, *args, **options):
+        count = options['users']
+        prefix = f'loadtest-{uuid.uuid4().hex[:8]}'
+        users = [User.objects.create_user(f'{prefix}-{i}', password=None) for i in range(count)]
+        try:
+            for store in options['store'] or SESSION_STORES:
+                self.run(store, users, options['requests'])
+        finally:
+            User.objects.filter(username__startswith=prefix).delete()
+
+    def run(self, store, users, requests_per_user):
+        host = next((h.lstrip('.') for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost')
+        url = reverse('properties:property_list')
+        message_storage = (
+            'django.contrib.messages.storage.cookie.CookieStorage' if store == 'signed_cookies'
+            else 'django.contrib.messages.storage.fallback.FallbackStorage'
+        )
+        with override_settings(
+            SESSION_ENGINE=f'django.contrib.sessions.backends.{store}',
+            MESSAGE_STORAGE=message_storage,
+            # Every request is slow under this much contention; don't log each one
+            REQUEST_METRICS_SLOW_REQUEST_MS=None,
+        ):
+            clients = []
+            for user in users:
+                client = Client(HTTP_HOST=host)
+                client.force_login(user)
+                clients.append(client)
+
+            barrier = threading.Barrier(len(clients))
+            lock = threading.Lock()
+            session_queries = [0]
+
+            def count_session_queries(execute, sql, params, many, context):
+                if 'django_session' in sql:
+                    with lock:
+                        session_queries[0] += 1
+                return execute(sql, params, many, context)
+
+            def browse(client):
+                timings = []
+                errors = 0
+                try:
+                    with connections['default'].execute_wrapper(count_session_queries):
+                        barrier.wait()
+                        for _ in range(requests_per_user):
+                            start = time.perf_counter()
+                            if client.get(url).status_code != 200:
+                                errors += 1
+                            timings.append(time.perf_counter() - start)
+                finally:
+                    connections.close_all()
+                return timings, errors
+
+            start = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=len(clients)) as executor:
+                results = list(executor.map(browse, clients))
+            elapsed = time.perf_counter() - start
+
+            session_keys = [client.session.session_key for client in clients]
+        Session.objects.filter(session_key__in=session_keys).delete()
+
+        timings = sorted(t for user_timings, _ in results for t in user_timings)
+        errors = sum(user_errors for _, user_errors in results)
+        total = len(timings)
+        p95 = timings[min(int(total * 0.95), total - 1)]
+        style = self.style.ERROR if errors else self.style.SUCCESS
+        self.stdout.write(style(
+            f'{store:>14}: {total / elapsed:7.1f} req/s, p50 {statistics.median(timings) * 1000:.0f} ms, '
+            f'p95 {p95 * 1000:.0f} ms, {session_queries[0] / total:.2f} session queries/request, '
+            f'{errors} errors over {total} requests'
+        ))
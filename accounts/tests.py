@@ -1,3 +1,48 @@
-from django.test import TestCase
+from django.contrib.auth import BACKEND_SESSION_KEY, HASH_SESSION_KEY, SESSION_KEY
+from django.contrib.auth.models import User
+from django.urls import reverse
 
-# Create your tests here.
+from BookMyProperty.testing import TestCase
+from .models import UserProfile
+
+
+class ProfileTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('guest', 'guest@example.com', 'password')
+
+    def test_profile_edit_is_saved(self):
+        # The profile form saves UserProfile itself; no User post_save receiver is needed
+        self.client.force_login(self.user)
+        response = self.client.post(reverse('auth:profile'), {
+            'phone_number': '9876543210', 'user_type': 'owner', 'bio': 'Hosting in Pune',
+        })
+        self.assertRedirects(response, reverse('auth:profile'))
+        profile = UserProfile.objects.get(user=self.user)
+        self.assertEqual((profile.phone_number, profile.user_type, profile.bio), ('9876543210', 'owner', 'Hosting in Pune'))
+
+    def test_user_save_keeps_profile(self):
+        UserProfile.objects.filter(user=self.user).update(user_type='owner')
+        user = User.objects.get(pk=self.user.pk)
+        user.first_name = 'Asha'
+        user.save()
+        self.assertEqual(UserProfile.objects.get(user=self.user).user_type, 'owner')
+
+    def test_sessions_from_model_backend_stay_logged_in(self):
+        session = self.client.session
+        session[SESSION_KEY] = str(self.user.pk)
+        session[BACKEND_SESSION_KEY] = 'django.contrib.auth.backends.ModelBackend'
+        session[HASH_SESSION_KEY] = self.user.get_session_auth_hash()
+        session.save()
+        response = self.client.get(reverse('auth:profile'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['user'], self.user)
+
+    def test_signup_logs_in(self):
+        response = self.client.post(reverse('auth:signup'), {
+            'username': 'newguest', 'email': 'new@example.com', 'first_name': 'New', 'last_name': 'Guest',
+            'password1': 'a-long-Passphrase-42', 'password2': 'a-long-Passphrase-42',
+        })
+        self.assertEqual(response.status_code, 302)
+        self.assertEqual(self.client.session[BACKEND_SESSION_KEY], 'accounts.backends.ProfileModelBackend')
@@ -32,7 +32,8 @@ def signup_view(request):
         if form.is_valid():
             user = form.save(commit=False)
             user.save()
-            login(request, user)
+            # Several backends are configured, so name the one to record
+            login(request, user, backend='accounts.backends.ProfileModelBackend')
             messages.success(request, f'Welcome to BookMyProperty, {user.first_name}!')
             return redirect('properties:home')
         else:
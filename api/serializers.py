@@ -0,0 +1,95 @@
+"""Plain-dict serializers for the JSON API.
+
+Each serializer is a map of field name to a function of the instance, so
+?fields= selection only computes (and queries for) the fields asked for.
+"""
+from django.core.files.storage import default_storage
+from django.urls import reverse
+
+
+def serialize_image(image):
+    """Return an image's URL, size and variant srcsets, or None while it is processing"""
+    if image is None or image.status != 'ready':
+        return None
+    return {
+        'url': image.image.url,
+        'width': image.width,
+        'height': image.height,
+        'caption': image.caption or '',
+        'variants': {
+            extension: [[width, default_storage.url(path)] for width, path in entry['srcset']]
+            for extension, entry in (image.variants or {}).items()
+        },
+    }
+
+
+PROPERTY_LISTING_FIELDS = {
+    'id': lambda p: p.pk,
+    'url': lambda p: reverse('api:property_detail', args=[p.pk]),
+    'title': lambda p: p.title,
+    'property_type': lambda p: p.property_type,
+    'city': lambda p: p.city,
+    'state': lambda p: p.state,
+    'country': lambda p: p.country,
+    'bedrooms': lambda p: p.bedrooms,
+    'bathrooms': lambda p: p.bathrooms,
+    'max_guests': lambda p: p.max_guests,
+    'price_per_night': lambda p: str(p.price_per_night),
+    'average_rating': lambda p: round(p.average_rating, 2),
+    'review_count': lambda p: p.review_count,
+    'main_image': lambda p: serialize_image(p.main_image),
+    'latitude': lambda p: p.latitude,
+    'longitude': lambda p: p.longitude,
+    # Only set when the request searched around a location
+    'distance_km': lambda p: round(p.distance, 2) if getattr(p, 'distance', None) is not None else None,
+}
+
+PROPERTY_DETAIL_FIELDS = {
+    **PROPERTY_LISTING_FIELDS,
+    'description': lambda p: p.description,
+    'address': lambda p: p.address,
+    'zip_code': lambda p: p.zip_code,
+    'square_feet': lambda p: p.square_feet,
+    'price_per_week': lambda p: str(p.price_per_week) if p.price_per_week is not None else None,
+    'price_per_month': lambda p: str(p.price_per_month) if p.price_per_month is not None else None,
+    'is_available': lambda p: p.is_available,
+    'amenities': lambda p: [amenity.name for amenity in p.amenities.all()],
+    'images': lambda p: [data for data in map(serialize_image, p.images.all()) if data],
+    'rating_distribution': lambda p: p.rating_distribution,
+    'created_at': lambda p: p.created_at.isoformat(),
+    'updated_at': lambda p: p.updated_at.isoformat(),
+}
+
+REVIEW_FIELDS = {
+    'id': lambda r: r.pk,
+    'author': lambda r: r.user.username,
+    'rating': lambda r: r.rating,
+    'title': lambda r: r.title,
+    'comment': lambda r: r.comment,
+    'cleanliness_rating': lambda r: r.cleanliness_rating,
+    'communication_rating': lambda r: r.communication_rating,
+    'check_in_rating': lambda r: r.check_in_rating,
+    'accuracy_rating': lambda r: r.accuracy_rating,
+    'location_rating': lambda r: r.location_rating,
+    'value_rating': lambda r: r.value_rating,
+    'created_at': lambda r: r.created_at.isoformat(),
+}
+
+
+def parse_fields(request, field_map):
+    """Return the field names selected by ?fields=, or all of them.
+    
+    Raises ValueError naming any unknown field.
+    """
+    requested = request.GET.get('fields')
+    if not requested:
+        return list(field_map)
+    fields = [name.strip() for name in requested.split(',') if name.strip()]
+    unknown = [name for name in fields if name not in field_map]
+    if unknown:
+        raise ValueError(f"Unknown fields: {', '.join(unknown)}. Choose from: {', '.join(field_map)}.")
+    return fields
+
+
+def serialize(instance, field_map, fields):
+    return {name: field_map[name](instance) for name in fields}
@@ -0,0 +1,53 @@
+from django.contrib.auth.models import User
+from django.urls import reverse
+
+from BookMyProperty.testing import TestCase, create_property
+from properties.models import Property
+
+
+class ETagTests(TestCase):
+    """Revalidation should answer 304 until something the response shows changes"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', 'owner@example.com', 'password')
+        cls.properties = [create_property(cls.owner, title=f'Property {i}') for i in range(3)]
+
+    def etag(self, url):
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return response['ETag']
+
+    def test_if_none_match(self):
+        for url in (reverse('api:property_list'), reverse('api:property_detail', args=[self.properties[0].pk])):
+            etag = self.etag(url)
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, 304)
+            self.assertEqual(response['ETag'], etag)
+
+    def test_edit_changes_etag(self):
+        list_url = reverse('api:property_list')
+        detail_url = reverse('api:property_detail', args=[self.properties[0].pk])
+        list_etag, detail_etag = self.etag(list_url), self.etag(detail_url)
+
+        property_obj = Property.objects.get(pk=self.properties[0].pk)
+        property_obj.title = 'Renamed'
+        property_obj.save()
+
+        self.assertNotEqual(self.etag(list_url), list_etag)
+        self.assertNotEqual(self.etag(detail_url), detail_etag)
+        self.assertEqual(self.client.get(list_url, HTTP_IF_NONE_MATCH=list_etag).status_code, 200)
+
+    def test_delete_and_add_changes_list_etag(self):
+        url = reverse('api:property_list')
+        etag = self.etag(url)
+        removed = self.properties[1]
+        versions = Property.objects.filter(pk=removed.pk).values_list('cache_version', flat=True).get()
+
+        removed.delete()
+        added = create_property(self.owner, title='Replacement')
+        # Count and the cache_version sum come out exactly as before
+        Property.objects.filter(pk=added.pk).update(cache_version=versions)
+        self.assertEqual(Property.objects.count(), len(self.properties))
+
+        self.assertNotEqual(self.etag(url), etag)
@@ -0,0 +1,11 @@
+from django.urls import path
+from . import views
+
+app_name = 'api'
+
+urlpatterns = [
+    path('v1/properties/', views.property_list, name='property_list'),
+    path('v1/properties/<int:pk>/', views.property_detail, name='property_detail'),
+    path('v1/properties/<int:pk>/availability/', views.property_availability, name='property_availability'),
+    path('v1/properties/<int:pk>/reviews/', views.property_reviews, name='property_reviews'),
+]
@@ -0,0 +1,200 @@
+"""Read-only JSON API, version 1.
+
+Every response carries a strong ETag computed from the rows it depends on
+(Property.cache_version, or updated_at for reviews) plus the request's query
+string.
+The ETag is checked before the body is built, so a client or edge cache
+revalidating with If-None-Match gets a 304 for the cost of a cheap query.
+"""
+from datetime import date, timedelta
+import hashlib
+
+from django.conf import settings
+from django.core.paginator import Paginator
+from django.db.models import Count, Max, Prefetch, Sum, prefetch_related_objects
+from django.http import JsonResponse
+from django.utils.cache import get_conditional_response, patch_cache_control, quote_etag
+from django.views.decorators.http import require_safe
+
+from BookMyProperty.pagination import CursorPaginator
+from properties.forms import PropertySearchForm
+from properties.models import Property, PropertyImage
+from properties.views import apply_search_filters, order_properties
+from reviews.models import Review
+from .serializers import (
+    PROPERTY_DETAIL_FIELDS, PROPERTY_LISTING_FIELDS, REVIEW_FIELDS, parse_fields, serialize,
+)
+
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 50
+
+# Longest availability range returned in one response
+MAX_AVAILABILITY_DAYS = 366
+
+
+def json_response(data, status=200):
+    return JsonResponse(data, status=status, json_dumps_params={'separators': (',', ':')})
+
+
+def error(message, status=400):
+    return json_response({'error': message}, status=status)
+
+
+def conditional_json(request, version, build):
+    """Answer 304 if the client's ETag matches version, else the JSON from build()"""
+    etag = quote_etag(hashlib.md5(repr((request.get_full_path(), version)).encode(), usedforsecurity=False).hexdigest())
+    response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = json_response(build())
+    response['ETag'] = etag
+    patch_cache_control(response, public=True, max_age=settings.API_CACHE_MAX_AGE)
+    return response
+
+
+def page_size(request):
+    try:
+        return min(max(int(request.GET.get('limit', DEFAULT_PAGE_SIZE)), 1), MAX_PAGE_SIZE)
+    except ValueError:
+        return DEFAULT_PAGE_SIZE
+
+
+def page_link(request, **params):
+    query = request.GET.copy()
+    query.pop('page', None)
+    query.pop('cursor', None)
+    query.update(params)
+    return f'{request.path}?{query.urlencode()}'
+
+
+def paged(request, queryset, keyset_ordered):
+    """Return (page, next link, previous link).
+    
+    Newest-first querysets are walked with cursors; other orders fall back to page numbers.
+    """
+    if keyset_ordered:
+        page = CursorPaginator(queryset, page_size(request)).get_page(request.GET.get('cursor'))
+        next_link = page_link(request, cursor=page.next_cursor) if page.has_next() else None
+        previous_link = page_link(request, cursor=page.previous_cursor) if page.has_previous() else None
+    else:
+        page = Paginator(queryset, page_size(request)).get_page(request.GET.get('page'))
+        next_link = page_link(request, page=page.next_page_number()) if page.has_next() else None
+        previous_link = page_link(request, page=page.previous_page_number()) if page.has_previous() else None
+    return page, next_link, previous_link
+
+
+@require_safe
+def property_list(request):
+    """Listings, filtered and sorted with the same parameters as the HTML search"""
+    try:
+        fields = parse_fields(request, PROPERTY_LISTING_FIELDS)
+    except ValueError as exc:
+        return error(str(exc))
+    
+    search_form = PropertySearchForm(request.GET)
+    if not search_form.is_valid():
+        return json_response({'error': 'Invalid filters.', 'fields': search_form.errors}, status=400)
+    cleaned_data = search_form.cleaned_data
+    properties = apply_search_filters(Property.objects.all(), cleaned_data)
+    keyset_ordered = not (cleaned_data.get('sort') or cleaned_data.get('search'))
+    
+    # cache_version only ever grows, so the sum moves whenever a listing
+    # changes. A delete plus an add can leave count and sum as they were, but
+    # the new row always raises the newest id and updated_at.
+    version = properties.order_by().aggregate(
+        count=Count('pk'), versions=Sum('cache_version'), last_id=Max('pk'), updated=Max('updated_at')
+    )
+    
+    def build():
+        ordered = order_properties(properties.for_listing(), cleaned_data.get('sort'), ranked=bool(cleaned_data.get('search')))
+        page, next_link, previous_link = paged(request, ordered, keyset_ordered)
+        return {
+            'results': [serialize(property_obj, PROPERTY_LISTING_FIELDS, fields) for property_obj in page],
+            'next': next_link,
+            'previous': previous_link,
+        }
+    
+    return conditional_json(request, version, build)
+
+
+@require_safe
+def property_detail(request, pk):
+    try:
+        fields = parse_fields(request, PROPERTY_DETAIL_FIELDS)
+    except ValueError as exc:
+        return error(str(exc))
+    
+    property_obj = Property.objects.filter(pk=pk).first()
+    if property_obj is None:
+        return error('Property not found.', status=404)
+    
+    def build():
+        prefetch_related_objects(
+            [property_obj], Prefetch('images', queryset=PropertyImage.objects.order_by('-is_primary', 'pk'))
+        )
+        property_obj.listing_images = property_obj.images.all()[:1]
+        return serialize(property_obj, PROPERTY_DETAIL_FIELDS, fields)
+    
+    return conditional_json(request, property_obj.cache_version, build)
+
+
+@require_safe
+def property_availability(request, pk):
+    """Booked nights between ?start= and ?end= (ISO dates, end exclusive) as date ranges"""
+    property_obj = Property.objects.filter(pk=pk).first()
+    if property_obj is None:
+        return error('Property not found.', status=404)
+    
+    try:
+        start_date = date.fromisoformat(request.GET.get('start', date.today().isoformat()))
+        end_date = date.fromisoformat(request.GET['end']) if 'end' in request.GET else start_date + timedelta(days=90)
+    except ValueError:
+        return error('start and end must be ISO dates (YYYY-MM-DD).')
+    if not 0 < (end_date - start_date).days <= MAX_AVAILABILITY_DAYS:
+        return error(f'end must be after start and at most {MAX_AVAILABILITY_DAYS} days later.')
+    
+    # The bitmap is the whole cost, so it doubles as the version
+    bitmap = property_obj.occupancy_bitmap(start_date, end_date)
+    
+    def build():
+        booked = []
+        night = 0
+        while bitmap >> night:
+            if bitmap >> night & 1:
+                first = night
+                while bitmap >> night & 1:
+                    night += 1
+                booked.append([(start_date + timedelta(days=first)).isoformat(), (start_date + timedelta(days=night)).isoformat()])
+            else:
+                night += 1
+        return {
+            'property_id': property_obj.pk,
+            'start': start_date.isoformat(),
+            'end': end_date.isoformat(),
+            'booked': booked,
+        }
+    
+    return conditional_json(request, bitmap, build)
+
+
+@require_safe
+def property_reviews(request, pk):
+    """A property's reviews, newest first, cursor paged"""
+    try:
+        fields = parse_fields(request, REVIEW_FIELDS)
+    except ValueError as exc:
+        return error(str(exc))
+    if not Property.objects.filter(pk=pk).exists():
+        return error('Property not found.', status=404)
+    
+    reviews = Review.objects.filter(property_obj_id=pk)
+    version = reviews.order_by().aggregate(updated=Max('updated_at'), count=Count('pk'))
+    
+    def build():
+        page, next_link, previous_link = paged(request, reviews.select_related('user'), keyset_ordered=True)
+        return {
+            'results': [serialize(review, REVIEW_FIELDS, fields) for review in page],
+            'next': next_link,
+            'previous': previous_link,
+        }
+    
+    return conditional_json(request, version, build)
@@ -1,8 +1,32 @@
-from django.contrib import admin
+from django import forms
+from django.contrib import admin, messages
+from django.core.exceptions import ValidationError
+from django.db import transaction
 from .models import Booking
 
+class BookingAdminForm(forms.ModelForm):
+    class Meta:
+        model = Booking
+        fields = '__all__'
+    
+    def clean(self):
+        cleaned_data = super().clean()
+        booking = Booking(
+            pk=self.instance.pk,
+            property_obj=cleaned_data.get('property_obj'),
+            check_in_date=cleaned_data.get('check_in_date'),
+            check_out_date=cleaned_data.get('check_out_date'),
+            status=cleaned_data.get('status', self.instance.status),
+        )
+        if (booking.property_obj_id and booking.check_in_date and booking.check_out_date
+                and booking.status in Booking.ACTIVE_STATUSES
+                and booking.overlapping_bookings().exists()):
+            raise forms.ValidationError(Booking.UNAVAILABLE_MESSAGE)
+        return cleaned_data
+
 @admin.register(Booking)
 class BookingAdmin(admin.ModelAdmin):
+    form = BookingAdminForm
     list_display = ('property_obj', 'guest', 'check_in_date', 'check_out_date', 'status', 'total_price', 'created_at')
     list_filter = ('status', 'check_in_date', 'check_out_date', 'created_at')
     search_fields = ('property_obj__title', 'guest__username', 'guest__email', 'property_obj__city')
@@ -26,17 +50,40 @@ class BookingAdmin(admin.ModelAdmin):
     
     actions = ['confirm_bookings', 'cancel_bookings', 'complete_bookings']
     
+    def _change_status(self, request, queryset, status):
+        """Save each selected booking with the new status, skipping any whose nights are taken"""
+        changed, skipped = 0, []
+        # One transaction, so a failure leaves every selected booking as it was
+        with transaction.atomic():
+            for booking in queryset.exclude(status=status).select_related('property_obj', 'guest'):
+                booking.status = status
+                if status in Booking.ACTIVE_STATUSES and booking.overlapping_bookings().exists():
+                    skipped.append(booking)
+                    continue
+                try:
+                    # save() rebuilds the booked nights and bumps the property's cache version
+                    booking.save(update_fields=['status'])
+                except ValidationError:
+                    skipped.append(booking)
+                    continue
+                changed += 1
+        self.message_user(request, f'{changed} bookings have been {status}.')
+        if skipped:
+            self.message_user(
+                request,
+                f'{len(skipped)} bookings were not {status} because their nights are already booked: '
+                + '; '.join(str(booking) for booking in skipped),
+                messages.WARNING
+            )
+    
     def confirm_bookings(self, request, queryset):
-        updated = queryset.update(status='confirmed')
-        self.message_user(request, f'{updated} bookings have been confirmed.')
+        self._change_status(request, queryset, 'confirmed')
     confirm_bookings.short_description = "Confirm selected bookings"
     
     def cancel_bookings(self, request, queryset):
-        updated = queryset.update(status='cancelled')
-        self.message_user(request, f'{updated} bookings have been cancelled.')
+        self._change_status(request, queryset, 'cancelled')
     cancel_bookings.short_description = "Cancel selected bookings"
     
     def complete_bookings(self, request, queryset):
-        updated = queryset.update(status='completed')
-        self.message_user(request, f'{updated} bookings have been completed.')
+        self._change_status(request, queryset, 'completed')
     complete_bookings.short_description = "Complete selected bookings"
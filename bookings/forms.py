@@ -36,20 +36,7 @@ class BookingForm(forms.ModelForm):
             if check_in_date < date.today():
                 raise forms.ValidationError("Check-in date cannot be in the past.")
             
-            # Check for overlapping bookings
-            if self.property_obj:
-                overlapping_bookings = Booking.objects.filter(
-                    property_obj=self.property_obj,
-                    status__in=['confirmed', 'pending'],
-                    check_in_date__lt=check_out_date,
-                    check_out_date__gt=check_in_date
-                )
-                
-                if self.instance.pk:
-                    overlapping_bookings = overlapping_bookings.exclude(pk=self.instance.pk)
-                
-                if overlapping_bookings.exists():
-                    raise forms.ValidationError("This property is already booked for the selected dates.")
+            # Availability is checked once, under the property lock, by Booking.reserve()
         
         if number_of_guests and self.property_obj and number_of_guests > self.property_obj.max_guests:
             raise forms.ValidationError(f"Maximum {self.property_obj.max_guests} guests allowed for this property.")
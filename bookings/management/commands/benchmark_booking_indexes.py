@@ -0,0 +1,144 @@
+from datetime import date, timedelta
+import random
+import time
+import uuid
+
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connection, transaction
+from bookings.models import Booking
+from properties.models import Property
+
+class Command(BaseCommand):
+    help = ('Load a synthetic booking dataset inside a rolled-back transaction and compare '
+            'query plans and timings for the hot booking queries with and without their indexes')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--bookings',
+            type=int,
+            default=1000000,
+            help='Number of synthetic bookings to load'
+        )
+        parser.add_argument(
+            '--properties',
+            type=int,
+            default=10000,
+            help='Number of synthetic properties to spread the bookings over'
+        )
+        parser.add_argument(
+            '--guests',
+            type=int,
+            default=5000,
+            help='Number of synthetic guests to spread the bookings over'
+        )
+        parser.add_argument(
+            '--repeat',
+            type=int,
+            default=20,
+            help='Times to run each query when timing it'
+        )
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            property_ids, guest_ids = self.load_dataset(options)
+            property_id = random.choice(property_ids)
+            guest_id = random.choice(guest_ids)
+            check_in_date = date.today() + timedelta(days=30)
+
+            queries = {
+                'availability check': Booking.objects.filter(
+                    property_obj_id=property_id,
+                    status__in=Booking.ACTIVE_STATUSES,
+                    check_in_date__lt=check_in_date + timedelta(days=3),
+                    check_out_date__gt=check_in_date
+                ).order_by().values('pk')[:1],
+                'guest booking list': Booking.objects.filter(guest_id=guest_id).order_by('-created_at').values('pk')[:10],
+            }
+
+            self.stdout.write(self.style.MIGRATE_HEADING('With indexes'))
+            self.report(queries, options['repeat'], 'with indexes')
+
+            with connection.cursor() as cursor:
+                for index in Booking._meta.indexes:
+                    cursor.execute(f'DROP INDEX {connection.ops.quote_name(index.name)}')
+                # The foreign key indexes would otherwise stand in for the composite ones
+                for field in ('property_obj', 'guest'):
+                    for name in self.foreign_key_indexes(cursor, field):
+                        cursor.execute(f'DROP INDEX {connection.ops.quote_name(name)}')
+
+            self.stdout.write(self.style.MIGRATE_HEADING('Without indexes'))
+            self.report(queries, options['repeat'], 'without indexes')
+
+            transaction.set_rollback(True)
+
+        self.stdout.write(self.style.SUCCESS('Benchmark finished; synthetic data and index changes were rolled back'))
+
+    def load_dataset(self, options):
+        prefix = f'bench-{uuid.uuid4().hex[:8]}'
+        self.stdout.write(
+            f"Loading {options['properties']} properties, {options['guests']} guests "
+            f"and {options['bookings']} bookings..."
+        )
+
+        owner = User.objects.create(username=f'{prefix}-owner')
+        User.objects.bulk_create(
+            [User(username=f'{prefix}-{i}') for i in range(options['guests'])], batch_size=5000
+        )
+        Property.objects.bulk_create([
+            Property(
+                owner=owner, title=f'{prefix} {i}', description='-', property_type='other',
+                address='-', city='-', state='-', zip_code='-', bedrooms=1, bathrooms=1,
+                max_guests=2, price_per_night=1000,
+            )
+            for i in range(options['properties'])
+        ], batch_size=5000)
+        property_ids = list(Property.objects.filter(owner=owner).values_list('pk', flat=True))
+        guest_ids = list(User.objects.filter(username__startswith=f'{prefix}-').exclude(pk=owner.pk).values_list('pk', flat=True))
+
+        statuses = [status for status, _ in Booking.STATUS_CHOICES]
+        first_day = date.today() - timedelta(days=365)
+        remaining = options['bookings']
+        while remaining:
+            batch = []
+            for _ in range(min(remaining, 10000)):
+                check_in_date = first_day + timedelta(days=random.randrange(730))
+                batch.append(Booking(
+                    property_obj_id=random.choice(property_ids),
+                    guest_id=random.choice(guest_ids),
+                    check_in_date=check_in_date,
+                    check_out_date=check_in_date + timedelta(days=random.randint(1, 14)),
+                    total_price=1000,
+                    price_per_night=1000,
+                    status=random.choice(statuses),
+                ))
+            Booking.objects.bulk_create(batch)
+            remaining -= len(batch)
+
+        with connection.cursor() as cursor:
+            cursor.execute('ANALYZE')
+        return property_ids, guest_ids
+
+    def foreign_key_indexes(self, cursor, field_name):
+        column = Booking._meta.get_field(field_name).column
+        constraints = connection.introspection.get_constraints(cursor, Booking._meta.db_table)
+        return [
+            name for name, info in constraints.items()
+            if info['index'] and not info['primary_key'] and info['columns'] == [column]
+        ]
+
+    def report(self, queries, repeat, phase):
+        for label, queryset in queries.items():
+            start = time.perf_counter()
+            for _ in range(repeat):
+                list(queryset.all())
+            elapsed = (time.perf_counter() - start) / repeat * 1000
+            self.stdout.write(f'{label}: {elapsed:.2f} ms per query')
+
+            # Tag the statement with the phase: sqlite3 caches prepared
+            # statements, and a cached EXPLAIN would show the old plan
+            sql, params = queryset.query.sql_with_params()
+            with connection.cursor() as cursor:
+                cursor.execute(f'{connection.ops.explain_query_prefix()} {sql} /* {phase} */', params)
+                for row in cursor.fetchall():
+                    self.stdout.write(f'    {row[-1]}')
@@ -0,0 +1,164 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+import logging
+import random
+import sqlite3
+import threading
+import time
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import OperationalError, connections
+from django.test import Client
+from django.test.utils import override_settings
+from django.urls import reverse
+from properties.models import Property
+
+# SQLite's defaults, as the project ran before it was tuned
+BASELINE_PRAGMAS = {
+    'journal_mode': 'DELETE',
+    'synchronous': 'FULL',
+    'mmap_size': 0,
+    'cache_size': -2000,
+    'busy_timeout': 5000,
+}
+
+
+class Command(BaseCommand):
+    help = ('Run a mixed property_list / booking_create load under the stock SQLite settings and '
+            'under the tuned profile from settings.SQLITE_PRAGMAS, and compare throughput')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--users',
+            type=int,
+            default=50,
+            help='Number of concurrent logged-in tenants'
+        )
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=20,
+            help='Requests per tenant'
+        )
+        parser.add_argument(
+            '--write-ratio',
+            type=float,
+            default=0.2,
+            help='Share of requests that are booking_create POSTs'
+        )
+        parser.add_argument(
+            '--properties',
+            type=int,
+            default=20,
+            help='Number of synthetic properties to book'
+        )
+
+    def handle(self, *args, **options):
+        database = connections['default']
+        if database.vendor != 'sqlite':
+            raise CommandError('This benchmark only applies to SQLite databases.')
+
+        prefix = f'loadtest-{uuid.uuid4().hex[:8]}'
+        owner = User.objects.create_user(f'{prefix}-owner', password=None)
+        tenants = [User.objects.create_user(f'{prefix}-{i}', password=None) for i in range(options['users'])]
+        try:
+            property_ids = [
+                Property.objects.create(
+                    owner=owner, title=f'{prefix} property {i}', description='Load test listing',
+                    property_type='other', address='-', city='-', state='-', zip_code='-',
+                    bedrooms=1, bathrooms=1, max_guests=2, price_per_night=1000,
+                ).pk
+                for i in range(options['properties'])
+            ]
+            profiles = (
+                ('stock', BASELINE_PRAGMAS, 0),
+                ('tuned', settings.SQLITE_PRAGMAS, database.settings_dict['CONN_MAX_AGE']),
+            )
+            for name, pragmas, conn_max_age in profiles:
+                self.run(name, pragmas, conn_max_age, tenants, property_ids, options)
+        finally:
+            self.apply_profile(settings.SQLITE_PRAGMAS, database.settings_dict['CONN_MAX_AGE'])
+            User.objects.filter(username__startswith=prefix).delete()
+
+    def apply_profile(self, pragmas, conn_max_age):
+        """Point new connections at the given pragmas and switch the file's journal mode"""
+        connections.close_all()
+        database_settings = connections['default'].settings_dict
+        # The journal mode is stored in the database file and can only change
+        # while nothing else has it open, so set it once here
+        with sqlite3.connect(database_settings['NAME']) as raw:
+            raw.execute(f"PRAGMA journal_mode={pragmas['journal_mode']}")
+        raw.close()
+        database_settings['OPTIONS']['init_command'] = ';'.join(
+            f'PRAGMA {name}={value}' for name, value in pragmas.items() if name != 'journal_mode'
+        )
+        database_settings['CONN_MAX_AGE'] = conn_max_age
+
+    def run(self, name, pragmas, conn_max_age, tenants, property_ids, options):
+        self.apply_profile(pragmas, conn_max_age)
+        host = next((h.lstrip('.') for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost')
+        list_url = reverse('properties:property_list')
+
+        # Every request is slow under this much contention; don't log each one
+        with override_settings(REQUEST_METRICS_SLOW_REQUEST_MS=None):
+            clients = []
+            for tenant in tenants:
+                client = Client(HTTP_HOST=host)
+                client.force_login(tenant)
+                clients.append(client)
+            connections.close_all()
+
+            barrier = threading.Barrier(len(clients))
+
+            def browse(client):
+                rng = random.Random()
+                counts = {'reads': 0, 'writes': 0, 'errors': 0}
+                timings = []
+                try:
+                    barrier.wait()
+                    for _ in range(options['requests']):
+                        start = time.perf_counter()
+                        try:
+                            if rng.random() < options['write_ratio']:
+                                counts['writes'] += 1
+                                check_in_date = date.today() + timedelta(days=rng.randrange(1, 300))
+                                client.post(reverse('bookings:booking_create', args=[rng.choice(property_ids)]), {
+                                    'check_in_date': check_in_date.isoformat(),
+                                    'check_out_date': (check_in_date + timedelta(days=rng.randrange(1, 4))).isoformat(),
+                                    'number_of_guests': 1,
+                                })
+                            else:
+                                counts['reads'] += 1
+                                client.get(list_url)
+                        except OperationalError:
+                            # 'database is locked' once busy_timeout runs out
+                            counts['errors'] += 1
+                        timings.append(time.perf_counter() - start)
+                finally:
+                    connections.close_all()
+                return counts, timings
+
+            # Locked errors are counted below; keep their tracebacks out of the report
+            request_logger = logging.getLogger('django.request')
+            level = request_logger.level
+            request_logger.setLevel(logging.CRITICAL)
+            start = time.perf_counter()
+            try:
+                with ThreadPoolExecutor(max_workers=len(clients)) as executor:
+                    results = list(executor.map(browse, clients))
+            finally:
+                request_logger.setLevel(level)
+            elapsed = time.perf_counter() - start
+
+        totals = {key: sum(counts[key] for counts, _ in results) for key in ('reads', 'writes', 'errors')}
+        timings = sorted(t for _, user_timings in results for t in user_timings)
+        p95 = timings[min(int(len(timings) * 0.95), len(timings) - 1)]
+        style = self.style.ERROR if totals['errors'] else self.style.SUCCESS
+        self.stdout.write(style(
+            f'{name:>6}: {(len(timings) - totals["errors"]) / elapsed:7.1f} successful req/s '
+            f'({totals["reads"]} reads, {totals["writes"]} writes), '
+            f'p95 {p95 * 1000:.0f} ms, {totals["errors"]} locked errors'
+        ))
@@ -0,0 +1,77 @@
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+import threading
+import uuid
+
+from django.conf import settings
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand
+from django.db import connections
+from django.test import Client
+from django.urls import reverse
+from bookings.models import Booking
+from properties.models import Property
+
+class Command(BaseCommand):
+    help = 'Send concurrent booking requests for the same nights and check that exactly one succeeds'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--requests',
+            type=int,
+            default=50,
+            help='Number of concurrent booking requests'
+        )
+
+    def handle(self, *args, **options):
+        count = options['requests']
+        prefix = f'loadtest-{uuid.uuid4().hex[:8]}'
+        host = next((h.lstrip('.') for h in settings.ALLOWED_HOSTS if h != '*'), 'localhost')
+        
+        owner = User.objects.create_user(f'{prefix}-owner', password=None)
+        tenants = [User.objects.create_user(f'{prefix}-{i}', password=None) for i in range(count)]
+        try:
+            property_obj = Property.objects.create(
+                owner=owner, title=f'{prefix} property', description='Load test listing',
+                property_type='other', address='-', city='-', state='-', zip_code='-',
+                bedrooms=1, bathrooms=1, max_guests=2, price_per_night=1000,
+            )
+            check_in_date = date.today() + timedelta(days=30)
+            url = reverse('bookings:booking_create', args=[property_obj.pk])
+            data = {
+                'check_in_date': check_in_date.isoformat(),
+                'check_out_date': (check_in_date + timedelta(days=3)).isoformat(),
+                'number_of_guests': 1,
+            }
+            
+            clients = []
+            for tenant in tenants:
+                client = Client(HTTP_HOST=host)
+                client.force_login(tenant)
+                clients.append(client)
+            
+            barrier = threading.Barrier(count)
+            
+            def send(client):
+                try:
+                    barrier.wait()
+                    return client.post(url, data).status_code
+                finally:
+                    connections.close_all()
+            
+            with ThreadPoolExecutor(max_workers=count) as executor:
+                statuses = list(executor.map(send, clients))
+            
+            stored = Booking.objects.filter(property_obj=property_obj).count()
+        finally:
+            User.objects.filter(username__startswith=prefix).delete()
+        
+        # A confirmed booking redirects to its detail page; a refused one re-renders the form
+        accepted = statuses.count(302)
+        refused = statuses.count(200)
+        failed = count - accepted - refused
+        style = self.style.SUCCESS if stored == accepted == 1 and not failed else self.style.ERROR
+        self.stdout.write(
+            style(f'{accepted} accepted, {refused} refused, {failed} failed out of {count} concurrent requests; '
+                  f'{stored} booking(s) stored')
+        )
@@ -1,5 +1,7 @@
-from django.core.management.base import BaseCommand
-from bookings.models import Booking
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import F, Q
+from bookings.models import Booking, BookedNight
 from properties.models import Property
 from django.utils import timezone
 from datetime import date
@@ -7,49 +9,76 @@ from datetime import date
 class Command(BaseCommand):
     help = 'Update booking statuses based on current date and fix property availability'
 
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=1000,
+            help='Number of rows to update per transaction'
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report what would change without writing anything'
+        )
+
     def handle(self, *args, **options):
         today = date.today()
-        updated_bookings = 0
-        fixed_properties = 0
-        
-        # Get all confirmed bookings that have ended
+        batch_size = options['batch_size']
+        if batch_size < 1:
+            raise CommandError('--batch-size must be at least 1.')
+
+        # Confirmed bookings that have ended
         expired_bookings = Booking.objects.filter(
             status='confirmed',
             check_out_date__lt=today
         )
-        
-        for booking in expired_bookings:
-            booking.status = 'completed'
-            booking.completed_at = timezone.now()
-            booking.save(update_fields=['status', 'completed_at'])
-            
-            # Make property available again
-            property_obj = booking.property_obj
-            property_obj.is_available = True
-            property_obj.status = 'available'
-            property_obj.save(update_fields=['is_available', 'status'])
-            
-            updated_bookings += 1
-            self.stdout.write(
-                self.style.SUCCESS(f'Updated booking {booking.id} to completed and made property available')
-            )
-        
-        # Fix properties that have completed bookings but are still marked as unavailable
+
+        # Properties with completed stays that are still marked unavailable
         properties_to_fix = Property.objects.filter(
-            bookings__status='completed',
-            is_available=False
-        ).distinct()
-        
-        for property_obj in properties_to_fix:
-            property_obj.is_available = True
-            property_obj.status = 'available'
-            property_obj.save(update_fields=['is_available', 'status'])
-            
-            fixed_properties += 1
+            Q(is_available=False) | Q(status='booked'),
+            bookings__status='completed'
+        )
+
+        if options['dry_run']:
+            would_fix = Property.objects.filter(
+                Q(is_available=False) | Q(status='booked'),
+                Q(bookings__status='completed') | Q(bookings__in=expired_bookings)
+            ).distinct().count()
             self.stdout.write(
-                self.style.SUCCESS(f'Fixed property {property_obj.id}: {property_obj.title} - made available')
+                f'Dry run: would update {expired_bookings.count()} booking statuses and fix {would_fix} properties'
             )
-        
+            return
+
+        updated_bookings = 0
+        while True:
+            # Short transactions keep locks brief while live traffic runs
+            with transaction.atomic():
+                booking_ids = list(expired_bookings.order_by('pk').values_list('pk', flat=True)[:batch_size])
+                if not booking_ids:
+                    break
+                # Re-checking the status skips bookings cancelled since the ids were read
+                updated = Booking.objects.filter(pk__in=booking_ids, status='confirmed').update(
+                    status='completed',
+                    completed_at=timezone.now()
+                )
+                BookedNight.objects.filter(booking_id__in=booking_ids, booking__status='completed').delete()
+                Property.objects.filter(bookings__in=booking_ids).bump_cache_version()
+            updated_bookings += updated
+            self.stdout.write(f'Updated {updated} bookings to completed')
+
+        fixed_properties = 0
+        while True:
+            with transaction.atomic():
+                property_ids = list(properties_to_fix.order_by('pk').values_list('pk', flat=True).distinct()[:batch_size])
+                if not property_ids:
+                    break
+                fixed = Property.objects.filter(pk__in=property_ids).update(
+                    is_available=True, status='available', cache_version=F('cache_version') + 1
+                )
+            fixed_properties += fixed
+            self.stdout.write(f'Made {fixed} properties available')
+
         self.stdout.write(
             self.style.SUCCESS(f'Successfully updated {updated_bookings} booking statuses and fixed {fixed_properties} properties')
-        ) 
\ No newline at end of file
+        )
@@ -0,0 +1,42 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:03
+
+import django.db.models.deletion
+from datetime import timedelta
+from django.db import migrations, models
+
+
+def populate_booked_nights(apps, schema_editor):
+    Booking = apps.get_model('bookings', 'Booking')
+    BookedNight = apps.get_model('bookings', 'BookedNight')
+    nights = []
+    for booking in Booking.objects.filter(status__in=['confirmed', 'pending']).iterator():
+        for i in range((booking.check_out_date - booking.check_in_date).days):
+            nights.append(BookedNight(
+                property_obj_id=booking.property_obj_id,
+                booking_id=booking.pk,
+                night=booking.check_in_date + timedelta(days=i),
+            ))
+    BookedNight.objects.bulk_create(nights, batch_size=1000, ignore_conflicts=True)
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0002_remove_booking_guests_count_booking_number_of_guests'),
+        ('properties', '0002_alter_property_country_alter_property_status'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='BookedNight',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('night', models.DateField()),
+                ('booking', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booked_nights', to='bookings.booking')),
+                ('property_obj', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='booked_nights', to='properties.property')),
+            ],
+            options={
+                'unique_together': {('property_obj', 'night')},
+            },
+        ),
+        migrations.RunPython(populate_booked_nights, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:40
+
+from django.db import migrations
+
+
+def add_overlap_constraint(apps, schema_editor):
+    # PostgreSQL can reject overlapping stays itself; other databases rely on
+    # the unique (property, night) index on BookedNight
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+    schema_editor.execute(
+        "ALTER TABLE bookings_booking ADD CONSTRAINT bookings_booking_no_overlap "
+        "EXCLUDE USING gist (property_obj_id WITH =, daterange(check_in_date, check_out_date) WITH &&) "
+        "WHERE (status IN ('confirmed', 'pending'))"
+    )
+
+
+def remove_overlap_constraint(apps, schema_editor):
+    if schema_editor.connection.vendor != 'postgresql':
+        return
+    schema_editor.execute("ALTER TABLE bookings_booking DROP CONSTRAINT IF EXISTS bookings_booking_no_overlap")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0003_bookednight'),
+    ]
+
+    operations = [
+        migrations.RunPython(add_overlap_constraint, remove_overlap_constraint),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('bookings', '0004_booking_no_overlap_constraint'),
+        ('properties', '0005_property_indexes'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['property_obj', 'status', 'check_in_date', 'check_out_date'], name='booking_overlap_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='booking',
+            index=models.Index(fields=['guest', '-created_at'], name='booking_guest_created_idx'),
+        ),
+    ]
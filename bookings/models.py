@@ -1,9 +1,11 @@
-from django.db import models
+from django.db import IntegrityError, models, transaction
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from properties.models import Property
 from django.core.exceptions import ValidationError
 from django.utils import timezone
-from datetime import date
+from datetime import date, timedelta
 
 class Booking(models.Model):
     STATUS_CHOICES = (
@@ -13,6 +15,14 @@ class Booking(models.Model):
         ('pending', 'Pending'),
     )
     
+    # Statuses that hold the property's nights
+    ACTIVE_STATUSES = ('confirmed', 'pending')
+    
+    UNAVAILABLE_MESSAGE = "This property is already booked for the selected dates."
+    
+    # Fields that decide which nights a booking occupies
+    OCCUPANCY_FIELDS = {'property_obj', 'check_in_date', 'check_out_date', 'status'}
+    
     property_obj = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='bookings')
     guest = models.ForeignKey(User, on_delete=models.CASCADE, related_name='bookings')
     check_in_date = models.DateField()
@@ -38,39 +48,78 @@ class Booking(models.Model):
         return f"{self.property_obj.title} - {self.guest.email} ({self.check_in_date} to {self.check_out_date})"
     
     def clean(self):
-        """Validate booking dates and availability"""
+        """Validate booking dates; availability is enforced when the booking is saved"""
         if self.check_in_date and self.check_out_date:
             if self.check_in_date >= self.check_out_date:
                 raise ValidationError("Check-out date must be after check-in date.")
             
             if self.check_in_date < date.today():
                 raise ValidationError("Check-in date cannot be in the past.")
-            
-            # Check for overlapping bookings
-            overlapping_bookings = Booking.objects.filter(
-                property_obj=self.property_obj,
-                status__in=['confirmed', 'pending'],
-                check_in_date__lt=self.check_out_date,
-                check_out_date__gt=self.check_in_date
-            )
-            
-            if self.pk:
-                overlapping_bookings = overlapping_bookings.exclude(pk=self.pk)
-            
-            if overlapping_bookings.exists():
-                raise ValidationError("This property is already booked for the selected dates.")
+    
+    def overlapping_bookings(self):
+        """Return other confirmed or pending bookings that share a night with this one"""
+        overlapping_bookings = Booking.objects.filter(
+            property_obj_id=self.property_obj_id,
+            status__in=self.ACTIVE_STATUSES,
+            check_in_date__lt=self.check_out_date,
+            check_out_date__gt=self.check_in_date
+        )
+        if self.pk:
+            overlapping_bookings = overlapping_bookings.exclude(pk=self.pk)
+        return overlapping_bookings
+    
+    def reserve(self):
+        """Save a new booking if its nights are still free.
+        
+        The property row is locked for the length of the transaction, so
+        concurrent requests for the same property queue up and only one of
+        them can claim a given night. On SQLite, where row locks do not
+        exist, the IMMEDIATE transaction mode serializes writers instead.
+        """
+        with transaction.atomic():
+            Property.objects.select_for_update().only('pk').get(pk=self.property_obj_id)
+            if self.overlapping_bookings().exists():
+                raise ValidationError(self.UNAVAILABLE_MESSAGE)
+            self.save()
     
     def save(self, *args, **kwargs):
-        # Only run validation if not updating specific fields
-        if not kwargs.get('update_fields'):
-            self.clean()
-        super().save(*args, **kwargs)
+        # The unique (property, night) index rejects double bookings from any code path
+        update_fields = kwargs.get('update_fields')
+        with transaction.atomic():
+            super().save(*args, **kwargs)
+            if not update_fields or self.OCCUPANCY_FIELDS.intersection(update_fields):
+                try:
+                    self.sync_booked_nights()
+                except IntegrityError:
+                    # Only a night held by another booking means "already booked";
+                    # sync_booked_nights rolled back to its savepoint, so we can look
+                    taken = BookedNight.objects.filter(
+                        property_obj_id=self.property_obj_id, night__in=self.nights
+                    ).exclude(booking=self)
+                    if not taken.exists():
+                        raise
+                    raise ValidationError(self.UNAVAILABLE_MESSAGE)
+    
+    def sync_booked_nights(self):
+        """Rebuild this booking's rows in the per-night occupancy index"""
+        with transaction.atomic():
+            self.booked_nights.all().delete()
+            if self.status in self.ACTIVE_STATUSES:
+                BookedNight.objects.bulk_create([
+                    BookedNight(property_obj_id=self.property_obj_id, booking=self, night=night)
+                    for night in self.nights
+                ])
     
     @property
     def duration_nights(self):
         """Calculate the number of nights"""
         return (self.check_out_date - self.check_in_date).days
     
+    @property
+    def nights(self):
+        """Return the dates of every night covered by the booking"""
+        return [self.check_in_date + timedelta(days=i) for i in range(self.duration_nights)]
+    
     @property
     def is_active(self):
         """Check if booking is currently active"""
@@ -115,7 +164,7 @@ class Booking(models.Model):
                 # Make property available again
                 self.property_obj.is_available = True
                 self.property_obj.status = 'available'
-                self.property_obj.save()
+                self.property_obj.save(update_fields=['is_available', 'status', 'updated_at'])
             elif self.check_in_date <= today <= self.check_out_date:
                 # Booking is currently active
                 pass  # Keep as confirmed
@@ -125,3 +174,37 @@ class Booking(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            # Availability checks: property, active status, then the date range
+            models.Index(fields=['property_obj', 'status', 'check_in_date', 'check_out_date'],
+                         name='booking_overlap_idx'),
+            # A guest's bookings, newest first
+            models.Index(fields=['guest', '-created_at'], name='booking_guest_created_idx'),
+        ]
+
+
+@receiver(post_save, sender=Booking)
+@receiver(post_delete, sender=Booking)
+def bump_property_cache_version(sender, instance, **kwargs):
+    Property.objects.filter(pk=instance.property_obj_id).bump_cache_version()
+
+class BookedNight(models.Model):
+    """One row per night held by a confirmed or pending booking.
+    
+    The unique (property, night) index lets availability searches exclude
+    booked properties with a single anti-join instead of an overlap scan.
+    """
+    property_obj = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='booked_nights')
+    booking = models.ForeignKey(Booking, on_delete=models.CASCADE, related_name='booked_nights')
+    night = models.DateField()
+    
+    def __str__(self):
+        return f"{self.property_obj_id} - {self.night}"
+    
+    @classmethod
+    def booked_between(cls, check_in_date, check_out_date):
+        """Nights held between check-in (inclusive) and check-out (exclusive)"""
+        return cls.objects.filter(night__gte=check_in_date, night__lt=check_out_date)
+    
+    class Meta:
+        unique_together = ['property_obj', 'night']
@@ -1,3 +1,234 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.exceptions import ValidationError
+from django.core.management import CommandError, call_command
+from django.db import IntegrityError, connection
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from BookMyProperty.testing import TestCase, create_property
+from properties.models import Property
+from .models import Booking, BookedNight
+
+
+class BookingCreateTests(TestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('owner', 'owner@example.com', 'password')
+        cls.tenant = User.objects.create_user('tenant', 'tenant@example.com', 'password')
+        cls.property = create_property(
+            owner, title='Sea View', property_type='villa', address='1 Beach Road', city='Goa', state='Goa',
+            zip_code='403001',
+        )
+        cls.check_in_date = date.today() + timedelta(days=10)
+        cls.url = reverse('bookings:booking_create', args=[cls.property.pk])
+
+    def post_booking(self, nights=3, offset=0):
+        check_in_date = self.check_in_date + timedelta(days=offset)
+        return self.client.post(self.url, {
+            'check_in_date': check_in_date.isoformat(),
+            'check_out_date': (check_in_date + timedelta(days=nights)).isoformat(),
+            'number_of_guests': 2,
+        })
+
+    def setUp(self):
+        self.client.force_login(self.tenant)
+
+    def test_conflict_query_runs_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.post_booking()
+        overlap_queries = [
+            query for query in queries.captured_queries
+            if 'FROM "bookings_booking"' in query['sql'] and '"check_out_date" >' in query['sql']
+        ]
+        self.assertEqual(len(overlap_queries), 1)
+        booking = Booking.objects.get()
+        self.assertRedirects(response, reverse('bookings:booking_detail', args=[booking.pk]))
+        self.assertEqual(booking.total_price, 3000)
+        self.assertEqual(BookedNight.objects.filter(booking=booking).count(), 3)
+
+    def test_overlapping_request_is_refused(self):
+        self.post_booking()
+        response = self.post_booking(offset=2)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_unique_night_index_blocks_unchecked_saves(self):
+        self.post_booking()
+        booking = Booking(
+            property_obj=self.property, guest=self.tenant, check_in_date=self.check_in_date,
+            check_out_date=self.check_in_date + timedelta(days=1), total_price=1000, price_per_night=1000,
+        )
+        with self.assertRaises(ValidationError):
+            booking.save()
+        self.assertEqual(Booking.objects.count(), 1)
+
+    def test_other_integrity_errors_are_not_masked(self):
+        booking = Booking(
+            property_obj=self.property, guest=self.tenant, check_in_date=self.check_in_date,
+            check_out_date=self.check_in_date + timedelta(days=1), total_price=1000, price_per_night=1000,
+        )
+        with mock.patch.object(BookedNight.objects, 'bulk_create', side_effect=IntegrityError('NOT NULL constraint failed')):
+            with self.assertRaises(IntegrityError):
+                booking.save()
+        self.assertFalse(Booking.objects.exists())
+
+
+class BookingAdminActionTests(TestCase):
+    """Admin status actions must not confirm a booking over someone else's nights"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        tenant = User.objects.create_user('tenant', 'tenant@example.com', 'password')
+        property_obj = create_property(cls.admin)
+        check_in_date = date.today() + timedelta(days=10)
+        cls.cancelled, cls.rebooked, cls.free = (
+            Booking.objects.create(
+                property_obj=property_obj, guest=tenant, check_in_date=check_in_date + timedelta(days=offset),
+                check_out_date=check_in_date + timedelta(days=offset + 2), total_price=2000, price_per_night=1000,
+                status=status,
+            )
+            for offset, status in ((0, 'cancelled'), (1, 'confirmed'), (5, 'cancelled'))
+        )
+
+    def run_action(self, action, *bookings):
+        self.client.force_login(self.admin)
+        response = self.client.post(reverse('admin:bookings_booking_changelist'), {
+            'action': action, '_selected_action': [booking.pk for booking in bookings],
+        }, follow=True)
+        self.assertEqual(response.status_code, 200)
+        return [str(message) for message in response.context['messages']]
+
+    def test_confirm_skips_rebooked_nights(self):
+        messages = self.run_action('confirm_bookings', self.cancelled, self.free)
+        self.assertEqual(messages[0], '1 bookings have been confirmed.')
+        self.assertIn('1 bookings were not confirmed', messages[1])
+        self.assertEqual(Booking.objects.get(pk=self.cancelled.pk).status, 'cancelled')
+        self.assertEqual(Booking.objects.get(pk=self.free.pk).status, 'confirmed')
+        self.assertEqual(
+            sorted(BookedNight.objects.values_list('booking_id', flat=True)),
+            [self.rebooked.pk] * 2 + [self.free.pk] * 2
+        )
+
+    def test_cancel_frees_nights(self):
+        self.run_action('cancel_bookings', self.rebooked)
+        self.assertFalse(BookedNight.objects.exists())
+        self.run_action('confirm_bookings', self.cancelled)
+        self.assertEqual(BookedNight.objects.filter(booking=self.cancelled).count(), 2)
+
+
+class AvailabilitySearchTests(TestCase):
+    """Date searches should drop booked properties until their nights are freed"""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('owner', 'owner@example.com', 'password')
+        cls.tenant = User.objects.create_user('tenant', 'tenant@example.com', 'password')
+        cls.property = create_property(owner, title='Booked')
+        create_property(owner, title='Free')
+        cls.check_in_date = date.today() + timedelta(days=10)
+
+    def book(self, check_in_date, nights=3):
+        return Booking.objects.create(
+            property_obj=self.property, guest=self.tenant, check_in_date=check_in_date,
+            check_out_date=check_in_date + timedelta(days=nights), total_price=nights * 1000, price_per_night=1000,
+        )
+
+    def search(self, first_night, nights):
+        response = self.client.get(reverse('properties:property_search'), {
+            'check_in': first_night.isoformat(),
+            'check_out': (first_night + timedelta(days=nights)).isoformat(),
+        })
+        self.assertEqual(response.status_code, 200)
+        return {property_obj.title for property_obj in response.context['properties']}
+
+    def test_booked_property_drops_out(self):
+        self.book(self.check_in_date)
+        self.assertEqual(self.search(self.check_in_date + timedelta(days=1), 1), {'Free'})
+        self.assertEqual(self.search(self.check_in_date - timedelta(days=2), 10), {'Free'})
+        # Stays that end on check-in day or start on check-out day fit
+        self.assertEqual(self.search(self.check_in_date - timedelta(days=2), 2), {'Booked', 'Free'})
+        self.assertEqual(self.search(self.check_in_date + timedelta(days=3), 2), {'Booked', 'Free'})
+
+    def test_cancel_complete_and_delete_free_the_nights(self):
+        for release in (Booking.cancel_booking, Booking.complete_booking, Booking.delete):
+            booking = self.book(self.check_in_date)
+            self.assertEqual(self.search(self.check_in_date, 3), {'Free'})
+            release(booking)
+            self.assertEqual(self.search(self.check_in_date, 3), {'Booked', 'Free'}, release.__name__)
+
+    def test_status_command_frees_ended_stays(self):
+        check_in_date = date.today() - timedelta(days=5)
+        self.book(check_in_date)
+        self.assertEqual(self.search(check_in_date, 3), {'Free'})
+        call_command('update_booking_statuses', stdout=StringIO())
+        self.assertEqual(self.search(check_in_date, 3), {'Booked', 'Free'})
+
+
+class UpdateBookingStatusesTests(TestCase):
+    """Ended stays should complete, free their nights and re-list their properties"""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('owner', 'owner@example.com', 'password')
+        tenant = User.objects.create_user('tenant', 'tenant@example.com', 'password')
+        cls.properties = [
+            create_property(owner, title=f'Property {i}', is_available=False, status='booked') for i in range(3)
+        ]
+        today = date.today()
+        cls.ended = [
+            Booking.objects.create(
+                property_obj=property_obj, guest=tenant, check_in_date=today - timedelta(days=4),
+                check_out_date=today - timedelta(days=1), total_price=3000, price_per_night=1000,
+            )
+            for property_obj in cls.properties
+        ]
+        cls.current = Booking.objects.create(
+            property_obj=cls.properties[0], guest=tenant, check_in_date=today,
+            check_out_date=today + timedelta(days=2), total_price=2000, price_per_night=1000,
+        )
+
+    def run_command(self, **options):
+        out = StringIO()
+        call_command('update_booking_statuses', stdout=out, **options)
+        return out.getvalue()
+
+    def statuses(self):
+        return list(Booking.objects.order_by('pk').values_list('status', flat=True))
+
+    def test_completes_ended_stays(self):
+        self.assertEqual(BookedNight.objects.count(), 11)
+        output = self.run_command()
+        self.assertIn('Successfully updated 3 booking statuses and fixed 3 properties', output)
+        self.assertEqual(self.statuses(), ['completed'] * 3 + ['confirmed'])
+        # Only the current stay still holds nights
+        self.assertEqual(set(BookedNight.objects.values_list('booking_id', flat=True)), {self.current.pk})
+        self.assertFalse(Property.objects.exclude(is_available=True, status='available').exists())
+        self.assertIn('fixed 0 properties', self.run_command())
+
+    def test_dry_run_writes_nothing(self):
+        versions = list(Property.objects.order_by('pk').values_list('cache_version', flat=True))
+        output = self.run_command(dry_run=True)
+        self.assertIn('would update 3 booking statuses and fix 3 properties', output)
+        self.assertEqual(self.statuses(), ['confirmed'] * 4)
+        self.assertEqual(BookedNight.objects.count(), 11)
+        self.assertEqual(list(Property.objects.order_by('pk').values_list('cache_version', flat=True)), versions)
+        self.assertEqual(Property.objects.filter(is_available=False, status='booked').count(), 3)
+
+    def test_batches(self):
+        output = self.run_command(batch_size=2)
+        self.assertEqual(output.count('Updated 2 bookings to completed'), 1)
+        self.assertEqual(output.count('Updated 1 bookings to completed'), 1)
+        self.assertIn('Made 2 properties available', output)
+        self.assertIn('Made 1 properties available', output)
+        self.assertEqual(self.statuses(), ['completed'] * 3 + ['confirmed'])
+
+    def test_rejects_batch_size_below_one(self):
+        for batch_size in (0, -5):
+            with self.assertRaises(CommandError):
+                call_command('update_booking_statuses', batch_size=batch_size)
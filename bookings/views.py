@@ -1,13 +1,14 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.paginator import Paginator
+from django.core.exceptions import ValidationError
 from django.utils import timezone
 from datetime import datetime
 from .models import Booking
 from .forms import BookingForm, BookingCancellationForm
-from properties.models import Property
+from properties.models import Property, primary_image_prefetch
 from reviews.models import Review
+from BookMyProperty.pagination import paginate
 
 @login_required
 def booking_list(request):
@@ -16,12 +17,12 @@ def booking_list(request):
         messages.error(request, 'Only tenants can view bookings.')
         return redirect('properties:home')
     
-    bookings = Booking.objects.filter(guest=request.user).order_by('-created_at')
+    bookings = Booking.objects.filter(guest=request.user).select_related('property_obj').prefetch_related(
+        primary_image_prefetch('property_obj__images')
+    ).order_by('-created_at')
     
     # Pagination
-    paginator = Paginator(bookings, 10)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    page_obj = paginate(request, bookings, 10)
     
     context = {
         'bookings': page_obj,
@@ -46,23 +47,13 @@ def booking_create(request, property_id):
         if form.is_valid():
             booking = form.save(commit=False)
             booking.guest = request.user
+            booking.status = 'confirmed'  # Instant booking
             
-            # Check for date conflicts
-            conflicting_bookings = Booking.objects.filter(
-                property_obj=property_obj,
-                check_in_date__lt=booking.check_out_date,
-                check_out_date__gt=booking.check_in_date,
-                status__in=['confirmed', 'pending']
-            )
-            
-            if conflicting_bookings.exists():
+            try:
+                booking.reserve()
+            except ValidationError:
                 messages.error(request, 'The selected dates are not available. Please choose different dates.')
             else:
-                # Calculate total amount
-                nights = (booking.check_out_date - booking.check_in_date).days
-                booking.total_price = nights * property_obj.price_per_night
-                booking.status = 'confirmed'  # Instant booking
-                booking.save()
                 messages.success(request, f'Booking confirmed! Your total is ₹{booking.total_price}.')
                 return redirect('bookings:booking_detail', pk=booking.pk)
     else:
@@ -123,7 +114,7 @@ def booking_cancel(request, pk):
             property_obj = booking.property_obj
             property_obj.is_available = True
             property_obj.status = 'available'
-            property_obj.save()
+            property_obj.save(update_fields=['is_available', 'status', 'updated_at'])
             
             messages.success(request, 'Booking cancelled successfully.')
             return redirect('bookings:booking_list')
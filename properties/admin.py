@@ -17,7 +17,8 @@ class PropertyAdmin(admin.ModelAdmin):
     list_display = ('title', 'owner', 'property_type', 'city', 'price_per_night', 'status', 'is_available', 'created_at')
     list_filter = ('property_type', 'status', 'is_available', 'instant_booking_enabled', 'created_at')
     search_fields = ('title', 'description', 'address', 'city', 'state', 'owner__username', 'owner__email')
-    readonly_fields = ('created_at', 'updated_at')
+    readonly_fields = ('created_at', 'updated_at', 'rating_sum', 'rating_count',
+                       'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count')
     inlines = [PropertyImageInline]
     filter_horizontal = ('amenities',)
     
@@ -40,6 +41,11 @@ class PropertyAdmin(admin.ModelAdmin):
         ('Features', {
             'fields': ('amenities',)
         }),
+        ('Ratings', {
+            'fields': ('rating_sum', 'rating_count', 'rating_1_count', 'rating_2_count',
+                       'rating_3_count', 'rating_4_count', 'rating_5_count'),
+            'classes': ('collapse',)
+        }),
         ('Timestamps', {
             'fields': ('created_at', 'updated_at'),
             'classes': ('collapse',)
@@ -48,7 +54,7 @@ class PropertyAdmin(admin.ModelAdmin):
 
 @admin.register(PropertyImage)
 class PropertyImageAdmin(admin.ModelAdmin):
-    list_display = ('property', 'caption', 'is_primary', 'created_at')
-    list_filter = ('is_primary', 'created_at')
+    list_display = ('property', 'caption', 'is_primary', 'status', 'created_at')
+    list_filter = ('is_primary', 'status', 'created_at')
     search_fields = ('property__title', 'caption')
     readonly_fields = ('created_at',)
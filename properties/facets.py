@@ -0,0 +1,150 @@
+"""Facet counts for the property list filters.
+
+One query groups the listings by (property_type, city, price bucket,
+bedrooms, whether the price is in the filtered range). It leaves the
+property type, city, bedroom and price filters out of the SQL and applies
+them to the grouped rows in Python. Each facet then counts
+the other filters but not its own, so it shows what each choice would give,
+not only the choice already made. Results are cached briefly, keyed by the
+normalized filter values.
+"""
+from decimal import Decimal
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import BooleanField, Case, Count, IntegerField, Q, QuerySet, Value, When
+
+from .models import Property
+
+# Filters evaluated on the grouped rows instead of in SQL
+FACET_FILTERS = ('property_type', 'city', 'bedrooms', 'min_price', 'max_price')
+
+# Nightly price bucket edges; the last bucket is open-ended
+PRICE_BUCKETS = (0, 1000, 2500, 5000, 10000)
+
+# Bedroom facet options, as minimum bedroom counts
+BEDROOM_OPTIONS = (1, 2, 3, 4, 5)
+
+# Cities listed in the facet, most listings first
+MAX_CITIES = 10
+
+
+def _cache_key(cleaned_data):
+    normalized = []
+    for name, value in sorted(cleaned_data.items()):
+        if name == 'sort' or value in (None, ''):
+            continue
+        if isinstance(value, str):
+            value = value.strip().lower()
+        elif isinstance(value, QuerySet):
+            value = sorted(obj.pk for obj in value)
+            if not value:
+                continue
+        elif isinstance(value, Decimal):
+            value = value.normalize()
+        normalized.append((name, str(value)))
+    digest = hashlib.md5(repr(normalized).encode(), usedforsecurity=False).hexdigest()
+    return f'properties.facets:{digest}'
+
+
+def _price_bucket():
+    return Case(
+        *[When(price_per_night__lt=upper, then=Value(i)) for i, upper in enumerate(PRICE_BUCKETS[1:])],
+        default=Value(len(PRICE_BUCKETS) - 1),
+        output_field=IntegerField()
+    )
+
+
+def _in_price_range(cleaned_data):
+    # The same conditions apply_search_filters() would add
+    condition = Q()
+    if cleaned_data.get('min_price'):
+        condition &= Q(price_per_night__gte=cleaned_data['min_price'])
+    if cleaned_data.get('max_price'):
+        condition &= Q(price_per_night__lte=cleaned_data['max_price'])
+    if not condition:
+        return Value(True)
+    return Case(When(condition, then=Value(True)), default=Value(False), output_field=BooleanField())
+
+
+def _price_label(index):
+    lower = PRICE_BUCKETS[index]
+    if index == len(PRICE_BUCKETS) - 1:
+        return f'₹{lower:,}+'
+    upper = PRICE_BUCKETS[index + 1]
+    return f'Under ₹{upper:,}' if lower == 0 else f'₹{lower:,} – ₹{upper:,}'
+
+
+def _compute(properties, cleaned_data):
+    rows = list(
+        properties.order_by().annotate(price_bucket=_price_bucket(), in_price_range=_in_price_range(cleaned_data))
+        .values_list('property_type', 'city', 'price_bucket', 'bedrooms', 'in_price_range')
+        .annotate(count=Count('pk'))
+    )
+    property_type = cleaned_data.get('property_type')
+    city = (cleaned_data.get('city') or '').lower()
+    bedrooms = cleaned_data.get('bedrooms')
+
+    def matching(skip):
+        for row_type, row_city, bucket, row_bedrooms, in_price_range, count in rows:
+            if skip != 'price' and not in_price_range:
+                continue
+            if skip != 'property_type' and property_type and row_type != property_type:
+                continue
+            if skip != 'city' and city and city not in row_city.lower():
+                continue
+            if skip != 'bedrooms' and bedrooms and row_bedrooms < bedrooms:
+                continue
+            yield row_type, row_city, bucket, row_bedrooms, count
+
+    type_counts, city_counts, price_counts, bedroom_counts = {}, {}, {}, {}
+    for row_type, _, _, _, count in matching('property_type'):
+        type_counts[row_type] = type_counts.get(row_type, 0) + count
+    for _, row_city, _, _, count in matching('city'):
+        city_counts[row_city] = city_counts.get(row_city, 0) + count
+    for _, _, bucket, _, count in matching('price'):
+        price_counts[bucket] = price_counts.get(bucket, 0) + count
+    for _, _, _, row_bedrooms, count in matching('bedrooms'):
+        bedroom_counts[row_bedrooms] = bedroom_counts.get(row_bedrooms, 0) + count
+
+    return {
+        'total': sum(count for *_, count in matching(None)),
+        'property_type': [
+            {'value': value, 'label': label, 'count': type_counts.get(value, 0)}
+            for value, label in Property.PROPERTY_TYPES if type_counts.get(value)
+        ],
+        'city': [
+            {'value': value, 'label': value, 'count': count}
+            for value, count in sorted(city_counts.items(), key=lambda item: (-item[1], item[0]))[:MAX_CITIES]
+        ],
+        'price': [
+            {
+                'min_price': PRICE_BUCKETS[i] or None,
+                'max_price': PRICE_BUCKETS[i + 1] - Decimal('0.01') if i + 1 < len(PRICE_BUCKETS) else None,
+                'label': _price_label(i),
+                'count': price_counts.get(i, 0),
+            }
+            for i in range(len(PRICE_BUCKETS)) if price_counts.get(i)
+        ],
+        'bedrooms': [
+            {'value': minimum, 'label': f'{minimum}+', 'count': count}
+            for minimum, count in (
+                (minimum, sum(n for value, n in bedroom_counts.items() if value >= minimum))
+                for minimum in BEDROOM_OPTIONS
+            ) if count
+        ],
+    }
+
+
+def facet_counts(properties, cleaned_data):
+    """Return facet counts for validated PropertySearchForm data.
+
+    properties must already be narrowed by every filter except FACET_FILTERS.
+    """
+    key = _cache_key(cleaned_data)
+    facets = cache.get(key)
+    if facets is None:
+        facets = _compute(properties, cleaned_data)
+        cache.set(key, facets, getattr(settings, 'FACET_CACHE_TIMEOUT', 60))
+    return facets
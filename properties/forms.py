@@ -6,7 +6,7 @@ class PropertyForm(forms.ModelForm):
         model = Property
         fields = [
             'title', 'description', 'property_type', 'address', 'city', 'state', 
-            'zip_code', 'country', 'bedrooms', 'bathrooms', 'max_guests', 
+            'zip_code', 'country', 'latitude', 'longitude', 'bedrooms', 'bathrooms', 'max_guests', 
             'square_feet', 'price_per_night', 'price_per_week', 'price_per_month',
             'is_available', 'status', 'instant_booking_enabled', 'amenities'
         ]
@@ -17,6 +17,8 @@ class PropertyForm(forms.ModelForm):
             'price_per_week': forms.NumberInput(attrs={'min': '0', 'step': '0.01'}),
             'price_per_month': forms.NumberInput(attrs={'min': '0', 'step': '0.01'}),
             'amenities': forms.CheckboxSelectMultiple(),
+            'latitude': forms.NumberInput(attrs={'step': 'any'}),
+            'longitude': forms.NumberInput(attrs={'step': 'any'}),
         }
     
     def __init__(self, *args, **kwargs):
@@ -35,6 +37,21 @@ class PropertyImageForm(forms.ModelForm):
 
 class PropertySearchForm(forms.Form):
     PROPERTY_TYPES = [('', 'All Types')] + list(Property.PROPERTY_TYPES)
+    SORT_CHOICES = [
+        ('', 'Newest First'),
+        ('rating', 'Top Rated'),
+        ('price_low', 'Price: Low to High'),
+        ('price_high', 'Price: High to Low'),
+        ('distance', 'Distance'),
+    ]
+    RADIUS_CHOICES = [
+        (5, 'Within 5 km'),
+        (10, 'Within 10 km'),
+        (25, 'Within 25 km'),
+        (50, 'Within 50 km'),
+        (100, 'Within 100 km'),
+    ]
+    DEFAULT_RADIUS = 25
     
     search = forms.CharField(
         max_length=100, 
@@ -73,6 +90,11 @@ class PropertySearchForm(forms.Form):
         min_value=1,
         widget=forms.NumberInput(attrs={'placeholder': 'Min Guests', 'min': '1'})
     )
+    amenities = forms.ModelMultipleChoiceField(
+        queryset=Amenity.objects.order_by('name'),
+        required=False,
+        widget=forms.CheckboxSelectMultiple()
+    )
     check_in = forms.DateField(
         required=False,
         widget=forms.DateInput(attrs={'type': 'date'})
@@ -81,6 +103,31 @@ class PropertySearchForm(forms.Form):
         required=False,
         widget=forms.DateInput(attrs={'type': 'date'})
     )
+    # Filled in from the browser's location by the "Near me" button
+    latitude = forms.FloatField(
+        required=False,
+        min_value=-90,
+        max_value=90,
+        widget=forms.HiddenInput()
+    )
+    longitude = forms.FloatField(
+        required=False,
+        min_value=-180,
+        max_value=180,
+        widget=forms.HiddenInput()
+    )
+    radius = forms.TypedChoiceField(
+        choices=RADIUS_CHOICES,
+        coerce=int,
+        required=False,
+        empty_value=None,
+        initial=DEFAULT_RADIUS
+    )
+    sort = forms.ChoiceField(
+        choices=SORT_CHOICES,
+        required=False,
+        initial=''
+    )
     
     def clean(self):
         cleaned_data = super().clean()
@@ -95,4 +142,16 @@ class PropertySearchForm(forms.Form):
         if min_price and max_price and min_price > max_price:
             raise forms.ValidationError("Minimum price cannot be greater than maximum price.")
         
+        has_latitude = cleaned_data.get('latitude') is not None
+        has_longitude = cleaned_data.get('longitude') is not None
+        if has_latitude != has_longitude:
+            raise forms.ValidationError("Latitude and longitude must be given together.")
+        
+        if has_latitude and not cleaned_data.get('radius'):
+            # Every location search is bounded, so it never scans the whole catalogue
+            cleaned_data['radius'] = self.DEFAULT_RADIUS
+        
+        if cleaned_data.get('sort') == 'distance' and not has_latitude:
+            raise forms.ValidationError("Share your location to sort by distance.")
+        
         return cleaned_data 
\ No newline at end of file
@@ -0,0 +1,126 @@
+"""Geohash cells and great-circle distances for "near me" search.
+
+Property.geohash holds a fixed-precision geohash of the listing's
+coordinates. A radius search first covers the circle's bounding box with a
+few geohash cells. Each cell is a contiguous range of the indexed geohash
+column, so the database only reads listings in those cells, however large
+the catalogue is. The exact haversine distance is then computed for those
+candidates alone.
+"""
+import math
+
+from django.db.models import ExpressionWrapper, F, FloatField, Q, Value
+from django.db.models.functions import ASin, Cos, Least, Power, Radians, Sin, Sqrt
+
+EARTH_RADIUS_KM = 6371.0088
+
+# Stored precision; 9 characters is a cell of about 5 m x 5 m
+GEOHASH_PRECISION = 9
+
+# Most cells a radius search will OR together before it picks coarser ones
+MAX_COVER_CELLS = 9
+
+_BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+
+def _cell_bits(precision):
+    """Return the (latitude, longitude) bit counts of a geohash of this length"""
+    bits = precision * 5
+    return bits // 2, bits - bits // 2
+
+
+def _index(value, low, high, bits):
+    return min(int((value - low) / (high - low) * (1 << bits)), (1 << bits) - 1)
+
+
+def _encode_index(lat_index, lon_index, precision):
+    """Return the geohash of the cell at the given latitude and longitude indexes"""
+    lat_bits, lon_bits = _cell_bits(precision)
+    value = 0
+    # Geohash interleaves the bits, longitude first
+    for i in range(precision * 5):
+        if i % 2 == 0:
+            lon_bits -= 1
+            value = (value << 1) | ((lon_index >> lon_bits) & 1)
+        else:
+            lat_bits -= 1
+            value = (value << 1) | ((lat_index >> lat_bits) & 1)
+    return ''.join(_BASE32[(value >> shift) & 31] for shift in range((precision - 1) * 5, -1, -5))
+
+
+def encode(latitude, longitude, precision=GEOHASH_PRECISION):
+    """Return the geohash of a point"""
+    lat_bits, lon_bits = _cell_bits(precision)
+    return _encode_index(
+        _index(latitude, -90.0, 90.0, lat_bits),
+        _index(longitude, -180.0, 180.0, lon_bits),
+        precision
+    )
+
+
+def bounding_box(latitude, longitude, radius_km):
+    """Return (min_lat, max_lat, min_lon, max_lon) around a circle.
+
+    The longitude span is None when the circle reaches a pole.
+    """
+    delta_lat = math.degrees(radius_km / EARTH_RADIUS_KM)
+    min_lat, max_lat = latitude - delta_lat, latitude + delta_lat
+    spread = math.sin(radius_km / EARTH_RADIUS_KM) / math.cos(math.radians(latitude))
+    if min_lat <= -90 or max_lat >= 90 or spread >= 1:
+        return max(min_lat, -90.0), min(max_lat, 90.0), None, None
+    delta_lon = math.degrees(math.asin(spread))
+    return min_lat, max_lat, longitude - delta_lon, longitude + delta_lon
+
+
+def covering_cells(latitude, longitude, radius_km):
+    """Return the geohash prefixes whose cells together cover a circle.
+
+    Uses the longest prefixes that need at most MAX_COVER_CELLS cells.
+    """
+    min_lat, max_lat, min_lon, max_lon = bounding_box(latitude, longitude, radius_km)
+    for precision in range(GEOHASH_PRECISION, 0, -1):
+        lat_bits, lon_bits = _cell_bits(precision)
+        lat_range = range(_index(min_lat, -90.0, 90.0, lat_bits), _index(max_lat, -90.0, 90.0, lat_bits) + 1)
+        if min_lon is None or max_lon - min_lon >= 360:
+            lon_range = range(1 << lon_bits)
+        else:
+            # Indexes past either edge wrap around the antimeridian
+            width = 360.0 / (1 << lon_bits)
+            lon_range = range(math.floor((min_lon + 180) / width), math.floor((max_lon + 180) / width) + 1)
+        if len(lat_range) * len(lon_range) <= MAX_COVER_CELLS or precision == 1:
+            return sorted({
+                _encode_index(lat_index, lon_index % (1 << lon_bits), precision)
+                for lat_index in lat_range for lon_index in lon_range
+            })
+
+
+def cell_filter(cells, field='geohash'):
+    """Return a Q matching geohashes that start with any of the given cells"""
+    query = Q()
+    for cell in cells:
+        # A range rather than startswith, so every backend can use the index;
+        # '~' sorts after every geohash character
+        query |= Q(**{f'{field}__gte': cell, f'{field}__lt': cell + '~'})
+    return query
+
+
+def haversine(latitude, longitude, lat_field='latitude', lon_field='longitude'):
+    """Return an expression for the distance in km from a point to each row"""
+    lat, lon = math.radians(latitude), math.radians(longitude)
+    row_lat = Radians(F(lat_field))
+    half_chord = (
+        Power(Sin((row_lat - Value(lat)) / 2), 2)
+        + Value(math.cos(lat)) * Cos(row_lat) * Power(Sin((Radians(F(lon_field)) - Value(lon)) / 2), 2)
+    )
+    # Rounding can push the chord just past 1, outside ASIN's domain
+    return ExpressionWrapper(
+        Value(2 * EARTH_RADIUS_KM) * ASin(Sqrt(Least(half_chord, Value(1.0)))),
+        output_field=FloatField()
+    )
+
+
+def distance_km(lat1, lon1, lat2, lon2):
+    """Return the great-circle distance between two points in km"""
+    lat1, lon1, lat2, lon2 = map(math.radians, (lat1, lon1, lat2, lon2))
+    half_chord = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lon2 - lon1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(half_chord, 1.0)))
@@ -0,0 +1,111 @@
+"""Upload-time processing for PropertyImage files.
+
+The uploaded original is re-encoded without its EXIF block (which can carry
+the GPS position of the owner's camera) and capped at MAX_DIMENSION. Resized
+variants are then written next to it in each output format the installed
+Pillow can encode. The paths are stored on the image so templates can build
+a srcset without touching storage.
+"""
+import os
+from io import BytesIO
+
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from PIL import Image, ImageOps
+
+# Widths generated for every image; larger widths are clamped to the original's
+VARIANT_WIDTHS = (320, 640, 1024, 1600)
+
+# Longest side kept for the re-encoded original
+MAX_DIMENSION = 2400
+
+# Output formats in order of preference: (format, extension, MIME type, save options)
+VARIANT_FORMATS = (
+    ('AVIF', 'avif', 'image/avif', {'quality': 60}),
+    ('WEBP', 'webp', 'image/webp', {'quality': 80, 'method': 4}),
+    ('JPEG', 'jpg', 'image/jpeg', {'quality': 82, 'optimize': True, 'progressive': True}),
+)
+
+
+class ImageProcessingError(Exception):
+    """The uploaded file could not be read as an image"""
+
+
+def supported_formats():
+    """Return the VARIANT_FORMATS entries this Pillow build can write"""
+    Image.init()
+    return [entry for entry in VARIANT_FORMATS if entry[0] in Image.SAVE]
+
+
+def _encode(image, image_format, options):
+    buffer = BytesIO()
+    if image_format == 'JPEG' and image.mode != 'RGB':
+        image = image.convert('RGB')
+    image.save(buffer, image_format, **options)
+    return buffer.getvalue()
+
+
+def _variant_dir(property_image):
+    return f'properties/variants/{property_image.pk}'
+
+
+def delete_variants(property_image):
+    """Remove every stored variant file of an image"""
+    for entry in (property_image.variants or {}).values():
+        for _, path in entry['srcset']:
+            default_storage.delete(path)
+
+
+def process_property_image(property_image):
+    """Strip metadata, record dimensions and write resized variants.
+
+    Saves ``image``, ``width``, ``height`` and ``variants`` on the instance and
+    marks it ready.
+    Raises ImageProcessingError if the file is not a readable image.
+    """
+    try:
+        with property_image.image.open('rb') as source:
+            original = Image.open(source)
+            original_format = original.format
+            # Bake the EXIF orientation into the pixels before the tag is dropped
+            image = ImageOps.exif_transpose(original)
+            image.load()
+    except (OSError, Image.DecompressionBombError) as exc:
+        raise ImageProcessingError(f'Cannot read {property_image.image.name}: {exc}') from exc
+
+    if image.mode not in ('RGB', 'RGBA'):
+        image = image.convert('RGBA' if 'transparency' in image.info or image.mode in ('LA', 'PA') else 'RGB')
+    image.thumbnail((MAX_DIMENSION, MAX_DIMENSION), Image.LANCZOS)
+
+    # Re-encode the original in its own format; anything unusual becomes JPEG
+    if original_format not in ('JPEG', 'PNG', 'WEBP'):
+        original_format = 'JPEG'
+    options = dict(next((entry[3] for entry in VARIANT_FORMATS if entry[0] == original_format), {}))
+    extension = {'JPEG': 'jpg', 'PNG': 'png', 'WEBP': 'webp'}[original_format]
+    stem = os.path.splitext(os.path.basename(property_image.image.name))[0]
+    old_name = property_image.image.name
+    property_image.image.save(f'{stem}.{extension}', ContentFile(_encode(image, original_format, options)), save=False)
+    if old_name != property_image.image.name:
+        default_storage.delete(old_name)
+
+    delete_variants(property_image)
+    width, height = image.size
+    widths = sorted({min(w, width) for w in VARIANT_WIDTHS})
+    variants = {}
+    for image_format, variant_extension, mime_type, variant_options in supported_formats():
+        srcset = []
+        for variant_width in widths:
+            variant = image.copy()
+            variant.thumbnail((variant_width, height), Image.LANCZOS)
+            path = default_storage.save(
+                f'{_variant_dir(property_image)}/{stem}-{variant.width}.{variant_extension}',
+                ContentFile(_encode(variant, image_format, variant_options))
+            )
+            srcset.append([variant.width, path])
+        variants[variant_extension] = {'type': mime_type, 'srcset': srcset}
+
+    property_image.width = width
+    property_image.height = height
+    property_image.variants = variants
+    property_image.status = 'ready'
+    property_image.save(update_fields=['image', 'width', 'height', 'variants', 'status'])
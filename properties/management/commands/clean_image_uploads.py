@@ -0,0 +1,28 @@
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from properties.models import ImageUpload
+
+class Command(BaseCommand):
+    help = 'Delete chunked image uploads that were abandoned before completing'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--hours',
+            type=int,
+            default=24,
+            help='Delete uploads with no new chunk for this many hours'
+        )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(hours=options['hours'])
+        abandoned = ImageUpload.objects.filter(updated_at__lt=cutoff)
+        
+        # Delete one by one so the partial files go too
+        deleted = 0
+        for upload in abandoned.iterator():
+            upload.delete()
+            deleted += 1
+        
+        self.stdout.write(self.style.SUCCESS(f'Deleted {deleted} abandoned uploads'))
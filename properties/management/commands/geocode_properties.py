@@ -0,0 +1,84 @@
+import csv
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from properties import geo
+from properties.models import Property
+
+def _normalize(value):
+    return ' '.join((value or '').split()).lower()
+
+class Command(BaseCommand):
+    help = ('Fill in property coordinates from a local CSV gazetteer, matching on zip code and '
+            'then on city and state. The CSV needs latitude and longitude columns and any of '
+            'zip_code, city, state and country.')
+
+    def add_arguments(self, parser):
+        parser.add_argument('gazetteer', help='Path to the gazetteer CSV file')
+        parser.add_argument(
+            '--overwrite',
+            action='store_true',
+            help='Also re-geocode properties that already have coordinates'
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=500,
+            help='Properties written per UPDATE batch'
+        )
+
+    def handle(self, *args, **options):
+        by_zip_code, by_city = self.load(options['gazetteer'])
+
+        properties = Property.objects.only('pk', 'zip_code', 'city', 'state', 'country')
+        if not options['overwrite']:
+            properties = properties.filter(latitude__isnull=True)
+
+        matched, unmatched, batch = 0, 0, []
+        with transaction.atomic():
+            for property_obj in properties.iterator(chunk_size=options['batch_size']):
+                country = _normalize(property_obj.country)
+                point = (
+                    by_zip_code.get((country, _normalize(property_obj.zip_code)))
+                    or by_city.get((country, _normalize(property_obj.state), _normalize(property_obj.city)))
+                )
+                if point is None:
+                    unmatched += 1
+                    continue
+                # bulk_update skips save(), so fill in the geohash here
+                property_obj.latitude, property_obj.longitude = point
+                property_obj.geohash = geo.encode(*point)
+                batch.append(property_obj)
+                matched += 1
+                if len(batch) >= options['batch_size']:
+                    Property.objects.bulk_update(batch, ['latitude', 'longitude', 'geohash'])
+                    batch = []
+            Property.objects.bulk_update(batch, ['latitude', 'longitude', 'geohash'])
+
+        self.stdout.write(self.style.SUCCESS(f'Geocoded {matched} properties; {unmatched} had no gazetteer match'))
+
+    def load(self, path):
+        """Return gazetteer points keyed by (country, zip code) and (country, state, city)"""
+        by_zip_code, by_city = {}, {}
+        try:
+            with open(path, newline='', encoding='utf-8-sig') as gazetteer:
+                reader = csv.DictReader(gazetteer)
+                missing = {'latitude', 'longitude'} - set(reader.fieldnames or ())
+                if missing:
+                    raise CommandError(f"The gazetteer has no {' or '.join(sorted(missing))} column.")
+                for line, row in enumerate(reader, start=2):
+                    try:
+                        point = (float(row['latitude']), float(row['longitude']))
+                    except (TypeError, ValueError):
+                        raise CommandError(f'Line {line}: latitude and longitude must be numbers.')
+                    if not (-90 <= point[0] <= 90 and -180 <= point[1] <= 180):
+                        raise CommandError(f'Line {line}: coordinates out of range.')
+                    # Rows without a country match properties in the default one
+                    country = _normalize(row.get('country') or Property._meta.get_field('country').default)
+                    if row.get('zip_code'):
+                        by_zip_code.setdefault((country, _normalize(row['zip_code'])), point)
+                    if row.get('city'):
+                        by_city.setdefault((country, _normalize(row.get('state')), _normalize(row['city'])), point)
+        except OSError as exc:
+            raise CommandError(f'Cannot read {path}: {exc}')
+        return by_zip_code, by_city
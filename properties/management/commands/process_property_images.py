@@ -0,0 +1,33 @@
+from django.core.management.base import BaseCommand
+from properties.images import ImageProcessingError
+from properties.models import Property, PropertyImage
+
+class Command(BaseCommand):
+    help = 'Strip EXIF and generate resized variants for property images'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--all',
+            action='store_true',
+            help='Reprocess images that already have variants'
+        )
+
+    def handle(self, *args, **options):
+        images = PropertyImage.objects.order_by('pk')
+        if not options['all']:
+            images = images.filter(width__isnull=True)
+        
+        processed = failed = 0
+        for image in images.iterator():
+            try:
+                image.process()
+                processed += 1
+            except ImageProcessingError as exc:
+                PropertyImage.objects.filter(pk=image.pk).update(status='failed')
+                Property.objects.filter(pk=image.property_id).bump_cache_version()
+                failed += 1
+                self.stderr.write(str(exc))
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully processed {processed} images ({failed} failed)')
+        )
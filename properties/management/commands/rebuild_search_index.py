@@ -0,0 +1,16 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from properties.search import get_search_backend
+
+class Command(BaseCommand):
+    help = 'Rebuild the full-text search index for all properties'
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        
+        with transaction.atomic():
+            indexed = backend.rebuild()
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully indexed {indexed} properties with {type(backend).__name__}')
+        )
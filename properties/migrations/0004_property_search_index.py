@@ -0,0 +1,51 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:20
+
+from django.db import migrations
+
+SQLITE_TABLE = 'properties_property_fts'
+
+POSTGRES_VECTOR = (
+    "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+    "setweight(to_tsvector('english', coalesce(city, '') || ' ' || coalesce(state, '')), 'B') || "
+    "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(
+            f"CREATE VIRTUAL TABLE IF NOT EXISTS {SQLITE_TABLE} "
+            f"USING fts5(title, description, city, state, tokenize='porter unicode61', prefix='2 3')"
+        )
+        schema_editor.execute(
+            f"INSERT INTO {SQLITE_TABLE} (rowid, title, description, city, state) "
+            f"SELECT id, title, description, city, state FROM properties_property"
+        )
+    elif vendor == 'postgresql':
+        schema_editor.execute("ALTER TABLE properties_property ADD COLUMN IF NOT EXISTS search_vector tsvector")
+        schema_editor.execute(f"UPDATE properties_property SET search_vector = {POSTGRES_VECTOR}")
+        schema_editor.execute(
+            "CREATE INDEX IF NOT EXISTS properties_property_search_vector_idx "
+            "ON properties_property USING GIN (search_vector)"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        schema_editor.execute(f"DROP TABLE IF EXISTS {SQLITE_TABLE}")
+    elif vendor == 'postgresql':
+        schema_editor.execute("DROP INDEX IF EXISTS properties_property_search_vector_idx")
+        schema_editor.execute("ALTER TABLE properties_property DROP COLUMN IF EXISTS search_vector")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0003_property_rating_stats'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:21
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0006_propertyimage_variants'),
+    ]
+
+    operations = [
+        # Images uploaded before the worker existed are already being shown as uploaded
+        migrations.AddField(
+            model_name='propertyimage',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='ready', editable=False, max_length=20),
+        ),
+        migrations.AlterField(
+            model_name='propertyimage',
+            name='status',
+            field=models.CharField(choices=[('pending', 'Processing'), ('ready', 'Ready'), ('failed', 'Failed')], default='pending', editable=False, max_length=20),
+        ),
+    ]
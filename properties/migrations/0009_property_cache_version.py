@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:26
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0008_imageupload'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='property',
+            name='cache_version',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+    ]
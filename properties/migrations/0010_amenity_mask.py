@@ -0,0 +1,41 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:44
+
+from django.db import migrations, models
+
+MAX_AMENITY_BITS = 63
+
+
+def populate_amenity_masks(apps, schema_editor):
+    Amenity = apps.get_model('properties', 'Amenity')
+    Property = apps.get_model('properties', 'Property')
+    bits = {}
+    for bit, amenity_id in enumerate(Amenity.objects.order_by('pk').values_list('pk', flat=True)[:MAX_AMENITY_BITS]):
+        Amenity.objects.filter(pk=amenity_id).update(bit=bit)
+        bits[amenity_id] = bit
+    masks = {}
+    for property_id, amenity_id in Property.amenities.through.objects.values_list('property_id', 'amenity_id'):
+        if amenity_id in bits:
+            masks[property_id] = masks.get(property_id, 0) | 1 << bits[amenity_id]
+    for property_id, mask in masks.items():
+        Property.objects.filter(pk=property_id).update(amenity_mask=mask)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0009_property_cache_version'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='amenity',
+            name='bit',
+            field=models.PositiveSmallIntegerField(blank=True, editable=False, null=True, unique=True),
+        ),
+        migrations.AddField(
+            model_name='property',
+            name='amenity_mask',
+            field=models.BigIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_amenity_masks, migrations.RunPython.noop),
+    ]
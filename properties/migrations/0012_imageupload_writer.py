@@ -0,0 +1,18 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0011_property_location'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='imageupload',
+            name='writer',
+            field=models.UUIDField(blank=True, editable=False, null=True),
+        ),
+    ]
@@ -1,17 +1,86 @@
-from django.db import models
+import os
+import uuid
+
+from django.conf import settings
+from django.db import models, transaction
+from django.db.models import Count, F, Prefetch, Q, Sum
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
+from tasks.models import Task
+from . import geo
+from .images import delete_variants, process_property_image
+
+# Property.amenity_mask is a signed 64-bit integer
+MAX_AMENITY_BITS = 63
 
 class Amenity(models.Model):
     name = models.CharField(max_length=100)
     icon = models.CharField(max_length=50, blank=True, null=True)  # For Bootstrap icons
     description = models.TextField(blank=True, null=True)
+    # Position in Property.amenity_mask; None once all bits are taken, in
+    # which case filters fall back to joining the M2M for this amenity
+    bit = models.PositiveSmallIntegerField(unique=True, blank=True, null=True, editable=False)
     
     def __str__(self):
         return self.name
     
     class Meta:
         verbose_name_plural = "Amenities"
+    
+    def save(self, *args, **kwargs):
+        if self._state.adding and self.bit is None:
+            used = set(Amenity.objects.exclude(bit=None).values_list('bit', flat=True))
+            self.bit = next((bit for bit in range(MAX_AMENITY_BITS) if bit not in used), None)
+        super().save(*args, **kwargs)
+    
+    @property
+    def mask(self):
+        """Return this amenity's bit in Property.amenity_mask, or 0 if it has none"""
+        return 0 if self.bit is None else 1 << self.bit
+
+class PropertyQuerySet(models.QuerySet):
+    def for_listing(self):
+        """Prefetch what listing cards render, so a page costs a fixed number of queries"""
+        return self.prefetch_related(primary_image_prefetch())
+    
+    def bump_cache_version(self):
+        """Invalidate the cached fragments of these properties (for bulk updates)"""
+        return self.update(cache_version=F('cache_version') + 1)
+    
+    def with_amenities(self, amenities):
+        """Keep properties that have every one of the given amenities"""
+        mask = 0
+        queryset = self
+        for amenity in amenities:
+            if amenity.bit is None:
+                queryset = queryset.filter(amenities=amenity)
+            mask |= amenity.mask
+        if not mask:
+            return queryset
+        # One bitwise predicate however many amenities are asked for
+        return queryset.alias(amenity_match=F('amenity_mask').bitand(mask)).filter(amenity_match=mask)
+    
+    def near(self, latitude, longitude, radius_km):
+        """Keep properties within radius_km of a point, annotated with their distance"""
+        min_lat, max_lat, min_lon, max_lon = geo.bounding_box(latitude, longitude, radius_km)
+        # The geohash cells narrow the search through the index; the bounding
+        # box and the exact distance only run on the rows inside them
+        queryset = self.filter(geo.cell_filter(geo.covering_cells(latitude, longitude, radius_km)))
+        queryset = queryset.filter(latitude__gte=min_lat, latitude__lte=max_lat)
+        if min_lon is not None and -180 <= min_lon and max_lon <= 180:
+            queryset = queryset.filter(longitude__gte=min_lon, longitude__lte=max_lon)
+        return queryset.annotate(distance=geo.haversine(latitude, longitude)).filter(distance__lte=radius_km)
+    
+    def sync_amenity_mask(self):
+        """Recompute amenity_mask from the amenities M2M and invalidate cached fragments"""
+        masks = dict.fromkeys(self.values_list('pk', flat=True), 0)
+        links = Property.amenities.through.objects.filter(property_id__in=masks, amenity__bit__isnull=False)
+        for property_id, bit in links.values_list('property_id', 'amenity__bit'):
+            masks[property_id] |= 1 << bit
+        for property_id, mask in masks.items():
+            Property.objects.filter(pk=property_id).update(amenity_mask=mask, cache_version=F('cache_version') + 1)
 
 class Property(models.Model):
     PROPERTY_TYPES = (
@@ -30,6 +99,9 @@ class Property(models.Model):
         ('booked', 'Booked'),
     )
     
+    # Columns indexed for full-text search, in ranking weight order
+    SEARCH_FIELDS = ('title', 'description', 'city', 'state')
+    
     owner = models.ForeignKey(User, on_delete=models.CASCADE, related_name='properties')
     title = models.CharField(max_length=200)
     description = models.TextField()
@@ -39,6 +111,14 @@ class Property(models.Model):
     state = models.CharField(max_length=100)
     zip_code = models.CharField(max_length=10)
     country = models.CharField(max_length=100, default='India')
+    latitude = models.FloatField(
+        blank=True, null=True, validators=[MinValueValidator(-90), MaxValueValidator(90)]
+    )
+    longitude = models.FloatField(
+        blank=True, null=True, validators=[MinValueValidator(-180), MaxValueValidator(180)]
+    )
+    # properties.geo.encode of the coordinates, filled in by save()
+    geohash = models.CharField(max_length=12, blank=True, editable=False)
     
     # Property details
     bedrooms = models.PositiveIntegerField()
@@ -58,44 +138,271 @@ class Property(models.Model):
     
     # Features
     amenities = models.ManyToManyField(Amenity, blank=True)
+    # Bitwise OR of Amenity.mask over amenities, kept in step by sync_amenity_masks
+    amenity_mask = models.BigIntegerField(default=0, editable=False)
+    
+    # Review aggregates, maintained by reviews.models.Review
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
+    rating_1_count = models.PositiveIntegerField(default=0)
+    rating_2_count = models.PositiveIntegerField(default=0)
+    rating_3_count = models.PositiveIntegerField(default=0)
+    rating_4_count = models.PositiveIntegerField(default=0)
+    rating_5_count = models.PositiveIntegerField(default=0)
     
     # Timestamps
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
     
+    # Bumped whenever anything a cached fragment shows changes: the property,
+    # its images, reviews or bookings. Fragment cache keys include it.
+    cache_version = models.PositiveIntegerField(default=0, editable=False)
+    
+    # Kept by F() updates elsewhere and never written back by a full save()
+    MAINTAINED_FIELDS = (
+        'cache_version', 'amenity_mask', 'rating_sum', 'rating_count',
+        'rating_1_count', 'rating_2_count', 'rating_3_count', 'rating_4_count', 'rating_5_count',
+    )
+    
+    objects = PropertyQuerySet.as_manager()
+    
+    class Meta:
+        indexes = [
+            # Newest-first listings and their keyset pagination
+            models.Index(fields=['created_at', 'id'], name='property_created_idx'),
+            # property_search starts from available listings
+            models.Index(fields=['status', 'is_available', 'created_at'], name='property_available_idx'),
+            models.Index(fields=['city'], name='property_city_idx'),
+            models.Index(fields=['price_per_night'], name='property_price_idx'),
+            # Radius searches scan a few geohash prefix ranges
+            models.Index(fields=['geohash'], name='property_geohash_idx'),
+        ]
+    
     def __str__(self):
         return f"{self.title} - {self.city}"
     
+    def save(self, *args, **kwargs):
+        has_location = self.latitude is not None and self.longitude is not None
+        self.geohash = geo.encode(self.latitude, self.longitude) if has_location else ''
+        update_fields = kwargs.get('update_fields')
+        if update_fields is not None and {'latitude', 'longitude'} & set(update_fields):
+            kwargs['update_fields'] = {*update_fields, 'geohash'}
+        # These columns only move through F() updates; writing back this
+        # instance's copies could rewind them (or erase a review posted
+        # since it was loaded)
+        if not self._state.adding and kwargs.get('update_fields') is None:
+            kwargs['update_fields'] = [
+                field.name for field in self._meta.concrete_fields
+                if not field.primary_key and field.name not in self.MAINTAINED_FIELDS
+            ]
+        super().save(*args, **kwargs)
+    
     @property
     def main_image(self):
-        """Return the first image or None"""
-        return self.images.first()
+        """Return the primary image (or the first one uploaded), or None"""
+        if hasattr(self, 'listing_images'):
+            return self.listing_images[0] if self.listing_images else None
+        return self.images.order_by('-is_primary', 'pk').first()
+    
+    @property
+    def fragment_key(self):
+        """Return the cache key part for this property's template fragments"""
+        # created_at keeps a shared cache from serving fragments of an older
+        # row that had the same pk (e.g. after the database was recreated)
+        return f'{self.pk}.{self.cache_version}.{self.created_at.timestamp():.0f}'
     
     @property
     def average_rating(self):
-        """Calculate average rating from reviews"""
-        reviews = self.reviews.all()
-        if reviews:
-            return sum(review.rating for review in reviews) / len(reviews)
+        """Return the average review rating"""
+        if self.rating_count:
+            return self.rating_sum / self.rating_count
         return 0
     
     @property
     def review_count(self):
         """Return number of reviews"""
-        return self.reviews.count()
+        return self.rating_count
+    
+    @property
+    def rating_distribution(self):
+        """Return review counts keyed by star rating"""
+        return {star: getattr(self, f'rating_{star}_count') for star in range(1, 6)}
+    
+    @classmethod
+    def update_rating_stats(cls, property_id, removed=None, added=None):
+        """Apply a review's old and new rating to the stored aggregates atomically"""
+        deltas = {}
+        for rating, step in ((removed, -1), (added, 1)):
+            if rating is None:
+                continue
+            deltas['rating_sum'] = deltas.get('rating_sum', 0) + step * rating
+            deltas['rating_count'] = deltas.get('rating_count', 0) + step
+            star_field = f'rating_{rating}_count'
+            deltas[star_field] = deltas.get(star_field, 0) + step
+        
+        # The review itself changed too, so bump the version even if the ratings didn't
+        updates = {field: F(field) + delta for field, delta in deltas.items() if delta}
+        cls.objects.filter(pk=property_id).update(cache_version=F('cache_version') + 1, **updates)
+    
+    def refresh_rating_stats(self):
+        """Recompute the stored review aggregates from scratch"""
+        stats = self.reviews.aggregate(
+            rating_sum=Sum('rating'),
+            rating_count=Count('id'),
+            **{f'rating_{star}_count': Count('id', filter=Q(rating=star)) for star in range(1, 6)}
+        )
+        stats['rating_sum'] = stats['rating_sum'] or 0
+        for field, value in stats.items():
+            setattr(self, field, value)
+        Property.objects.filter(pk=self.pk).update(cache_version=F('cache_version') + 1, **stats)
+    
+    def occupancy_bitmap(self, start_date, end_date):
+        """Return booked nights from start_date up to end_date as an int bitmap.
+        
+        Bit i is set when the night of start_date + i days is held by a
+        confirmed or pending booking. Uses a single range query.
+        """
+        span = (end_date - start_date).days
+        bitmap = 0
+        stays = self.bookings.filter(
+            status__in=['confirmed', 'pending'],
+            check_in_date__lt=end_date,
+            check_out_date__gt=start_date
+        ).values_list('check_in_date', 'check_out_date')
+        for check_in_date, check_out_date in stays:
+            first = max((check_in_date - start_date).days, 0)
+            last = min((check_out_date - start_date).days, span)
+            bitmap |= ((1 << (last - first)) - 1) << first
+        return bitmap
+
+@receiver(post_save, sender=Property)
+def index_property_for_search(sender, instance, update_fields=None, **kwargs):
+    if update_fields and not set(Property.SEARCH_FIELDS).intersection(update_fields):
+        return
+    from .search import get_search_backend
+    get_search_backend().index_property(instance)
+
+@receiver(post_delete, sender=Property)
+def remove_property_from_search(sender, instance, **kwargs):
+    from .search import get_search_backend
+    get_search_backend().remove_property(instance.pk)
+
+@receiver(post_save, sender=Property)
+def bump_property_cache_version(sender, instance, **kwargs):
+    Property.objects.filter(pk=instance.pk).bump_cache_version()
+    instance.cache_version += 1
+
+@receiver(m2m_changed, sender=Property.amenities.through)
+def sync_amenity_masks(sender, instance, action, reverse, pk_set, **kwargs):
+    if not reverse:
+        if action.startswith('post_'):
+            Property.objects.filter(pk=instance.pk).sync_amenity_mask()
+        return
+    if action == 'pre_clear':
+        # clear() gives no pk_set, so catch the properties before they are unlinked
+        properties, mask = Property.objects.filter(amenities=instance), F('amenity_mask').bitand(~instance.mask)
+    elif action == 'post_add':
+        properties, mask = Property.objects.filter(pk__in=pk_set), F('amenity_mask').bitor(instance.mask)
+    elif action == 'post_remove':
+        properties, mask = Property.objects.filter(pk__in=pk_set), F('amenity_mask').bitand(~instance.mask)
+    else:
+        return
+    properties.update(amenity_mask=mask, cache_version=F('cache_version') + 1)
+
+@receiver(post_save, sender=Amenity)
+def bump_cache_version_for_amenity(sender, instance, **kwargs):
+    Property.objects.filter(amenities=instance).bump_cache_version()
+
+@receiver(pre_delete, sender=Amenity)
+def clear_amenity_bit(sender, instance, **kwargs):
+    # The M2M rows go by cascade without m2m_changed, and the bit may be reused
+    Property.objects.filter(amenities=instance).update(
+        amenity_mask=F('amenity_mask').bitand(~instance.mask), cache_version=F('cache_version') + 1
+    )
 
 class PropertyImage(models.Model):
+    STATUS_CHOICES = (
+        ('pending', 'Processing'),
+        ('ready', 'Ready'),
+        ('failed', 'Failed'),
+    )
+    
     property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='images')
     image = models.ImageField(upload_to='properties/')
     caption = models.CharField(max_length=200, blank=True, null=True)
     is_primary = models.BooleanField(default=False)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    # Filled in by properties.images.process_property_image
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='pending', editable=False)
+    width = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    height = models.PositiveIntegerField(null=True, blank=True, editable=False)
+    variants = models.JSONField(default=dict, blank=True, editable=False)
+    
     def __str__(self):
         return f"{self.property.title} - {self.caption or 'Image'}"
     
+    def process(self):
+        """Strip EXIF, record dimensions and generate resized variants"""
+        process_property_image(self)
+    
     def save(self, *args, **kwargs):
         # If this is marked as primary, unmark others
         if self.is_primary:
             PropertyImage.objects.filter(property=self.property, is_primary=True).update(is_primary=False)
         super().save(*args, **kwargs)
+
+@receiver(post_save, sender=PropertyImage)
+def queue_image_processing(sender, instance, created, raw=False, **kwargs):
+    # Images from the views, chunked uploads, the admin and the shell all get
+    # processed; waiting for the commit keeps the worker off rolled-back rows
+    if created and not raw:
+        image_id = instance.pk
+        transaction.on_commit(lambda: Task.enqueue('properties.tasks.process_image', image_id))
+
+@receiver(post_delete, sender=PropertyImage)
+def delete_image_variants(sender, instance, **kwargs):
+    delete_variants(instance)
+
+@receiver(post_save, sender=PropertyImage)
+@receiver(post_delete, sender=PropertyImage)
+def bump_cache_version_for_image(sender, instance, **kwargs):
+    Property.objects.filter(pk=instance.property_id).bump_cache_version()
+
+class ImageUpload(models.Model):
+    """A chunked image upload in progress; bytes collect in a partial file until complete"""
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    property = models.ForeignKey(Property, on_delete=models.CASCADE, related_name='image_uploads')
+    filename = models.CharField(max_length=255)
+    size = models.PositiveBigIntegerField()
+    received = models.PositiveBigIntegerField(default=0)
+    # Set while a request is writing a chunk, so no other request writes at the same offset
+    writer = models.UUIDField(blank=True, null=True, editable=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.filename} ({self.received}/{self.size} bytes)"
+    
+    def partial_path(self):
+        return os.path.join(settings.CHUNKED_UPLOAD_DIR, str(self.pk))
+
+@receiver(post_delete, sender=ImageUpload)
+def delete_partial_upload(sender, instance, **kwargs):
+    try:
+        os.remove(instance.partial_path())
+    except FileNotFoundError:
+        pass
+
+
+def primary_image_prefetch(lookup='images'):
+    """Prefetch each property's main image into listing_images.
+    
+    lookup is the path to the images relation, e.g. 'property_obj__images'
+    when listing bookings.
+    """
+    return Prefetch(
+        lookup,
+        queryset=PropertyImage.objects.order_by('-is_primary', 'pk')[:1],
+        to_attr='listing_images'
+    )
@@ -0,0 +1,156 @@
+"""Full-text search backends for property listings.
+
+The backend is picked from the PROPERTY_SEARCH_BACKEND setting (a dotted
+path) or, by default, from the database vendor: an FTS5 virtual table on
+SQLite, a GIN-indexed tsvector column on PostgreSQL, and plain icontains
+lookups anywhere else. Every backend's search() narrows a Property
+queryset and annotates it with search_rank (higher is more relevant).
+"""
+import re
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import BooleanField, FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from .models import Property
+
+INDEXED_FIELDS = Property.SEARCH_FIELDS
+
+
+def search_terms(query):
+    """Split a user query into word tokens safe to embed in a match expression"""
+    return re.findall(r'\w+', query)
+
+
+def unranked(queryset):
+    """Annotate a constant search_rank so callers can always order on it"""
+    return queryset.annotate(search_rank=Value(0.0, output_field=FloatField()))
+
+
+class LikeSearchBackend:
+    """Fallback backend that scans the indexed columns with icontains"""
+
+    def search(self, queryset, query):
+        condition = Q()
+        for field in INDEXED_FIELDS:
+            condition |= Q(**{f'{field}__icontains': query})
+        return unranked(queryset.filter(condition))
+
+    def index_property(self, property_obj):
+        pass
+
+    def remove_property(self, property_id):
+        pass
+
+    def rebuild(self):
+        return 0
+
+
+class SQLiteSearchBackend:
+    """Ranks matches with bm25() over an FTS5 virtual table keyed by property id"""
+
+    table = 'properties_property_fts'
+    # bm25() column weights, in INDEXED_FIELDS order
+    weights = (10.0, 1.0, 5.0, 5.0)
+
+    def match_expression(self, query):
+        # Quote every token and prefix-match the lot, so partial words typed
+        # into the search box still match
+        return ' '.join(f'"{term}"*' for term in search_terms(query))
+
+    def search(self, queryset, query):
+        expression = self.match_expression(query)
+        if not expression:
+            return unranked(queryset.none())
+        weights = ', '.join(str(weight) for weight in self.weights)
+        return queryset.filter(
+            pk__in=RawSQL(f'SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s', (expression,))
+        ).annotate(search_rank=RawSQL(
+            f'SELECT -bm25({self.table}, {weights}) FROM {self.table} '
+            f'WHERE {self.table} MATCH %s AND rowid = "{Property._meta.db_table}"."id"',
+            (expression,),
+            output_field=FloatField()
+        ))
+
+    def index_property(self, property_obj):
+        columns = ', '.join(INDEXED_FIELDS)
+        placeholders = ', '.join(['%s'] * len(INDEXED_FIELDS))
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [property_obj.pk])
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, {columns}) VALUES (%s, {placeholders})',
+                [property_obj.pk] + [getattr(property_obj, field) or '' for field in INDEXED_FIELDS]
+            )
+
+    def remove_property(self, property_id):
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table} WHERE rowid = %s', [property_id])
+
+    def rebuild(self):
+        columns = ', '.join(INDEXED_FIELDS)
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {self.table}')
+            cursor.execute(
+                f'INSERT INTO {self.table} (rowid, {columns}) '
+                f'SELECT id, {columns} FROM {Property._meta.db_table}'
+            )
+            return cursor.rowcount
+
+
+class PostgresSearchBackend:
+    """Ranks matches with ts_rank() over a GIN-indexed search_vector column"""
+
+    config = 'english'
+    column = f'"{Property._meta.db_table}"."search_vector"'
+    vector_sql = (
+        "setweight(to_tsvector('english', coalesce(title, '')), 'A') || "
+        "setweight(to_tsvector('english', coalesce(city, '') || ' ' || coalesce(state, '')), 'B') || "
+        "setweight(to_tsvector('english', coalesce(description, '')), 'C')"
+    )
+
+    def tsquery(self, query):
+        return ' & '.join(f'{term}:*' for term in search_terms(query))
+
+    def search(self, queryset, query):
+        tsquery = self.tsquery(query)
+        if not tsquery:
+            return unranked(queryset.none())
+        return queryset.filter(RawSQL(
+            f'{self.column} @@ to_tsquery(%s, %s)', (self.config, tsquery), output_field=BooleanField()
+        )).annotate(search_rank=RawSQL(
+            f'ts_rank({self.column}, to_tsquery(%s, %s))', (self.config, tsquery), output_field=FloatField()
+        ))
+
+    def index_property(self, property_obj):
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'UPDATE {Property._meta.db_table} SET search_vector = {self.vector_sql} WHERE id = %s',
+                [property_obj.pk]
+            )
+
+    def remove_property(self, property_id):
+        # The vector lives on the property row and goes with it
+        pass
+
+    def rebuild(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'UPDATE {Property._meta.db_table} SET search_vector = {self.vector_sql}')
+            return cursor.rowcount
+
+
+VENDOR_BACKENDS = {
+    'sqlite': SQLiteSearchBackend,
+    'postgresql': PostgresSearchBackend,
+}
+
+
+@lru_cache(maxsize=None)
+def get_search_backend():
+    """Return the configured search backend instance"""
+    backend_path = getattr(settings, 'PROPERTY_SEARCH_BACKEND', None)
+    if backend_path:
+        return import_string(backend_path)()
+    return VENDOR_BACKENDS.get(connection.vendor, LikeSearchBackend)()
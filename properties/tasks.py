@@ -0,0 +1,28 @@
+"""Background tasks run by the tasks app worker (manage.py run_task_worker)"""
+from .images import ImageProcessingError
+from .models import Property, PropertyImage
+
+
+def process_image(image_id):
+    """Generate variants for an uploaded image; unreadable files are marked failed"""
+    image = PropertyImage.objects.filter(pk=image_id).first()
+    if image is None:
+        # Deleted before the worker got to it
+        return
+    try:
+        image.process()
+    except ImageProcessingError:
+        # Retrying cannot fix a file that is not an image
+        mark_image_failed(image_id)
+
+
+def mark_image_failed(image_id):
+    """Stop showing an image as processing"""
+    property_ids = PropertyImage.objects.filter(pk=image_id).values_list('property_id', flat=True)
+    PropertyImage.objects.filter(pk=image_id).update(status='failed')
+    Property.objects.filter(pk__in=list(property_ids)).bump_cache_version()
+
+
+# Any other error (storage, database) is retried by the worker, which calls
+# this once the attempts run out so the image is not left pending
+process_image.on_failure = mark_image_failed
@@ -0,0 +1,46 @@
+from django import template
+from django.core.files.storage import default_storage
+from django.templatetags.static import static
+from django.utils.html import format_html, format_html_join
+
+register = template.Library()
+
+# Format used for the <img> fallback; the others become <source> elements
+FALLBACK_EXTENSION = 'jpg'
+
+
+def _srcset(entry):
+    return ', '.join(f'{default_storage.url(path)} {width}w' for width, path in entry['srcset'])
+
+
+@register.simple_tag
+def responsive_image(property_image, sizes='100vw', alt='', css_class='', style='', loading='lazy'):
+    """Render a PropertyImage as a <picture> with a srcset per stored variant format.
+    
+    Images still waiting for the task worker (or that failed) show the
+    placeholder; ready images without variants fall back to the upload itself.
+    """
+    if property_image.status != 'ready':
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" style="{}" title="{}">',
+            static('images/placeholder-property.jpg'), alt, css_class, style,
+            property_image.get_status_display()
+        )
+    
+    variants = property_image.variants or {}
+    fallback = variants.get(FALLBACK_EXTENSION)
+    if not fallback:
+        return format_html(
+            '<img src="{}" alt="{}" class="{}" style="{}" loading="{}">',
+            property_image.image.url, alt, css_class, style, loading
+        )
+    
+    sources = format_html_join(
+        '', '<source type="{}" srcset="{}" sizes="{}">',
+        ((entry['type'], _srcset(entry), sizes) for extension, entry in variants.items() if extension != FALLBACK_EXTENSION)
+    )
+    return format_html(
+        '<picture>{}<img src="{}" srcset="{}" sizes="{}" width="{}" height="{}" alt="{}" class="{}" style="{}" loading="{}" decoding="async"></picture>',
+        sources, default_storage.url(fallback['srcset'][0][1]), _srcset(fallback), sizes,
+        property_image.width, property_image.height, alt, css_class, style, loading
+    )
@@ -1,3 +1,495 @@
-from django.test import TestCase
+from datetime import date, timedelta
+from decimal import Decimal
+import io
+import os
+import shutil
+import tempfile
+import uuid
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.cache import cache
+from django.db import connection
+from django.test import override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from PIL import Image
+
+from BookMyProperty.pagination import CursorPaginator
+from BookMyProperty.testing import TestCase, create_property
+from bookings.models import Booking
+from tasks.models import Task
+from . import geo
+from .facets import _cache_key
+from .images import VARIANT_WIDTHS, process_property_image, supported_formats
+from .models import Amenity, ImageUpload, Property, PropertyImage
+from .search import LikeSearchBackend, SQLiteSearchBackend, get_search_backend
+from .uploads import append_chunk
+
+
+class ListingQueryCountTests(TestCase):
+    """Listing pages should cost the same number of queries whatever the page size"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', 'owner@example.com', 'password')
+        cls.owner.userprofile.user_type = 'owner'
+        cls.owner.userprofile.save()
+        cls.tenant = User.objects.create_user('tenant', 'tenant@example.com', 'password')
+
+    def create_properties(self, count):
+        for i in range(count):
+            property_obj = create_property(self.owner, title=f'Property {i}')
+            PropertyImage.objects.create(property=property_obj, image=f'properties/{i}-a.jpg')
+            PropertyImage.objects.create(property=property_obj, image=f'properties/{i}-b.jpg', is_primary=True)
+            check_in_date = date.today() + timedelta(days=10 + i * 5)
+            Booking.objects.create(
+                property_obj=property_obj, guest=self.tenant, check_in_date=check_in_date,
+                check_out_date=check_in_date + timedelta(days=2), total_price=2000, price_per_night=1000,
+            )
+
+    def count_queries(self, url):
+        # Compare cold requests; cached facets and fragments would hide queries
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries.captured_queries)
+
+    def assert_constant_queries(self, url, user):
+        self.client.force_login(user)
+        self.create_properties(2)
+        small_page = self.count_queries(url)
+        self.create_properties(8)
+        full_page = self.count_queries(url)
+        self.assertEqual(small_page, full_page)
+
+    def test_property_list(self):
+        self.assert_constant_queries(reverse('properties:property_list'), self.tenant)
+
+    def test_my_properties(self):
+        self.assert_constant_queries(reverse('properties:my_properties'), self.owner)
+
+    def test_booking_list(self):
+        self.assert_constant_queries(reverse('bookings:booking_list'), self.tenant)
+
+    def test_main_image_prefers_primary(self):
+        self.create_properties(1)
+        property_obj = Property.objects.for_listing().get()
+        self.assertEqual(property_obj.main_image.image.name, 'properties/0-b.jpg')
+        self.assertEqual(Property.objects.get().main_image.image.name, 'properties/0-b.jpg')
+
+
+class AmenityMaskTests(TestCase):
+    """amenity_mask should follow the amenities M2M from either side"""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('owner', 'owner@example.com', 'password')
+        cls.properties = [
+            create_property(owner, title=f'Property {i}')
+            for i in range(3)
+        ]
+        cls.wifi, cls.pool, cls.gym = (Amenity.objects.create(name=name) for name in ('Wifi', 'Pool', 'Gym'))
+
+    def matching(self, *amenities):
+        return set(Property.objects.with_amenities(amenities).values_list('title', flat=True))
+
+    def test_with_amenities(self):
+        first, second, third = self.properties
+        first.amenities.add(self.wifi, self.pool)
+        second.amenities.add(self.wifi)
+        self.pool.property_set.add(third)
+        self.assertEqual(self.matching(self.wifi), {'Property 0', 'Property 1'})
+        self.assertEqual(self.matching(self.wifi, self.pool), {'Property 0'})
+
+        self.wifi.property_set.remove(first)
+        second.amenities.set([self.gym])
+        self.pool.property_set.clear()
+        self.assertEqual(self.matching(self.wifi), set())
+        self.assertEqual(self.matching(self.gym), {'Property 1'})
+
+        self.gym.delete()
+        self.assertFalse(Property.objects.exclude(amenity_mask=0).exists())
+
+
+class NearSearchTests(TestCase):
+    """Radius search should return exactly the listings a full scan would"""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('owner', 'owner@example.com', 'password')
+        # A grid across the antimeridian, with a few listings without coordinates
+        points = [(lat / 4, lon / 4) for lat in range(-8, 9) for lon in range(712, 730)] + [(None, None)] * 3
+        for i, (latitude, longitude) in enumerate(points):
+            create_property(
+                owner, title=f'Property {i}', city='Suva', state='Central', zip_code='0000',
+                latitude=latitude, longitude=longitude if longitude is None or longitude <= 180 else longitude - 360,
+            )
+
+    def test_matches_full_scan(self):
+        located = Property.objects.exclude(latitude=None)
+        for latitude, longitude, radius in ((0, 179.9, 5), (0, 179.9, 60), (-1, -179.5, 150), (1.3, 178.5, 25)):
+            found = Property.objects.near(latitude, longitude, radius).order_by('distance')
+            expected = sorted(
+                (geo.distance_km(latitude, longitude, p.latitude, p.longitude), p.pk) for p in located
+                if geo.distance_km(latitude, longitude, p.latitude, p.longitude) <= radius
+            )
+            self.assertEqual([p.pk for p in found], [pk for _, pk in expected])
+            for p, (distance, _) in zip(found, expected):
+                self.assertAlmostEqual(p.distance, distance, places=6)
+
+    def test_save_keeps_geohash(self):
+        property_obj = Property.objects.exclude(latitude=None).first()
+        property_obj.latitude, property_obj.longitude = 18.5204, 73.8567
+        property_obj.save(update_fields=['latitude', 'longitude'])
+        self.assertEqual(Property.objects.get(pk=property_obj.pk).geohash, 'tek92esc1')
+
+
+class PropertyAvailabilityTests(TestCase):
+    """Out-of-range spans should be rejected rather than crash"""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('owner', 'owner@example.com', 'password')
+        cls.property_obj = create_property(owner)
+
+    def get(self, **params):
+        return self.client.get(reverse('properties:property_availability', args=[self.property_obj.pk]), params)
+
+    def test_invalid_ranges(self):
+        for params in ({'year': 9999, 'month': 12}, {'year': 9999, 'month': 6, 'months': 12},
+                       {'year': 2026, 'month': 13}, {'year': 'soon'}):
+            self.assertEqual(self.get(**params).status_code, 400, params)
+
+    def test_span(self):
+        response = self.get(year=2026, month=11, months=3)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['end_date'], '2027-02-01')
+        self.assertEqual([m['month'] for m in response.json()['months']], [11, 12, 1])
+
+
+class CursorPaginationTests(TestCase):
+    """Cursor pages should walk the (created_at, id) order both ways"""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('owner', 'owner@example.com', 'password')
+        for i in range(7):
+            create_property(owner, title=f'Property {i}')
+        # Ties on created_at must fall back to the id
+        tied = timezone.now()
+        Property.objects.filter(pk__in=list(Property.objects.values_list('pk', flat=True)[:5])).update(created_at=tied)
+        cls.expected = list(Property.objects.order_by('-created_at', '-pk').values_list('pk', flat=True))
+
+    def test_next_and_previous(self):
+        paginator = CursorPaginator(Property.objects.all(), 3)
+        pages = [paginator.get_page(None)]
+        while pages[-1].has_next():
+            pages.append(paginator.get_page(pages[-1].next_cursor))
+        self.assertEqual([p.pk for page in pages for p in page], self.expected)
+        self.assertEqual([len(page) for page in pages], [3, 3, 1])
+        self.assertFalse(pages[0].has_previous())
+
+        back = paginator.get_page(pages[-1].previous_cursor)
+        self.assertEqual([p.pk for p in back], self.expected[3:6])
+        self.assertTrue(back.has_previous())
+        first = paginator.get_page(back.previous_cursor)
+        self.assertEqual([p.pk for p in first], self.expected[:3])
+        self.assertFalse(first.has_previous())
+        self.assertTrue(first.has_next())
+
+    def test_listing_starts_in_cursor_mode(self):
+        response = self.client.get(reverse('properties:property_list'))
+        self.assertTrue(getattr(response.context['properties'], 'is_cursor_page', False))
+        # Page numbers still work for other sort orders and old links
+        response = self.client.get(reverse('properties:property_list'), {'page': 1})
+        self.assertFalse(getattr(response.context['properties'], 'is_cursor_page', False))
+
+
+class ChunkedUploadTests(TestCase):
+    """Chunks must arrive in order, within the declared size, and resume cleanly"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', 'owner@example.com', 'password')
+        cls.property_obj = create_property(cls.owner)
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings_override = override_settings(
+            CHUNKED_UPLOAD_DIR=os.path.join(directory, 'partial'), MEDIA_ROOT=os.path.join(directory, 'media')
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.client.force_login(self.owner)
+        self.content = bytes(range(256)) * 40
+
+    def start(self):
+        response = self.client.post(reverse('properties:image_upload_start', args=[self.property_obj.pk]), {
+            'filename': 'photo.jpg', 'size': len(self.content),
+        })
+        self.assertEqual(response.status_code, 201)
+        return response.json()['url']
+
+    def patch(self, url, offset, data):
+        return self.client.generic('PATCH', url, data, content_type='application/octet-stream', HTTP_UPLOAD_OFFSET=str(offset))
+
+    def test_in_order_chunks_complete(self):
+        url = self.start()
+        self.assertEqual(self.patch(url, 0, self.content[:4000]).json()['offset'], 4000)
+        response = self.patch(url, 4000, self.content[4000:])
+        self.assertEqual(response.status_code, 200)
+        image = PropertyImage.objects.get(pk=response.json()['image_id'])
+        with image.image.open('rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+        self.assertFalse(ImageUpload.objects.exists())
+
+    def test_out_of_order_chunk(self):
+        url = self.start()
+        response = self.patch(url, 4000, self.content[4000:8000])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 0)
+
+    def test_oversize_chunk(self):
+        url = self.start()
+        response = self.patch(url, 0, self.content + b'extra')
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(self.client.get(url).json()['offset'], 0)
+
+    def test_resume_after_disconnect(self):
+        url = self.start()
+        upload = ImageUpload.objects.get()
+
+        class DroppedStream(io.BytesIO):
+            def read(self, size=-1):
+                data = super().read(size)
+                if not data:
+                    raise OSError('connection reset')
+                return data
+
+        # Only 1500 of the 4000 promised bytes arrive
+        self.assertEqual(append_chunk(upload, 0, DroppedStream(self.content[:1500]), 4000), 1500)
+        self.assertEqual(self.client.get(url).json()['offset'], 1500)
+        response = self.patch(url, 1500, self.content[1500:])
+        with PropertyImage.objects.get(pk=response.json()['image_id']).image.open('rb') as stored:
+            self.assertEqual(stored.read(), self.content)
+
+    def test_claimed_offset_is_refused(self):
+        url = self.start()
+        self.patch(url, 0, self.content[:1000])
+        # Another request is still writing at this offset
+        ImageUpload.objects.update(writer=uuid.uuid4())
+        response = self.patch(url, 1000, self.content[1000:2000])
+        self.assertEqual(response.status_code, 409)
+        self.assertEqual(response.json()['offset'], 1000)
+
+    def test_lost_partial_file(self):
+        url = self.start()
+        self.patch(url, 0, self.content[:1000])
+        os.remove(ImageUpload.objects.get().partial_path())
+        self.assertEqual(self.patch(url, 1000, self.content[1000:2000]).status_code, 410)
+        self.assertFalse(ImageUpload.objects.exists())
+
+
+class FragmentKeyTests(TestCase):
+    """Edits must move fragment_key forward and never back to a cached value"""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('owner', 'owner@example.com', 'password')
+        cls.property_obj = create_property(owner)
+
+    def test_edit_changes_fragment_key(self):
+        property_obj = Property.objects.get(pk=self.property_obj.pk)
+        before = property_obj.fragment_key
+        property_obj.title = 'Renamed'
+        property_obj.save()
+        # The instance follows the bump, and so does a fresh load
+        self.assertNotEqual(property_obj.fragment_key, before)
+        self.assertEqual(Property.objects.get(pk=property_obj.pk).fragment_key, property_obj.fragment_key)
+
+    def test_stale_save_does_not_rewind(self):
+        stale = Property.objects.get(pk=self.property_obj.pk)
+        fresh = Property.objects.get(pk=self.property_obj.pk)
+        fresh.title = 'First edit'
+        fresh.save()
+        seen = {stale.fragment_key, fresh.fragment_key}
+
+        stale.price_per_night = 1500
+        stale.save()
+        self.assertNotIn(Property.objects.get(pk=self.property_obj.pk).fragment_key, seen)
+
+
+class SearchBackendTests(TestCase):
+    """Full-text search should rank title matches first and follow every edit"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', 'owner@example.com', 'password')
+        cls.titled = create_property(cls.owner, title='Lakeside Cottage')
+        cls.described = create_property(cls.owner, title='Cottage', description='A short walk to the lakeside')
+        create_property(cls.owner, title='City Flat')
+
+    def setUp(self):
+        get_search_backend.cache_clear()
+        self.addCleanup(get_search_backend.cache_clear)
+
+    def titles(self, query, backend=None):
+        backend = backend or get_search_backend()
+        return [p.title for p in backend.search(Property.objects.all(), query).order_by('-search_rank', 'pk')]
+
+    def test_sqlite_backend_ranks_by_bm25(self):
+        self.assertIsInstance(get_search_backend(), SQLiteSearchBackend)
+        # Prefix matching, with the heavier title column ranked first
+        self.assertEqual(self.titles('lake'), ['Lakeside Cottage', 'Cottage'])
+        self.assertEqual(self.titles('lakeside cottage'), ['Lakeside Cottage', 'Cottage'])
+        self.assertEqual(self.titles('"*'), [])
+
+    def test_index_follows_save_and_delete(self):
+        property_obj = Property.objects.get(pk=self.titled.pk)
+        property_obj.title = 'Riverside Cabin'
+        property_obj.save()
+        self.assertEqual(self.titles('riverside'), ['Riverside Cabin'])
+        self.assertEqual(self.titles('lake'), ['Cottage'])
+
+        property_obj.delete()
+        self.assertEqual(self.titles('riverside'), [])
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT COUNT(*) FROM {SQLiteSearchBackend.table}')
+            self.assertEqual(cursor.fetchone()[0], 2)
+
+    def test_like_backend_fallback(self):
+        with override_settings(PROPERTY_SEARCH_BACKEND='properties.search.LikeSearchBackend'):
+            get_search_backend.cache_clear()
+            self.assertIsInstance(get_search_backend(), LikeSearchBackend)
+            self.assertEqual(self.titles('lakeside'), ['Lakeside Cottage', 'Cottage'])
+            response = self.client.get(reverse('properties:property_search'), {'search': 'flat'})
+            self.assertEqual([p.title for p in response.context['properties']], ['City Flat'])
+
+
+class ImageProcessingTests(TestCase):
+    """New images should be queued, and processing should drop EXIF, apply its orientation and write every variant"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.property_obj = create_property(User.objects.create_user('owner', 'owner@example.com', 'password'))
+
+    def setUp(self):
+        directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, directory)
+        settings_override = override_settings(MEDIA_ROOT=directory)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+    def photo(self):
+        """Return a 1200x2000 JPEG, red on top, tagged to be shown rotated 90 degrees clockwise"""
+        image = Image.new('RGB', (1200, 2000), 'blue')
+        image.paste((255, 0, 0), (0, 0, 1200, 1000))
+        exif = Image.Exif()
+        exif[0x0112] = 6  # Orientation
+        exif[0x010F] = 'Camera Maker'  # Make
+        buffer = io.BytesIO()
+        image.save(buffer, 'JPEG', exif=exif)
+        return SimpleUploadedFile('photo.jpg', buffer.getvalue(), content_type='image/jpeg')
+
+    def test_new_images_are_queued_once_committed(self):
+        admin = User.objects.create_superuser('admin', 'admin@example.com', 'password')
+        self.client.force_login(admin)
+        with self.captureOnCommitCallbacks(execute=True):
+            created = PropertyImage.objects.create(property=self.property_obj, image=self.photo())
+            self.assertFalse(Task.objects.exists())
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('admin:properties_propertyimage_add'), {
+                'property': self.property_obj.pk, 'image': self.photo(), 'caption': 'Admin upload',
+            })
+        added = PropertyImage.objects.get(caption='Admin upload')
+        self.assertEqual(
+            list(Task.objects.order_by('pk').values_list('name', 'args')),
+            [('properties.tasks.process_image', [created.pk]), ('properties.tasks.process_image', [added.pk])]
+        )
+
+        # Edits don't queue the image again
+        with self.captureOnCommitCallbacks(execute=True):
+            added.caption = 'Renamed'
+            added.save()
+        self.assertEqual(Task.objects.count(), 2)
+
+    def test_process_property_image(self):
+        property_image = PropertyImage.objects.create(property=self.property_obj, image=self.photo())
+        process_property_image(property_image)
+
+        property_image = PropertyImage.objects.get(pk=property_image.pk)
+        self.assertEqual(property_image.status, 'ready')
+        self.assertEqual((property_image.width, property_image.height), (2000, 1200))
+        with property_image.image.open('rb') as stored:
+            original = Image.open(stored)
+            original.load()
+        self.assertEqual(original.size, (2000, 1200))
+        self.assertEqual(dict(original.getexif()), {})
+        # The red top edge is now on the right
+        self.assertGreater(original.getpixel((1900, 600))[0], 200)
+        self.assertGreater(original.getpixel((100, 600))[2], 200)
+
+        self.assertEqual(set(property_image.variants), {extension for _, extension, _, _ in supported_formats()})
+        for extension, entry in property_image.variants.items():
+            self.assertEqual([width for width, _ in entry['srcset']], list(VARIANT_WIDTHS))
+            for width, path in entry['srcset']:
+                with default_storage.open(path, 'rb') as stored:
+                    variant = Image.open(stored)
+                    self.assertEqual(variant.size, (width, round(width * 0.6)), path)
+                    self.assertEqual(dict(variant.getexif()), {}, path)
+
+
+class FacetCountTests(TestCase):
+    """Each facet should count every filter except its own"""
+
+    @classmethod
+    def setUpTestData(cls):
+        owner = User.objects.create_user('owner', 'owner@example.com', 'password')
+        for property_type, city, price, bedrooms in (
+            ('house', 'Pune', 800, 2), ('house', 'Pune', 1500, 3),
+            ('apartment', 'Mumbai', 3000, 2), ('villa', 'Goa', 12000, 4),
+        ):
+            create_property(owner, property_type=property_type, city=city, price_per_night=price, bedrooms=bedrooms)
+
+    def facets(self, **params):
+        response = self.client.get(reverse('properties:property_list'), params)
+        self.assertEqual(response.status_code, 200)
+        facets = response.context['facets']
+        return {
+            'total': facets['total'],
+            'price': [(option['label'], option['count']) for option in facets['price']],
+            **{name: {option['value']: option['count'] for option in facets[name]} for name in ('property_type', 'city')},
+        }
+
+    def test_price_facet_ignores_its_own_filter(self):
+        facets = self.facets(min_price=1000, max_price=5000)
+        self.assertEqual(facets['total'], 2)
+        self.assertEqual(facets['price'], [
+            ('Under ₹1,000', 1), ('₹1,000 – ₹2,500', 1), ('₹2,500 – ₹5,000', 1), ('₹10,000+', 1),
+        ])
+        # The other facets do apply the price range
+        self.assertEqual(facets['property_type'], {'house': 1, 'apartment': 1})
+        self.assertEqual(facets['city'], {'Pune': 1, 'Mumbai': 1})
+
+        facets = self.facets(min_price=1000, max_price=5000, property_type='house')
+        self.assertEqual(facets['total'], 1)
+        self.assertEqual(facets['price'], [('Under ₹1,000', 1), ('₹1,000 – ₹2,500', 1)])
+        self.assertEqual(facets['property_type'], {'house': 1, 'apartment': 1})
+
+    def test_cache_key(self):
+        key = _cache_key({'city': ' Pune ', 'min_price': Decimal('1000.00'), 'max_price': None, 'sort': 'price_low'})
+        self.assertEqual(key, _cache_key({'city': 'pune', 'min_price': Decimal('1000')}))
+        self.assertNotEqual(key, _cache_key({'city': 'pune', 'min_price': Decimal('1500')}))
+        self.assertNotEqual(key, _cache_key({'city': 'pune', 'min_price': Decimal('1000'), 'max_price': Decimal('5000')}))
+
+        # A cached result is served until its key changes
+        self.facets(min_price=1000)
+        Property.objects.filter(price_per_night=800).update(price_per_night=2000)
+        self.assertEqual(self.facets(min_price=1000)['total'], 3)
+        self.assertEqual(self.facets(min_price='1000.00', sort='price_low')['total'], 3)
+        self.assertEqual(self.facets(min_price=1000, city='pune')['total'], 2)
@@ -0,0 +1,90 @@
+"""Chunked, resumable image uploads.
+
+A client opens an ImageUpload with the file's name and size, then PATCHes
+the bytes in order, sending the offset each chunk starts at in an
+Upload-Offset header. Chunks are streamed from the request straight into a
+partial file, so memory use does not depend on the file or chunk size. After
+a dropped connection the client asks for the current offset and carries on
+from there. The last chunk turns the partial file into a PropertyImage.
+"""
+from datetime import timedelta
+import os
+import uuid
+
+from django.core.files import File
+from django.db.models import Q
+from django.utils import timezone
+from .models import ImageUpload, PropertyImage
+
+# Bytes read from the request per write
+READ_SIZE = 64 * 1024
+
+# A claim older than this belongs to a request that died without releasing it
+CLAIM_TIMEOUT = timedelta(hours=1)
+
+
+class PartialFileMissing(Exception):
+    """The bytes received so far are gone, so the upload cannot be resumed"""
+
+
+class AssembledFile(File):
+    """A finished partial file; storage moves it into place rather than copying it"""
+
+    def temporary_file_path(self):
+        return self.file.name
+
+
+def append_chunk(upload, offset, stream, length):
+    """Write up to length bytes from stream at offset.
+
+    The offset is claimed in the database before anything is written, so
+    two requests for the same offset cannot both write to the file. Bytes
+    that arrive before a disconnect are kept, so the client can resume
+    mid-chunk. Returns the new offset, or None if another request holds or
+    has moved past the offset. Raises PartialFileMissing if the partial file
+    of a started upload is gone.
+    """
+    writer = uuid.uuid4()
+    now = timezone.now()
+    claimed = ImageUpload.objects.filter(pk=upload.pk, received=offset).filter(
+        Q(writer=None) | Q(updated_at__lt=now - CLAIM_TIMEOUT)
+    ).update(writer=writer, updated_at=now)
+    if not claimed:
+        return None
+    
+    written = 0
+    try:
+        os.makedirs(os.path.dirname(upload.partial_path()), exist_ok=True)
+        try:
+            partial = open(upload.partial_path(), 'r+b' if offset else 'wb')
+        except FileNotFoundError:
+            raise PartialFileMissing(f'{upload.partial_path()} no longer exists')
+        with partial:
+            partial.seek(offset)
+            try:
+                while written < length:
+                    data = stream.read(min(READ_SIZE, length - written))
+                    if not data:
+                        break
+                    partial.write(data)
+                    written += len(data)
+            except OSError:
+                # Client went away; record what did arrive
+                pass
+            partial.truncate()
+    finally:
+        ImageUpload.objects.filter(pk=upload.pk, writer=writer).update(
+            received=offset + written, writer=None, updated_at=timezone.now()
+        )
+    upload.received = offset + written
+    return upload.received
+
+
+def complete_upload(upload):
+    """Attach a fully received upload to its property; saving it queues the processing"""
+    with open(upload.partial_path(), 'rb') as partial:
+        image = PropertyImage(property=upload.property)
+        image.image.save(upload.filename, AssembledFile(partial, name=upload.filename), save=False)
+    image.save()
+    upload.delete()
+    return image
@@ -8,10 +8,13 @@ urlpatterns = [
     path('properties/', views.property_list, name='property_list'),
     path('properties/<int:pk>/', views.property_detail, name='property_detail'),
     path('properties/<int:pk>/calendar/', views.property_calendar, name='property_calendar'),
+    path('properties/<int:pk>/availability/', views.property_availability, name='property_availability'),
     path('properties/create/', views.property_create, name='property_create'),
     path('properties/<int:pk>/edit/', views.property_update, name='property_update'),
     path('properties/<int:pk>/delete/', views.property_delete, name='property_delete'),
     path('my-properties/', views.my_properties, name='my_properties'),
     path('search/', views.property_search, name='property_search'),
     path('properties/image/<int:image_id>/delete/', views.property_image_delete, name='property_image_delete'),
+    path('properties/<int:pk>/uploads/', views.image_upload_start, name='image_upload_start'),
+    path('properties/uploads/<uuid:upload_id>/', views.image_upload_chunk, name='image_upload_chunk'),
 ] 
\ No newline at end of file
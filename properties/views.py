@@ -1,16 +1,35 @@
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
-from django.core.paginator import Paginator
-from django.db.models import Q
-from .models import Property, PropertyImage, Amenity
+from django.db.models import Exists, OuterRef, F, FloatField
+from django.db.models.functions import Cast, NullIf
+from .models import Property, PropertyImage, Amenity, ImageUpload
 from .forms import PropertyForm, PropertyImageForm, PropertySearchForm
-from bookings.models import Booking
+from .facets import FACET_FILTERS, facet_counts
+from .search import get_search_backend
+from .uploads import PartialFileMissing, append_chunk, complete_upload
+from BookMyProperty.pagination import paginate
+from bookings.models import Booking, BookedNight
 from reviews.models import Review
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files import File
+from django.core.validators import validate_image_file_extension
 from django.http import JsonResponse
-from django.views.decorators.http import require_POST
-from datetime import datetime, timedelta
+from django.urls import reverse
+from django.views.decorators.http import require_POST, require_http_methods
+from datetime import datetime
+from decimal import Decimal
 import calendar
+import os
+
+# Longest span property_availability will return in one response
+MAX_AVAILABILITY_MONTHS = 12
+
+def _shift_month(year, month, delta):
+    """Return (year, month) moved by delta months"""
+    index = year * 12 + (month - 1) + delta
+    return index // 12, index % 12 + 1
 
 def home(request):
     """Home page with search form"""
@@ -19,55 +38,151 @@ def home(request):
     }
     return render(request, 'properties/home.html', context)
 
+def apply_search_filters(properties, cleaned_data):
+    """Narrow a Property queryset by validated PropertySearchForm data"""
+    search = cleaned_data.get('search')
+    property_type = cleaned_data.get('property_type')
+    city = cleaned_data.get('city')
+    min_price = cleaned_data.get('min_price')
+    max_price = cleaned_data.get('max_price')
+    bedrooms = cleaned_data.get('bedrooms')
+    guests = cleaned_data.get('guests')
+    amenities = cleaned_data.get('amenities')
+    latitude = cleaned_data.get('latitude')
+    longitude = cleaned_data.get('longitude')
+    check_in = cleaned_data.get('check_in')
+    check_out = cleaned_data.get('check_out')
+    
+    if search:
+        properties = get_search_backend().search(properties, search)
+    
+    if property_type:
+        properties = properties.filter(property_type=property_type)
+    
+    if city:
+        properties = properties.filter(city__icontains=city)
+    
+    if min_price:
+        properties = properties.filter(price_per_night__gte=min_price)
+    
+    if max_price:
+        properties = properties.filter(price_per_night__lte=max_price)
+    
+    if bedrooms:
+        properties = properties.filter(bedrooms__gte=bedrooms)
+    
+    if guests:
+        properties = properties.filter(max_guests__gte=guests)
+    
+    if amenities:
+        properties = properties.with_amenities(amenities)
+    
+    if latitude is not None and longitude is not None:
+        properties = properties.near(latitude, longitude, cleaned_data.get('radius'))
+    
+    if check_in and check_out:
+        # Anti-join against the per-night occupancy index
+        booked_nights = BookedNight.booked_between(check_in, check_out).filter(property_obj=OuterRef('pk'))
+        properties = properties.filter(~Exists(booked_nights))
+    
+    return properties
+
+def order_properties(properties, sort, ranked=False):
+    """Order a Property queryset by a PropertySearchForm sort choice.
+    
+    ranked querysets come from a full-text search and default to relevance order.
+    """
+    if sort == 'rating':
+        # Reads the stored review aggregates, so no join against reviews
+        properties = properties.annotate(
+            rating_avg=Cast('rating_sum', FloatField()) / NullIf('rating_count', 0)
+        )
+        return properties.order_by(F('rating_avg').desc(nulls_last=True), '-rating_count', '-created_at')
+    if sort == 'price_low':
+        return properties.order_by('price_per_night', '-created_at')
+    if sort == 'price_high':
+        return properties.order_by('-price_per_night', '-created_at')
+    if sort == 'distance':
+        # Only valid with a location filter, which annotates distance
+        return properties.order_by('distance', '-created_at')
+    if ranked:
+        return properties.order_by('-search_rank', '-created_at')
+    return properties.order_by('-created_at')
+
+def page_query(request):
+    """Return the current query string without its paging parameters"""
+    query = request.GET.copy()
+    for name in ('page', 'cursor'):
+        query.pop(name, None)
+    return query.urlencode()
+
+def facet_links(request, facets, cleaned_data):
+    """Add a filter URL and a selected flag to every facet option.
+    
+    Following a selected option's URL clears that filter again.
+    """
+    def same(current, value):
+        if isinstance(value, (int, Decimal)) and current is not None:
+            return current == value
+        return str(current or '').lower() == str(value or '').lower()
+    
+    def link(option, **params):
+        selected = all(same(cleaned_data.get(name), value) for name, value in params.items())
+        query = request.GET.copy()
+        for name in ('page', 'cursor'):
+            query.pop(name, None)
+        for name, value in params.items():
+            if selected or value is None:
+                query.pop(name, None)
+            else:
+                query[name] = value
+        return dict(option, url=f'?{query.urlencode()}', selected=selected)
+    
+    return dict(
+        facets,
+        property_type=[link(option, property_type=option['value']) for option in facets['property_type']],
+        city=[link(option, city=option['value']) for option in facets['city']],
+        price=[link(option, min_price=option['min_price'], max_price=option['max_price']) for option in facets['price']],
+        bedrooms=[link(option, bedrooms=option['value']) for option in facets['bedrooms']],
+    )
+
 def property_list(request):
     """List all properties with availability information"""
-    properties = Property.objects.all().order_by('-created_at')
+    properties = Property.objects.for_listing().order_by('-created_at')
     
     # Apply search filters
     search_form = PropertySearchForm(request.GET)
+    keyset_ordered = True
+    cleaned_data = {}
     if search_form.is_valid():
-        search = search_form.cleaned_data.get('search')
-        property_type = search_form.cleaned_data.get('property_type')
-        city = search_form.cleaned_data.get('city')
-        min_price = search_form.cleaned_data.get('min_price')
-        max_price = search_form.cleaned_data.get('max_price')
-        bedrooms = search_form.cleaned_data.get('bedrooms')
-        guests = search_form.cleaned_data.get('guests')
-        
-        if search:
-            properties = properties.filter(
-                Q(title__icontains=search) |
-                Q(description__icontains=search) |
-                Q(city__icontains=search) |
-                Q(state__icontains=search)
-            )
-        
-        if property_type:
-            properties = properties.filter(property_type=property_type)
-        
-        if city:
-            properties = properties.filter(city__icontains=city)
-        
-        if min_price:
-            properties = properties.filter(price_per_night__gte=min_price)
-        
-        if max_price:
-            properties = properties.filter(price_per_night__lte=max_price)
-        
-        if bedrooms:
-            properties = properties.filter(bedrooms__gte=bedrooms)
-        
-        if guests:
-            properties = properties.filter(max_guests__gte=guests)
+        cleaned_data = search_form.cleaned_data
+        properties = apply_search_filters(properties, cleaned_data)
+        properties = order_properties(
+            properties,
+            cleaned_data.get('sort'),
+            ranked=bool(cleaned_data.get('search'))
+        )
+        keyset_ordered = not (cleaned_data.get('sort') or cleaned_data.get('search'))
     
-    # Pagination
-    paginator = Paginator(properties, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Facets take the filters they cover off the SQL and apply them to the grouped rows
+    facet_data = {name: value for name, value in cleaned_data.items() if name not in FACET_FILTERS}
+    facets = facet_counts(apply_search_filters(Property.objects.all(), facet_data), cleaned_data)
+    facets = facet_links(request, facets, cleaned_data)
+    
+    # Pagination (cursor mode only applies to the default newest-first order)
+    page_obj = paginate(request, properties, 12, allow_cursor=keyset_ordered)
     
     context = {
         'properties': page_obj,
         'search_form': search_form,
+        'page_query': page_query(request),
+        'facets': facets,
+        'facet_groups': [
+            ('Property Type', facets['property_type']),
+            ('City', facets['city']),
+            ('Price per Night', facets['price']),
+            ('Bedrooms', facets['bedrooms']),
+        ],
     }
     return render(request, 'properties/property_list.html', context)
 
@@ -103,9 +218,16 @@ def property_detail(request, pk):
         status__in=['confirmed', 'pending']
     ).order_by('check_in_date')
     
+    # The reviewers' names are part of the recent reviews fragment's key, so a
+    # renamed account doesn't leave a stale "By ..." line in the cached copy
+    recent_reviewers = []
+    if property_obj.review_count:
+        recent_reviewers = list(property_obj.reviews.values_list('user__username', flat=True)[:3])
+    
     context = {
         'property': property_obj,
         'images': images,
+        'recent_reviewers': recent_reviewers,
         'user_has_booked': user_has_booked,
         'user_bookings': user_bookings,
         'user_has_reviewed': user_has_reviewed,
@@ -127,40 +249,23 @@ def property_calendar(request, pk):
     # Create calendar
     cal = calendar.monthcalendar(year, month)
     
-    # Get all bookings for this property in the current month
+    # Fetch the month's bookings once and mark booked nights in a bitmap
     start_date = datetime(year, month, 1).date()
-    if month == 12:
-        end_date = datetime(year + 1, 1, 1).date() - timedelta(days=1)
-    else:
-        end_date = datetime(year, month + 1, 1).date() - timedelta(days=1)
-    
-    bookings = Booking.objects.filter(
-        property_obj=property_obj,
-        check_in_date__lte=end_date,
-        check_out_date__gte=start_date,
-        status__in=['confirmed', 'pending']
-    )
+    next_year, next_month = _shift_month(year, month, 1)
+    end_date = datetime(next_year, next_month, 1).date()
+    booked = property_obj.occupancy_bitmap(start_date, end_date)
     
     # Create availability data for each day
     availability_data = {}
-    for day in range(1, end_date.day + 1):
+    for day in range(1, calendar.monthrange(year, month)[1] + 1):
         current_date = datetime(year, month, day).date()
-        
-        # Check if this date is booked
-        is_booked = bookings.filter(
-            check_in_date__lte=current_date,
-            check_out_date__gt=current_date
-        ).exists()
-        
         availability_data[day] = {
             'date': current_date,
-            'is_booked': is_booked,
+            'is_booked': bool(booked >> (day - 1) & 1),
             'is_today': current_date == today.date(),
             'is_past': current_date < today.date(),
         }
     
-
-    
     # Create a list of calendar weeks with availability data
     calendar_with_availability = []
     for week in cal:
@@ -179,10 +284,7 @@ def property_calendar(request, pk):
         calendar_with_availability.append(week_data)
     
     # Navigation
-    prev_month = month - 1 if month > 1 else 12
-    prev_year = year if month > 1 else year - 1
-    next_month = month + 1 if month < 12 else 1
-    next_year = year if month < 12 else year + 1
+    prev_year, prev_month = _shift_month(year, month, -1)
     
     context = {
         'property': property_obj,
@@ -199,6 +301,43 @@ def property_calendar(request, pk):
     }
     return render(request, 'properties/property_calendar.html', context)
 
+def property_availability(request, pk):
+    """Return booked days for a span of up to 12 months (AJAX)"""
+    property_obj = get_object_or_404(Property, pk=pk)
+    
+    today = datetime.now()
+    try:
+        year = int(request.GET.get('year', today.year))
+        month = int(request.GET.get('month', today.month))
+        months = min(max(int(request.GET.get('months', 1)), 1), MAX_AVAILABILITY_MONTHS)
+        # Both ends must be real dates; the span can run past year 9999
+        start_date = datetime(year, month, 1).date()
+        end_year, end_month = _shift_month(year, month, months)
+        end_date = datetime(end_year, end_month, 1).date()
+    except ValueError:
+        return JsonResponse({'error': 'Invalid year, month or months.'}, status=400)
+    
+    booked = property_obj.occupancy_bitmap(start_date, end_date)
+    
+    month_data = []
+    offset = 0
+    for i in range(months):
+        month_year, month_number = _shift_month(year, month, i)
+        days_in_month = calendar.monthrange(month_year, month_number)[1]
+        month_data.append({
+            'year': month_year,
+            'month': month_number,
+            'booked_days': [day for day in range(1, days_in_month + 1) if booked >> (offset + day - 1) & 1],
+        })
+        offset += days_in_month
+    
+    return JsonResponse({
+        'property_id': property_obj.pk,
+        'start_date': start_date.isoformat(),
+        'end_date': end_date.isoformat(),
+        'months': month_data,
+    })
+
 @login_required
 def property_create(request):
     """Create a new property"""
@@ -217,6 +356,7 @@ def property_create(request):
             # Handle multiple images
             images = request.FILES.getlist('images')
             for image in images:
+                # Resizing happens in the task worker; a placeholder shows until then
                 PropertyImage.objects.create(
                     property=property_obj,
                     image=image
@@ -244,11 +384,18 @@ def property_update(request, pk):
     if request.method == 'POST':
         form = PropertyForm(request.POST, request.FILES, instance=property_obj)
         if form.is_valid():
-            form.save()
+            # Only write the edited columns, so reviews posted while the form
+            # was open keep their rating aggregates
+            property_obj = form.save(commit=False)
+            property_obj.save(update_fields=[
+                name for name in PropertyForm.Meta.fields if name != 'amenities'
+            ] + ['updated_at'])
+            form.save_m2m()
             
             # Handle additional images
             images = request.FILES.getlist('images')
             for image in images:
+                # Resizing happens in the task worker; a placeholder shows until then
                 PropertyImage.objects.create(
                     property=property_obj,
                     image=image
@@ -288,7 +435,7 @@ def my_properties(request):
         messages.error(request, 'Only property owners can view their properties.')
         return redirect('properties:property_list')
     
-    properties = Property.objects.filter(owner=request.user).order_by('-created_at')
+    properties = Property.objects.for_listing().filter(owner=request.user).order_by('-created_at')
     
     context = {
         'properties': properties,
@@ -298,54 +445,28 @@ def my_properties(request):
 def property_search(request):
     """Advanced property search"""
     search_form = PropertySearchForm(request.GET)
-    properties = Property.objects.filter(is_available=True, status='available')
+    properties = Property.objects.for_listing().filter(is_available=True, status='available')
+    keyset_ordered = True
     
     if search_form.is_valid():
-        # Apply search filters (same logic as property_list)
-        search = search_form.cleaned_data.get('search')
-        property_type = search_form.cleaned_data.get('property_type')
-        city = search_form.cleaned_data.get('city')
-        min_price = search_form.cleaned_data.get('min_price')
-        max_price = search_form.cleaned_data.get('max_price')
-        bedrooms = search_form.cleaned_data.get('bedrooms')
-        guests = search_form.cleaned_data.get('guests')
-        
-        if search:
-            properties = properties.filter(
-                Q(title__icontains=search) |
-                Q(description__icontains=search) |
-                Q(city__icontains=search) |
-                Q(state__icontains=search)
-            )
-        
-        if property_type:
-            properties = properties.filter(property_type=property_type)
-        
-        if city:
-            properties = properties.filter(city__icontains=city)
-        
-        if min_price:
-            properties = properties.filter(price_per_night__gte=min_price)
-        
-        if max_price:
-            properties = properties.filter(price_per_night__lte=max_price)
-        
-        if bedrooms:
-            properties = properties.filter(bedrooms__gte=bedrooms)
-        
-        if guests:
-            properties = properties.filter(max_guests__gte=guests)
+        properties = apply_search_filters(properties, search_form.cleaned_data)
+        properties = order_properties(
+            properties,
+            search_form.cleaned_data.get('sort'),
+            ranked=bool(search_form.cleaned_data.get('search'))
+        )
+        keyset_ordered = not (search_form.cleaned_data.get('sort') or search_form.cleaned_data.get('search'))
     
-    # Pagination
-    paginator = Paginator(properties, 12)
-    page_number = request.GET.get('page')
-    page_obj = paginator.get_page(page_number)
+    # Pagination (cursor mode only applies to the default newest-first order)
+    page_obj = paginate(request, properties, 12, allow_cursor=keyset_ordered)
     
+    # Shares the listing template, whose sidebar is this search form
     context = {
         'properties': page_obj,
         'search_form': search_form,
+        'page_query': page_query(request),
     }
-    return render(request, 'properties/property_search.html', context)
+    return render(request, 'properties/property_list.html', context)
 
 @login_required
 @require_POST
@@ -353,3 +474,57 @@ def property_image_delete(request, image_id):
     image = get_object_or_404(PropertyImage, id=image_id, property__owner=request.user)
     image.delete()
     return JsonResponse({'success': True})
+
+@login_required
+@require_POST
+def image_upload_start(request, pk):
+    """Open a chunked upload for one image of the owner's property"""
+    property_obj = get_object_or_404(Property, pk=pk, owner=request.user)
+    filename = os.path.basename(request.POST.get('filename', '').strip())
+    try:
+        size = int(request.POST.get('size', ''))
+        validate_image_file_extension(File(None, name=filename))
+    except (ValueError, ValidationError):
+        return JsonResponse({'error': 'A filename with an image extension and a size are required.'}, status=400)
+    if not 0 < size <= settings.CHUNKED_UPLOAD_MAX_SIZE:
+        return JsonResponse({'error': f'Images must be at most {settings.CHUNKED_UPLOAD_MAX_SIZE} bytes.'}, status=413)
+    
+    upload = ImageUpload.objects.create(property=property_obj, filename=filename, size=size)
+    return JsonResponse({
+        'url': reverse('properties:image_upload_chunk', args=[upload.pk]),
+        'offset': 0,
+        'size': size,
+    }, status=201)
+
+@login_required
+@require_http_methods(['GET', 'PATCH'])
+def image_upload_chunk(request, upload_id):
+    """Report the resume offset (GET) or append the next chunk (PATCH)"""
+    upload = get_object_or_404(ImageUpload, pk=upload_id, property__owner=request.user)
+    if request.method == 'GET':
+        return JsonResponse({'offset': upload.received, 'size': upload.size})
+    
+    try:
+        offset = int(request.headers.get('Upload-Offset', ''))
+        length = int(request.META.get('CONTENT_LENGTH') or 0)
+    except ValueError:
+        return JsonResponse({'error': 'Upload-Offset and Content-Length headers are required.'}, status=400)
+    if offset != upload.received:
+        return JsonResponse({'error': 'Offset does not match the bytes received.', 'offset': upload.received}, status=409)
+    if offset + length > upload.size:
+        return JsonResponse({'error': 'Chunk runs past the declared size.'}, status=400)
+    
+    # Read the body as a stream; touching request.body would buffer it in memory
+    try:
+        received = append_chunk(upload, offset, request, length)
+    except PartialFileMissing:
+        upload.delete()
+        return JsonResponse({'error': 'The upload was lost; start it again.'}, status=410)
+    if received is None:
+        upload.refresh_from_db(fields=['received'])
+        return JsonResponse({'error': 'Another request is writing this chunk.', 'offset': upload.received}, status=409)
+    
+    response = {'offset': received, 'size': upload.size}
+    if received == upload.size:
+        response['image_id'] = complete_upload(upload).pk
+    return JsonResponse(response)
@@ -0,0 +1,18 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from properties.models import Property
+
+class Command(BaseCommand):
+    help = 'Rebuild the denormalized review aggregates stored on every property'
+
+    def handle(self, *args, **options):
+        rebuilt = 0
+        
+        for property_obj in Property.objects.only('pk').iterator():
+            with transaction.atomic():
+                property_obj.refresh_rating_stats()
+            rebuilt += 1
+        
+        self.stdout.write(
+            self.style.SUCCESS(f'Successfully rebuilt rating stats for {rebuilt} properties')
+        )
@@ -0,0 +1,31 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:05
+
+from django.db import migrations
+from django.db.models import Count, Q, Sum
+
+
+def populate_rating_stats(apps, schema_editor):
+    Property = apps.get_model('properties', 'Property')
+    stats = Property.objects.annotate(
+        review_sum=Sum('reviews__rating'),
+        review_count=Count('reviews'),
+        **{f'review_{star}_count': Count('reviews', filter=Q(reviews__rating=star)) for star in range(1, 6)}
+    )
+    for property_obj in stats.iterator():
+        Property.objects.filter(pk=property_obj.pk).update(
+            rating_sum=property_obj.review_sum or 0,
+            rating_count=property_obj.review_count,
+            **{f'rating_{star}_count': getattr(property_obj, f'review_{star}_count') for star in range(1, 6)}
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0003_property_rating_stats'),
+        ('reviews', '0003_alter_review_accuracy_rating_and_more'),
+    ]
+
+    operations = [
+        migrations.RunPython(populate_rating_stats, migrations.RunPython.noop),
+    ]
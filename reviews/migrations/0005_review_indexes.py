@@ -0,0 +1,24 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:11
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('properties', '0005_property_indexes'),
+        ('reviews', '0004_populate_property_rating_stats'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['property_obj', '-created_at'], name='review_property_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='review',
+            index=models.Index(fields=['property_obj', 'rating'], name='review_property_rating_idx'),
+        ),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 5.2.4 on 2026-10-17 02:31
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def populate_likes_count(apps, schema_editor):
+    Review = apps.get_model('reviews', 'Review')
+    for review in Review.objects.annotate(like_total=Count('likes')).filter(like_total__gt=0).iterator():
+        Review.objects.filter(pk=review.pk).update(likes_count=review.like_total)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('reviews', '0005_review_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='review',
+            name='likes_count',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(populate_likes_count, migrations.RunPython.noop),
+    ]
@@ -1,4 +1,8 @@
-from django.db import models
+from django.db import models, transaction
+from django.db.models import Count, Exists, F, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+from django.db.models.signals import m2m_changed, post_delete
+from django.dispatch import receiver
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from properties.models import Property
@@ -6,6 +10,16 @@ from bookings.models import Booking
 from django.core.exceptions import ValidationError
 from django.utils import timezone
 
+class ReviewQuerySet(models.QuerySet):
+    def with_liked_by(self, user):
+        """Annotate liked_by_me, resolved in the same query as the reviews"""
+        if not user.is_authenticated:
+            return self.annotate(liked_by_me=Value(False))
+        return self.annotate(liked_by_me=Exists(
+            Review.likes.through.objects.filter(review=OuterRef('pk'), user=user)
+        ))
+
+
 class Review(models.Model):
     RATING_CHOICES = [
         (1, '1 - Poor'),
@@ -64,10 +78,18 @@ class Review(models.Model):
     
     # Likes
     likes = models.ManyToManyField(User, related_name='liked_reviews', blank=True)
+    # Kept in step with likes by toggle_like and sync_likes_count
+    likes_count = models.PositiveIntegerField(default=0, editable=False)
+    
+    objects = ReviewQuerySet.as_manager()
     
     class Meta:
         unique_together = ['property_obj', 'user']
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['property_obj', '-created_at'], name='review_property_created_idx'),
+            models.Index(fields=['property_obj', 'rating'], name='review_property_rating_idx'),
+        ]
         verbose_name = 'Review'
         verbose_name_plural = 'Reviews'
     
@@ -75,7 +97,44 @@ class Review(models.Model):
         return f"{self.property_obj.title} - {self.user.username} ({self.rating}/5)"
     
     def save(self, *args, **kwargs):
-        super().save(*args, **kwargs)
+        with transaction.atomic():
+            previous_rating = None
+            if not self._state.adding:
+                previous = Review.objects.select_for_update().filter(pk=self.pk).values_list(
+                    'property_obj_id', 'rating'
+                ).first()
+                if previous:
+                    previous_property_id, previous_rating = previous
+                    if previous_property_id != self.property_obj_id:
+                        Property.update_rating_stats(previous_property_id, removed=previous_rating)
+                        previous_rating = None
+            
+            # likes_count only moves through F() updates; writing back this
+            # instance's copy would undo likes made since it was loaded
+            if not self._state.adding and kwargs.get('update_fields') is None:
+                kwargs['update_fields'] = [
+                    field.name for field in self._meta.concrete_fields
+                    if not field.primary_key and field.name != 'likes_count'
+                ]
+            super().save(*args, **kwargs)
+            Property.update_rating_stats(self.property_obj_id, removed=previous_rating, added=self.rating)
+    
+    def toggle_like(self, user):
+        """Like the review, or unlike it if user already does; return (liked, likes_count)"""
+        Like = Review.likes.through
+        with transaction.atomic():
+            # The (review, user) unique index answers the existence check
+            # and the delete without loading the other likers
+            liked = not Like.objects.filter(review_id=self.pk, user_id=user.pk).delete()[0]
+            delta = -1
+            if liked:
+                # A concurrent like can insert the row first; get_or_create
+                # then finds it instead of raising, and only one request counts it
+                delta = int(Like.objects.get_or_create(review_id=self.pk, user_id=user.pk)[1])
+            if delta:
+                Review.objects.filter(pk=self.pk).update(likes_count=F('likes_count') + delta)
+            self.likes_count = Review.objects.values_list('likes_count', flat=True).get(pk=self.pk)
+        return liked, self.likes_count
     
     @property
     def overall_rating(self):
@@ -108,3 +167,28 @@ class Review(models.Model):
     def is_recent(self):
         """Check if review was posted within last 30 days"""
         return (timezone.now() - self.created_at).days <= 30
+
+
+@receiver(post_delete, sender=Review)
+def remove_review_rating(sender, instance, **kwargs):
+    Property.update_rating_stats(instance.property_obj_id, removed=instance.rating)
+
+@receiver(m2m_changed, sender=Review.likes.through)
+def sync_likes_count(sender, instance, action, reverse, pk_set, **kwargs):
+    # Changes made through the likes manager (admin, shell) bypass
+    # toggle_like, so recount the affected reviews
+    if not reverse:
+        review_ids = [instance.pk] if action.startswith('post_') else None
+    elif action == 'pre_clear':
+        # clear() gives no pk_set, so note the reviews before they are unlinked
+        instance._unliked_review_ids = list(instance.liked_reviews.values_list('pk', flat=True))
+        review_ids = None
+    elif action == 'post_clear':
+        review_ids = instance.__dict__.pop('_unliked_review_ids', [])
+    else:
+        review_ids = pk_set if action in ('post_add', 'post_remove') else None
+    if review_ids:
+        like_counts = sender.objects.filter(review=OuterRef('pk')).order_by().values('review').annotate(
+            count=Count('pk')
+        ).values('count')
+        Review.objects.filter(pk__in=review_ids).update(likes_count=Coalesce(Subquery(like_counts), 0))
@@ -0,0 +1,60 @@
+"""Review statistics for a property: average, total, per-star distribution
+and per-category averages.
+
+Everything comes from one query grouped by star rating, and the result is
+cached under the property's fragment key. Every review save or delete bumps
+Property.cache_version, so a write switches readers to a new key and nothing
+has to be deleted.
+"""
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum
+
+from .models import Review
+
+# Optional per-category rating fields, as (field prefix, label)
+CATEGORIES = (
+    ('cleanliness', 'Cleanliness'),
+    ('communication', 'Communication'),
+    ('check_in', 'Check-in'),
+    ('accuracy', 'Accuracy'),
+    ('location', 'Location'),
+    ('value', 'Value'),
+)
+
+
+def _compute(property_id):
+    rows = Review.objects.filter(property_obj_id=property_id).order_by().values('rating').annotate(
+        count=Count('id'),
+        **{f'{name}_sum': Sum(f'{name}_rating') for name, _ in CATEGORIES},
+        **{f'{name}_count': Count(f'{name}_rating') for name, _ in CATEGORIES}
+    )
+    distribution = dict.fromkeys(range(1, 6), 0)
+    category_sums = dict.fromkeys((name for name, _ in CATEGORIES), 0)
+    category_counts = dict.fromkeys((name for name, _ in CATEGORIES), 0)
+    for row in rows:
+        distribution[row['rating']] = row['count']
+        for name, _ in CATEGORIES:
+            category_sums[name] += row[f'{name}_sum'] or 0
+            category_counts[name] += row[f'{name}_count']
+
+    total = sum(distribution.values())
+    return {
+        'avg_rating': sum(star * count for star, count in distribution.items()) / total if total else 0,
+        'total_reviews': total,
+        'distribution': distribution,
+        'categories': [
+            {'name': name, 'label': label, 'avg_rating': category_sums[name] / category_counts[name]}
+            for name, label in CATEGORIES if category_counts[name]
+        ],
+    }
+
+
+def rating_stats(property_obj):
+    """Return the review statistics for a property, cached per cache version"""
+    key = f'reviews.rating_stats:{property_obj.fragment_key}'
+    stats = cache.get(key)
+    if stats is None:
+        stats = _compute(property_obj.pk)
+        cache.set(key, stats, getattr(settings, 'FRAGMENT_CACHE_TIMEOUT', None))
+    return stats
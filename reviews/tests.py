@@ -1,3 +1,181 @@
-from django.test import TestCase
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+from django.contrib.auth.models import User
+from django.core.management import call_command
+from django.db.models import QuerySet
+from django.urls import reverse
+
+from BookMyProperty.testing import TestCase, create_property
+from properties.models import Property
+from .models import Review
+from .stats import rating_stats
+
+
+class ReviewTestCase(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.owner = User.objects.create_user('owner', 'owner@example.com', 'password')
+        cls.guest = User.objects.create_user('guest', 'guest@example.com', 'password')
+        cls.property_obj = create_property(cls.owner)
+
+    def create_review(self, user, rating=4):
+        return Review.objects.create(
+            property_obj=self.property_obj, user=user, rating=rating, title='Stay', comment='Lovely'
+        )
+
+
+class RatingAggregateTests(ReviewTestCase):
+    """The stored review aggregates should match the reviews through every change"""
+
+    def assert_stats(self, property_obj, rating_sum, distribution):
+        property_obj = Property.objects.get(pk=property_obj.pk)
+        self.assertEqual(property_obj.rating_sum, rating_sum)
+        self.assertEqual(property_obj.rating_count, sum(distribution.values()))
+        self.assertEqual(property_obj.rating_distribution, {star: distribution.get(star, 0) for star in range(1, 6)})
+        return property_obj
+
+    def test_create_edit_and_delete(self):
+        other = User.objects.create_user('other', 'other@example.com', 'password')
+        first = self.create_review(self.guest, rating=4)
+        self.create_review(other, rating=5)
+        self.assertEqual(self.assert_stats(self.property_obj, 9, {4: 1, 5: 1}).average_rating, 4.5)
+
+        first.rating = 2
+        first.save()
+        self.assertEqual(self.assert_stats(self.property_obj, 7, {2: 1, 5: 1}).average_rating, 3.5)
+
+        # Moving a review takes its rating along
+        second_property = create_property(self.owner, title='Second')
+        first.property_obj = second_property
+        first.save()
+        self.assert_stats(self.property_obj, 5, {5: 1})
+        self.assert_stats(second_property, 2, {2: 1})
+
+        first.delete()
+        Review.objects.filter(user=other).delete()
+        self.assertEqual(self.assert_stats(self.property_obj, 0, {}).average_rating, 0)
+        self.assert_stats(second_property, 0, {})
+
+    def test_rebuild_command_repairs_drift(self):
+        self.create_review(self.guest, rating=3)
+        Property.objects.filter(pk=self.property_obj.pk).update(rating_sum=40, rating_count=9, rating_1_count=2)
+        out = StringIO()
+        call_command('rebuild_rating_stats', stdout=out)
+        self.assertIn('1 properties', out.getvalue())
+        self.assert_stats(self.property_obj, 3, {3: 1})
+
+    def test_stale_save_keeps_ratings(self):
+        stale = Property.objects.get(pk=self.property_obj.pk)
+        self.create_review(self.guest, rating=4)
+        stale.title = 'Renamed'
+        stale.save()
+
+        property_obj = Property.objects.get(pk=self.property_obj.pk)
+        self.assertEqual(property_obj.title, 'Renamed')
+        self.assertEqual((property_obj.rating_count, property_obj.rating_sum, property_obj.rating_4_count), (1, 4, 1))
+
+    def test_property_edit_keeps_ratings(self):
+        self.owner.userprofile.user_type = 'owner'
+        self.owner.userprofile.save()
+        self.client.force_login(self.owner)
+        self.create_review(self.guest, rating=5)
+        response = self.client.post(reverse('properties:property_update', args=[self.property_obj.pk]), {
+            'title': 'Renamed', 'description': 'A place to stay', 'property_type': 'house',
+            'address': '1 Main Street', 'city': 'Pune', 'state': 'Maharashtra', 'zip_code': '411001',
+            'country': 'India', 'bedrooms': 2, 'bathrooms': 1, 'max_guests': 4, 'price_per_night': 1200,
+            'is_available': 'on', 'status': 'available', 'instant_booking_enabled': 'on',
+        })
+        self.assertEqual(response.status_code, 302)
+
+        property_obj = Property.objects.get(pk=self.property_obj.pk)
+        self.assertEqual((property_obj.title, property_obj.price_per_night), ('Renamed', 1200))
+        self.assertEqual((property_obj.rating_count, property_obj.rating_sum), (1, 5))
+
+
+class ReviewLikeTests(ReviewTestCase):
+    """likes_count should follow the likes however they change"""
+
+    def setUp(self):
+        self.review = self.create_review(self.guest)
+        self.fans = [User.objects.create_user(f'fan{i}', password=None) for i in range(3)]
+
+    def stored_count(self):
+        return Review.objects.values_list('likes_count', flat=True).get(pk=self.review.pk)
+
+    def test_toggle_like(self):
+        self.assertEqual(self.review.toggle_like(self.fans[0]), (True, 1))
+        self.assertEqual(self.review.toggle_like(self.fans[1]), (True, 2))
+        self.assertEqual(self.review.toggle_like(self.fans[0]), (False, 1))
+        self.assertEqual(self.stored_count(), 1)
+        self.assertEqual(list(self.review.likes.all()), [self.fans[1]])
+
+    def test_likes_manager_recounts(self):
+        self.review.likes.add(*self.fans)
+        self.assertEqual(self.stored_count(), 3)
+        self.fans[0].liked_reviews.remove(self.review)
+        self.assertEqual(self.stored_count(), 2)
+        self.review.likes.clear()
+        self.assertEqual(self.stored_count(), 0)
+
+    def test_concurrent_like_is_counted_once(self):
+        self.review.toggle_like(self.fans[0])
+        # The other request's like lands between our delete and our insert
+        with mock.patch.object(QuerySet, 'delete', return_value=(0, {})):
+            self.assertEqual(self.review.toggle_like(self.fans[0]), (True, 1))
+        self.assertEqual(self.stored_count(), 1)
+
+    def test_stale_save_keeps_likes_count(self):
+        stale = Review.objects.get(pk=self.review.pk)
+        self.review.toggle_like(self.fans[0])
+        stale.comment = 'Edited'
+        stale.save()
+        self.assertEqual(self.stored_count(), 1)
+        self.assertEqual(Review.objects.get(pk=self.review.pk).comment, 'Edited')
+
+
+class RecentReviewsFragmentTests(ReviewTestCase):
+    """The cached recent reviews must follow a reviewer's rename"""
+
+    def test_renamed_reviewer(self):
+        self.create_review(self.guest)
+        url = reverse('properties:property_detail', args=[self.property_obj.pk])
+        self.assertContains(self.client.get(url), 'By guest')
+
+        self.guest.username = 'renamed'
+        self.guest.save()
+        response = self.client.get(url)
+        self.assertContains(response, 'By renamed')
+        self.assertNotContains(response, 'By guest')
+
+
+class RatingStatsTests(ReviewTestCase):
+    """rating_stats should summarize the reviews and follow new ones past its cache"""
+
+    def test_distribution_averages_and_invalidation(self):
+        other = User.objects.create_user('other', 'other@example.com', 'password')
+        Review.objects.create(
+            property_obj=self.property_obj, user=self.guest, rating=5, title='Stay', comment='Lovely',
+            cleanliness_rating=4, location_rating=5,
+        )
+        Review.objects.create(
+            property_obj=self.property_obj, user=other, rating=2, title='Stay', comment='Noisy', cleanliness_rating=1,
+        )
+
+        stats = rating_stats(Property.objects.get(pk=self.property_obj.pk))
+        self.assertEqual(stats['total_reviews'], 2)
+        self.assertEqual(stats['avg_rating'], 3.5)
+        self.assertEqual(stats['distribution'], {1: 0, 2: 1, 3: 0, 4: 0, 5: 1})
+        self.assertEqual(
+            [(category['name'], category['avg_rating']) for category in stats['categories']],
+            [('cleanliness', 2.5), ('location', 5.0)]
+        )
+
+        property_obj = Property.objects.get(pk=self.property_obj.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(rating_stats(property_obj), stats)
+
+        self.create_review(self.owner, rating=2)
+        stats = rating_stats(Property.objects.get(pk=self.property_obj.pk))
+        self.assertEqual((stats['total_reviews'], stats['distribution'][2]), (3, 2))
+        self.assertEqual(stats['avg_rating'], 3)
@@ -4,10 +4,10 @@ from django.contrib import messages
 from django.http import JsonResponse
 from django.views.decorators.http import require_POST
 from django.core.paginator import Paginator
-from django.db.models import Avg, Count
 from django.urls import reverse
 from .models import Review
 from .forms import ReviewForm, ReviewEditForm
+from .stats import rating_stats as get_rating_stats
 from properties.models import Property
 from bookings.models import Booking
 
@@ -94,29 +94,21 @@ def delete_review(request, review_id):
 def review_list(request, property_id):
     """Display all reviews for a property"""
     property_obj = get_object_or_404(Property, id=property_id)
-    reviews = Review.objects.filter(property_obj=property_obj).select_related('user')
+    reviews = Review.objects.filter(property_obj=property_obj).select_related('user').with_liked_by(request.user)
     
     # Pagination
     paginator = Paginator(reviews, 10)
     page_number = request.GET.get('page')
     page_obj = paginator.get_page(page_number)
     
-    # Calculate rating statistics
-    rating_stats = reviews.aggregate(
-        avg_rating=Avg('rating'),
-        total_reviews=Count('id')
-    )
-    
-    # Rating distribution
-    rating_distribution = {}
-    for i in range(1, 6):
-        rating_distribution[i] = reviews.filter(rating=i).count()
+    # Average, total, distribution and category averages in one grouped query
+    rating_stats = get_rating_stats(property_obj)
     
     context = {
         'property': property_obj,
         'page_obj': page_obj,
         'rating_stats': rating_stats,
-        'rating_distribution': rating_distribution,
+        'rating_distribution': rating_stats['distribution'],
         'can_review': False
     }
     
@@ -154,42 +146,25 @@ def my_reviews(request):
 @login_required
 def like_review(request, review_id):
     """Like/unlike a review (AJAX)"""
-    review = get_object_or_404(Review, id=review_id)
-    
-    if request.user in review.likes.all():
-        review.likes.remove(request.user)
-        liked = False
-    else:
-        review.likes.add(request.user)
-        liked = True
+    review = get_object_or_404(Review.objects.only('pk'), id=review_id)
+    liked, likes_count = review.toggle_like(request.user)
     
     return JsonResponse({
         'liked': liked,
-        'likes_count': review.likes.count()
+        'likes_count': likes_count
     })
 
 def property_rating_summary(request, property_id):
     """Get rating summary for a property (AJAX)"""
     property_obj = get_object_or_404(Property, id=property_id)
-    reviews = Review.objects.filter(property_obj=property_obj)
     
-    if reviews.exists():
-        avg_rating = reviews.aggregate(Avg('rating'))['rating__avg']
-        total_reviews = reviews.count()
-        
-        # Rating distribution
-        distribution = {}
-        for i in range(1, 6):
-            distribution[i] = reviews.filter(rating=i).count()
-        
-        return JsonResponse({
-            'avg_rating': round(avg_rating, 1),
-            'total_reviews': total_reviews,
-            'distribution': distribution
-        })
+    stats = get_rating_stats(property_obj)
     
     return JsonResponse({
-        'avg_rating': 0,
-        'total_reviews': 0,
-        'distribution': {}
+        'avg_rating': round(stats['avg_rating'], 1),
+        'total_reviews': stats['total_reviews'],
+        'distribution': stats['distribution'] if stats['total_reviews'] else {},
+        'categories': {
+            category['name']: round(category['avg_rating'], 1) for category in stats['categories']
+        }
     })
@@ -0,0 +1,17 @@
+from django.contrib import admin
+from django.utils import timezone
+from .models import Task
+
+@admin.register(Task)
+class TaskAdmin(admin.ModelAdmin):
+    list_display = ('name', 'args', 'status', 'attempts', 'run_after', 'created_at')
+    list_filter = ('status', 'name')
+    readonly_fields = ('created_at', 'updated_at', 'locked_at', 'last_error')
+    actions = ['retry_tasks']
+    
+    def retry_tasks(self, request, queryset):
+        updated = queryset.exclude(status='running').update(
+            status='queued', attempts=0, run_after=timezone.now()
+        )
+        self.message_user(request, f'{updated} tasks queued again.')
+    retry_tasks.short_description = "Queue selected tasks again"
@@ -0,0 +1,90 @@
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from concurrent.futures.process import BrokenProcessPool
+from datetime import timedelta
+import multiprocessing
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.db import connections
+from tasks.models import Task
+from tasks.worker import initialize, run_task
+
+class Command(BaseCommand):
+    help = 'Run queued background tasks in a pool of worker processes'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--processes',
+            type=int,
+            default=os.cpu_count() or 1,
+            help='Number of worker processes'
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=2.0,
+            help='Seconds to wait between checks for new tasks'
+        )
+        parser.add_argument(
+            '--stale-after',
+            type=int,
+            default=600,
+            help='Seconds after which a running task is assumed lost and queued again'
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Exit once no due tasks are left instead of polling forever'
+        )
+
+    def handle(self, *args, **options):
+        processes = options['processes']
+        stale_after = timedelta(seconds=options['stale_after'])
+        
+        # Children open their own connections; don't hand them the parent's
+        connections.close_all()
+        pool = ProcessPoolExecutor(
+            max_workers=processes,
+            mp_context=multiprocessing.get_context('spawn'),
+            initializer=initialize
+        )
+        self.stdout.write(f'Worker started with {processes} processes')
+        
+        running = {}
+        try:
+            while True:
+                if not running:
+                    requeued = Task.requeue_stale(stale_after)
+                    if requeued:
+                        self.stdout.write(f'Requeued {requeued} stale tasks')
+                
+                free = processes - len(running)
+                if free:
+                    for task_id in Task.claim(free):
+                        running[pool.submit(run_task, task_id)] = task_id
+                
+                if not running:
+                    if options['once']:
+                        break
+                    time.sleep(options['poll_interval'])
+                    continue
+                
+                finished, _ = wait(running, timeout=options['poll_interval'], return_when=FIRST_COMPLETED)
+                for future in finished:
+                    task_id = running.pop(future)
+                    try:
+                        self.stdout.write(f'Task {task_id}: {future.result()}')
+                    except BrokenProcessPool:
+                        raise
+                    except Exception as exc:
+                        Task.objects.filter(pk=task_id, status='running').update(status='queued', locked_at=None)
+                        self.stderr.write(f'Task {task_id} could not be recorded and was queued again: {exc}')
+        except KeyboardInterrupt:
+            self.stdout.write('Stopping worker')
+        finally:
+            # Let tasks already handed to the pool finish, then free any that never started
+            pool.shutdown(wait=True, cancel_futures=True)
+            Task.objects.filter(pk__in=running.values(), status='running').update(status='queued', locked_at=None)
+        
+        self.stdout.write(self.style.SUCCESS('Worker stopped'))
@@ -0,0 +1,68 @@
+from datetime import timedelta
+
+from django.db import models, transaction
+from django.utils import timezone
+
+class Task(models.Model):
+    STATUS_CHOICES = (
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    )
+    
+    # Dotted path of the function to call, e.g. 'properties.tasks.process_image'
+    name = models.CharField(max_length=200)
+    args = models.JSONField(default=list, blank=True)
+    
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued')
+    attempts = models.PositiveIntegerField(default=0)
+    max_attempts = models.PositiveIntegerField(default=3)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_at = models.DateTimeField(blank=True, null=True)
+    last_error = models.TextField(blank=True)
+    
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+    
+    def __str__(self):
+        return f"{self.name}{tuple(self.args)} ({self.status})"
+    
+    @classmethod
+    def enqueue(cls, name, *args, max_attempts=3):
+        """Queue a call to the function at dotted path name"""
+        return cls.objects.create(name=name, args=list(args), max_attempts=max_attempts)
+    
+    @classmethod
+    def claim(cls, limit):
+        """Mark up to limit due tasks as running and return their ids"""
+        now = timezone.now()
+        with transaction.atomic():
+            ids = list(
+                cls.objects.select_for_update(skip_locked=True)
+                .filter(status='queued', run_after__lte=now)
+                .order_by('run_after', 'pk')
+                .values_list('pk', flat=True)[:limit]
+            )
+            if ids:
+                cls.objects.filter(pk__in=ids).update(
+                    status='running', locked_at=now, attempts=models.F('attempts') + 1
+                )
+        return ids
+    
+    @classmethod
+    def requeue_stale(cls, older_than):
+        """Put back tasks whose worker died while running them"""
+        return cls.objects.filter(
+            status='running', locked_at__lt=timezone.now() - older_than
+        ).update(status='queued', locked_at=None)
+    
+    def retry_delay(self):
+        """Back off exponentially: 30s, 60s, 120s, ..."""
+        return timedelta(seconds=30 * 2 ** (self.attempts - 1))
+    
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'run_after'], name='task_due_idx'),
+        ]
@@ -0,0 +1,88 @@
+from datetime import timedelta
+from unittest import mock
+
+from django.contrib.auth.models import User
+from django.utils import timezone
+
+from BookMyProperty.testing import TestCase, create_property
+from properties.models import PropertyImage
+from .models import Task
+from .worker import run_task
+
+calls = []
+
+
+def record(*args):
+    calls.append(args)
+
+
+def broken(*args):
+    raise OSError('storage is down')
+
+
+def cleanup(*args):
+    calls.append(('cleanup',) + args)
+
+
+broken.on_failure = cleanup
+
+
+class TaskQueueTests(TestCase):
+
+    def setUp(self):
+        calls.clear()
+
+    def test_claim(self):
+        due = [Task.enqueue('tasks.tests.record', i) for i in range(3)]
+        later = Task.objects.create(name='tasks.tests.record', run_after=timezone.now() + timedelta(hours=1))
+
+        claimed = Task.claim(2)
+        self.assertEqual(claimed, [due[0].pk, due[1].pk])
+        self.assertEqual(Task.claim(5), [due[2].pk])
+        self.assertEqual(Task.claim(5), [])
+
+        self.assertEqual(Task.objects.get(pk=due[0].pk).status, 'running')
+        self.assertEqual(Task.objects.get(pk=due[0].pk).attempts, 1)
+        self.assertEqual(Task.objects.get(pk=later.pk).status, 'queued')
+
+    def test_requeue_stale(self):
+        stale, fresh = Task.enqueue('tasks.tests.record'), Task.enqueue('tasks.tests.record')
+        Task.claim(2)
+        Task.objects.filter(pk=stale.pk).update(locked_at=timezone.now() - timedelta(hours=1))
+
+        self.assertEqual(Task.requeue_stale(timedelta(minutes=10)), 1)
+        self.assertEqual(Task.objects.get(pk=stale.pk).status, 'queued')
+        self.assertEqual(Task.objects.get(pk=fresh.pk).status, 'running')
+
+    def test_success(self):
+        task = Task.enqueue('tasks.tests.record', 1, 'a')
+        Task.claim(1)
+        self.assertEqual(run_task(task.pk), 'done')
+        self.assertEqual(calls, [(1, 'a')])
+
+    def test_retry_then_failure(self):
+        task = Task.enqueue('tasks.tests.broken', 7, max_attempts=2)
+
+        Task.claim(1)
+        self.assertEqual(run_task(task.pk), 'queued')
+        task.refresh_from_db()
+        self.assertIn('storage is down', task.last_error)
+        self.assertGreater(task.run_after, timezone.now())
+        self.assertEqual(calls, [])
+
+        Task.objects.filter(pk=task.pk).update(run_after=timezone.now())
+        Task.claim(1)
+        self.assertEqual(run_task(task.pk), 'failed')
+        self.assertEqual(calls, [('cleanup', 7)])
+
+    def test_image_marked_failed_after_last_attempt(self):
+        owner = User.objects.create_user('owner', 'owner@example.com', 'password')
+        property_obj = create_property(owner)
+        image = PropertyImage.objects.create(property=property_obj, image='properties/photo.jpg')
+        task = Task.enqueue('properties.tasks.process_image', image.pk, max_attempts=1)
+
+        Task.claim(1)
+        # An error other than ImageProcessingError, e.g. from storage
+        with mock.patch.object(PropertyImage, 'process', side_effect=OSError('disk full')):
+            self.assertEqual(run_task(task.pk), 'failed')
+        self.assertEqual(PropertyImage.objects.get(pk=image.pk).status, 'failed')
@@ -0,0 +1,44 @@
+"""Process-pool side of the task queue.
+
+Pool processes are started with the 'spawn' method, so this module must not
+touch Django at import time; the initializer sets Django up in each child.
+"""
+import traceback
+
+
+def initialize():
+    import django
+    django.setup()
+
+
+def run_task(task_id):
+    """Run one claimed task and record the outcome; returns the new status"""
+    from django.utils import timezone
+    from django.utils.module_loading import import_string
+    from .models import Task
+    
+    task = Task.objects.get(pk=task_id)
+    function = None
+    try:
+        function = import_string(task.name)
+        function(*task.args)
+    except Exception:
+        task.last_error = traceback.format_exc()
+        if task.attempts < task.max_attempts:
+            task.status = 'queued'
+            task.run_after = timezone.now() + task.retry_delay()
+        else:
+            task.status = 'failed'
+            # Out of retries: let the task clean up, e.g. mark its object failed
+            on_failure = getattr(function, 'on_failure', None)
+            if on_failure is not None:
+                try:
+                    on_failure(*task.args)
+                except Exception:
+                    task.last_error += traceback.format_exc()
+    else:
+        task.status = 'done'
+        task.last_error = ''
+    task.locked_at = None
+    task.save(update_fields=['status', 'run_after', 'locked_at', 'last_error', 'updated_at'])
+    return task.status